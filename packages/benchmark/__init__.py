@@ -0,0 +1,3 @@
+""" Micro-Benchmarks für einzelne Teile des Regelzyklus und Benchmark des gesamten Zyklus für synthetische Anlagen
+(control_cycle). Aufruf aus dem Verzeichnis packages mit python -m benchmark.<name>
+"""
@@ -0,0 +1,93 @@
+""" Broker im Speicher als Ersatz für mosquitto, um den Regelzyklus ohne Netzwerk zu betreiben.
+
+Retained Nachrichten werden wie vom Broker gespeichert und beim Abonnieren ausgeliefert. Nachrichten an
+openWB/set/... werden wie von setdata ohne Prüfung an das Topic ohne "set/" weitergeleitet. Die Auslieferung an den
+Abonnenten (SubData) erfolgt synchron im veröffentlichenden Thread, sodass ein Regelzyklus deterministisch abläuft.
+"""
+import json
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Tuple
+
+import paho.mqtt.client as mqtt
+
+from helpermodules.pub import PubSingleton, PubStats
+
+
+class Message(NamedTuple):
+    topic: str
+    payload: bytes
+
+
+class InMemoryBroker:
+    """ bietet die von Pub und SubData genutzten Methoden des paho-Clients."""
+
+    def __init__(self) -> None:
+        self.retained: Dict[str, bytes] = {}
+        self.subscriptions: List[str] = []
+        self.subscriber = None
+        self.published = 0
+        self.__queue: Deque[Message] = deque()
+        self.__queue_lock = threading.Lock()
+        self.__delivering = threading.Lock()
+
+    def connect(self, subscriber) -> None:
+        """ verbindet den Abonnenten (SubData), der seine Topics in on_connect abonniert."""
+        self.subscriber = subscriber
+        subscriber.on_connect(self, None, None, 0)
+        self.deliver()
+
+    def subscribe(self, topic: str, qos: int = 0) -> None:
+        self.subscriptions.append(topic)
+        with self.__queue_lock:
+            self.__queue.extend(Message(retained_topic, payload) for retained_topic, payload in self.retained.items()
+                                if mqtt.topic_matches_sub(topic, retained_topic))
+
+    def publish(self, topic: str, payload: Any = None, qos: int = 0, retain: bool = False) -> None:
+        if topic.startswith("openWB/set/"):
+            topic = topic.replace("openWB/set/", "openWB/", 1)
+            retain = True
+        if payload is None:
+            payload = b""
+        elif not isinstance(payload, bytes):
+            payload = str(payload).encode("utf-8")
+        with self.__queue_lock:
+            self.published += 1
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            if any(mqtt.topic_matches_sub(subscription, topic) for subscription in self.subscriptions):
+                self.__queue.append(Message(topic, payload))
+        self.deliver()
+
+    def deliver(self) -> None:
+        """ liefert alle ausstehenden Nachrichten aus. Wird bereits ausgeliefert (verschachtelter Aufruf aus SubData
+        oder anderer Thread), übernimmt dies der laufende Aufruf.
+        """
+        if self.subscriber is None or not self.__delivering.acquire(blocking=False):
+            return
+        while True:
+            with self.__queue_lock:
+                if not self.__queue:
+                    self.__delivering.release()
+                    return
+                message = self.__queue.popleft()
+            self.subscriber.on_message(self, None, message)
+
+    def load(self, messages: List[Tuple[str, Any]]) -> None:
+        """ legt retained Nachrichten (Topic, Payload als json) ab, z.B. einen Dump der Konfiguration."""
+        for topic, payload in messages:
+            self.publish(topic, json.dumps(payload), retain=True)
+
+
+class InMemoryPub(PubSingleton):
+    """ Pub, der an den Broker im Speicher sendet, anstatt eine MQTT-Verbindung aufzubauen."""
+
+    def __init__(self, broker: InMemoryBroker) -> None:
+        self._lock = threading.Lock()
+        self._last: Dict[str, str] = {}
+        self._local = threading.local()
+        self.stats = PubStats()
+        self.client = broker
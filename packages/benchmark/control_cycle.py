@@ -0,0 +1,178 @@
+""" misst den vollständigen Regelzyklus (Kopieren der Daten, Prepare.setup_algorithm, Algorithm.calc_current,
+Process.process_algorithm_results) für synthetische Anlagen verschiedener Größe. Broker und Geräte werden durch
+benchmark.broker und die MQTT-Module ersetzt, anstelle von Loadvars liefert benchmark.site die Messwerte.
+
+Ausgegeben werden je Anlagengröße die Perzentile der Zyklusdauer und der einzelnen Abschnitte sowie der
+Speicherbedarf je Zyklus (Spitze und verbleibender Zuwachs, gemessen mit tracemalloc in separaten Zyklen).
+
+python -m benchmark.control_cycle [--chargepoints 1 10 50 200] [--cycles 30] [--json report.json]
+    [--max-p90 <ms>]
+
+Mit --max-p90 endet der Aufruf mit Exit-Code 1, wenn die p90-Zyklusdauer einer Anlage den Wert überschreitet.
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from benchmark.broker import InMemoryBroker, InMemoryPub
+from benchmark.site import Site, SiteConfig, measurements, synthesize
+from control import algorithm, chargelog_store, data, prepare, process
+from helpermodules import subdata
+from helpermodules.pub import Pub
+from helpermodules.sync_barrier import SyncBarrier
+
+CHARGEPOINTS = (1, 10, 50, 200)
+CYCLES = 30
+WARMUP = 3
+TRACED = 3
+# pub: Senden der gesammelten Nachrichten am Ende des Zyklus einschließlich der Verarbeitung durch SubData
+STAGES = ("copy", "setup_algorithm", "calc_current", "process_algorithm_results", "pub")
+
+
+def _reset_subdata() -> None:
+    for category in ("cp_data", "cp_template_data", "pv_data", "ev_data", "ev_template_data",
+                     "ev_charge_template_data", "counter_data", "bat_data", "general_data", "optional_data",
+                     "system_data", "graph_data"):
+        getattr(subdata.SubData, category).clear()
+
+
+class CycleRunner:
+    """ betreibt den Regelzyklus wie HandlerAlgorithm.handler10Sec für eine synthetische Anlage."""
+
+    def __init__(self, site: Site) -> None:
+        self.site = site
+        self.cycle_count = 0
+        self.broker = InMemoryBroker()
+        Pub.instance = InMemoryPub(self.broker)
+        data.data_init()
+        _reset_subdata()
+        self.sync_barrier = SyncBarrier()
+        self.subdata = subdata.SubData(threading.Event(), threading.Event(), threading.Event(), self.sync_barrier)
+        self.broker.load(site.messages)
+        self.broker.connect(self.subdata)
+        self.prepare = prepare.Prepare(self.sync_barrier)
+        self.algorithm = algorithm.Algorithm()
+        self.process = process.Process()
+
+    def cycle(self) -> Dict[str, float]:
+        """ führt einen Zyklus aus und gibt die Dauer der Abschnitte in Sekunden zurück."""
+        self.cycle_count += 1
+        durations = {}
+        start = time.perf_counter()
+        self.prepare.copy_system_data()
+        self._get_values()
+        self.prepare.copy_module_data()
+        data.data.pv_data["all"].calc_power_for_all_components()
+        data.data.bat_data["all"].calc_power_for_all_components()
+        self.sync_barrier.mark()
+        self.prepare.copy_module_data()
+        self.prepare.copy_data()
+        durations["copy"] = time.perf_counter() - start
+        with Pub().batch():
+            for stage, func in (("setup_algorithm", self.prepare.setup_algorithm),
+                                ("calc_current", self.algorithm.calc_current),
+                                ("process_algorithm_results", self.process.process_algorithm_results)):
+                stage_start = time.perf_counter()
+                func()
+                durations[stage] = time.perf_counter() - stage_start
+            stage_start = time.perf_counter()
+        end = time.perf_counter()
+        durations["pub"] = end - stage_start
+        durations["cycle"] = end - start
+        return durations
+
+    def _get_values(self) -> None:
+        """ ersetzt Loadvars.get_hardware_values: Die Geräte senden ihre Messwerte an den Broker."""
+        self.broker.load(measurements(self.site, self.cycle_count))
+        self.sync_barrier.mark()
+
+    def charging_currents(self) -> Dict[int, float]:
+        """ Sollstrom je Ladepunkt nach dem letzten Zyklus"""
+        return {cp.num: cp.data["set"]["current"] for key, cp in data.data.cp_data.items() if "cp" in key}
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))]
+
+
+def measure(config: SiteConfig, cycles: int = CYCLES, warmup: int = WARMUP, traced: int = TRACED) -> Dict:
+    runner = CycleRunner(synthesize(config))
+    for _ in range(warmup):
+        runner.cycle()
+    samples = [runner.cycle() for _ in range(cycles)]
+    peaks, retained, blocks = [], [], []
+    tracemalloc.start()
+    try:
+        for _ in range(traced):
+            before_blocks = sys.getallocatedblocks()
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            runner.cycle()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+            blocks.append(sys.getallocatedblocks() - before_blocks)
+    finally:
+        tracemalloc.stop()
+    result = {"chargepoints": config.chargepoints, "counters": config.counters, "cycles": cycles,
+              "memory_peak_kib": round(statistics.median(peaks) / 1024, 1),
+              "memory_retained_kib": round(statistics.median(retained) / 1024, 1),
+              "allocated_blocks": int(statistics.median(blocks))}
+    for stage in STAGES + ("cycle",):
+        values = [sample[stage] * 1000 for sample in samples]
+        result[stage] = {f"p{p}": round(_percentile(values, p), 3) for p in (50, 90, 99)}
+    return result
+
+
+def site_config(chargepoints: int) -> SiteConfig:
+    """ Anlagengröße: ein Zwischenzähler je fünf Ladepunkte, ein Speicher und ein Wechselrichter je 50 Ladepunkte"""
+    return SiteConfig(chargepoints=chargepoints, counters=max(1, chargepoints // 5), fanout=3,
+                      inverters=max(1, chargepoints // 50), bats=max(1, chargepoints // 50))
+
+
+def run(chargepoints: Iterable[int] = CHARGEPOINTS, cycles: int = CYCLES, json_path: Optional[str] = None,
+        max_p90: Optional[float] = None) -> int:
+    # Das Ladelog nicht im Datenverzeichnis der Installation ablegen.
+    chargelog_store._store = chargelog_store.ChargelogStore(Path(tempfile.mkdtemp()))
+    logging.disable(logging.ERROR)
+    results = [measure(site_config(count), cycles) for count in chargepoints]
+    logging.disable(logging.NOTSET)
+    print(f"{'LP':>4} {'Zähler':>6} | {'p50':>8} {'p90':>8} {'p99':>8} ms | "
+          + " ".join(f"{stage[:12]:>12}" for stage in STAGES) + " (p50 ms) | Spitze KiB  Zuwachs KiB  Blöcke")
+    for result in results:
+        print(f"{result['chargepoints']:>4} {result['counters']:>6} | "
+              + " ".join(f"{result['cycle'][p]:8.2f}" for p in ("p50", "p90", "p99")) + " ms | "
+              + " ".join(f"{result[stage]['p50']:12.2f}" for stage in STAGES) + "          | "
+              f"{result['memory_peak_kib']:10.1f} {result['memory_retained_kib']:12.1f} {result['allocated_blocks']:7}")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if max_p90 is not None:
+        exceeded = [result for result in results if result["cycle"]["p90"] > max_p90]
+        for result in exceeded:
+            print(f"{result['chargepoints']} Ladepunkte: p90 {result['cycle']['p90']} ms überschreitet {max_p90} ms")
+        return 1 if exceeded else 0
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargepoints", type=int, nargs="+", default=CHARGEPOINTS)
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    parser.add_argument("--json", dest="json_path")
+    parser.add_argument("--max-p90", type=float, help="zulässige p90-Zyklusdauer in ms")
+    args = parser.parse_args()
+    sys.exit(run(args.chargepoints, args.cycles, args.json_path, args.max_p90))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+
+from benchmark import control_cycle
+from benchmark.site import CHARGEMODES, SiteConfig, synthesize
+from control import chargelog_store, data
+from helpermodules.pub import Pub
+
+
+@pytest.fixture(autouse=True)
+def in_memory_site(monkeypatch, tmp_path):
+    monkeypatch.setattr(chargelog_store, "_store", chargelog_store.ChargelogStore(tmp_path))
+    monkeypatch.setattr(Pub, "instance", None)
+
+
+def test_cycle_charges_synthetic_site(caplog):
+    # setup
+    site = synthesize(SiteConfig(chargepoints=8, counters=2))
+    runner = control_cycle.CycleRunner(site)
+
+    # execution
+    with caplog.at_level(logging.ERROR):
+        for _ in range(3):
+            durations = runner.cycle()
+
+    # evaluation
+    # Meldungen der Regelung sind zulässig, aber keine Exceptions durch fehlende Daten der Anlage.
+    assert [record.getMessage() for record in caplog.records if record.exc_info] == []
+    assert set(durations) == set(control_cycle.STAGES) | {"cycle"}
+    currents = runner.charging_currents()
+    for index, cp in enumerate(site.chargepoints):
+        chargemode = CHARGEMODES[index % len(CHARGEMODES)][0]
+        plugged = index % 4 != 3
+        if chargemode == "instant_charging" and plugged:
+            assert currents[cp] > 0
+        elif chargemode == "stop":
+            assert currents[cp] == 0
+    assert data.data.counter_data["all"].data["get"]["hierarchy"][0]["id"] == site.counters[0]
+
+
+def test_measure_reports_percentiles_and_memory():
+    # execution
+    result = control_cycle.measure(SiteConfig(chargepoints=1, counters=1), cycles=3, warmup=1, traced=1)
+
+    # evaluation
+    assert result["chargepoints"] == 1
+    assert result["cycle"]["p50"] <= result["cycle"]["p90"] <= result["cycle"]["p99"]
+    assert result["memory_peak_kib"] > 0
+
+
+def test_cycle_replaces_published_dicts():
+    # setup
+    runner = control_cycle.CycleRunner(synthesize(SiteConfig(chargepoints=2, counters=1)))
+    runner.cycle()
+    published = {category: dict(getattr(data.data, category))
+                 for category in ("counter_data", "cp_data", "pv_data", "bat_data", "ev_data")}
+    previous = {category: getattr(data.data, category) for category in published}
+
+    # execution
+    runner.cycle()
+
+    # evaluation
+    # Lesende, die noch den vorherigen Stand verwenden, sehen ihn unverändert und vollständig.
+    for category, values in published.items():
+        assert previous[category] == values
+        assert getattr(data.data, category) is not previous[category]
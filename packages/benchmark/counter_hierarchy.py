@@ -0,0 +1,82 @@
+""" vergleicht die rekursive Suche in der Zählerhierarchie mit dem HierarchyIndex für einen Regelzyklus, in dem für
+jeden Ladepunkt die Zähler im Pfad und für jeden Zähler die angeschlossenen Ladepunkte ermittelt werden.
+"""
+import timeit
+from typing import Dict, List
+
+from control.counter import CounterAll
+from modules.common.component_type import ComponentType
+
+NODES = 200
+REPEAT = 5
+
+
+def deep_hierarchy(nodes: int = NODES) -> List[Dict]:
+    """ Kette aus Zwischenzählern, an denen jeweils ein Ladepunkt hängt (Tiefe nodes/2)."""
+    root = {"id": 0, "type": ComponentType.COUNTER.value, "children": []}
+    counter = root
+    for id in range(1, nodes, 2):
+        chargepoint = {"id": id, "type": ComponentType.CHARGEPOINT.value, "children": []}
+        next_counter = {"id": id + 1, "type": ComponentType.COUNTER.value, "children": []}
+        counter["children"].extend([chargepoint, next_counter])
+        counter = next_counter
+    return [root]
+
+
+def legacy_counters_to_check(entry: Dict, id_to_find: int, counters: List[str]) -> bool:
+    for child in entry["children"]:
+        if child["id"] == id_to_find or (child["children"] and legacy_counters_to_check(child, id_to_find, counters)):
+            counters.append(f"counter{entry['id']}")
+            return True
+    return False
+
+
+def legacy_find(entry: Dict, id_to_find: int) -> Dict:
+    for child in entry["children"]:
+        if child["id"] == id_to_find:
+            return child
+        found = legacy_find(child, id_to_find)
+        if found:
+            return found
+    return {}
+
+
+def legacy_chargepoints(entry: Dict, chargepoints: List[str]) -> None:
+    for child in entry["children"]:
+        if child["type"] == ComponentType.CHARGEPOINT.value:
+            chargepoints.append(f"cp{child['id']}")
+        elif child["children"]:
+            legacy_chargepoints(child, chargepoints)
+
+
+def run() -> None:
+    hierarchy = deep_hierarchy()
+    counter_all = CounterAll()
+    counter_all.data["get"] = {"hierarchy": hierarchy}
+    chargepoints = range(1, NODES, 2)
+    counters = [f"counter{id}" for id in range(2, NODES, 2)]
+
+    def legacy():
+        for cp in chargepoints:
+            legacy_counters_to_check(hierarchy[0], cp, [])
+        for counter in counters:
+            legacy_chargepoints(legacy_find(hierarchy[0], int(counter[7:])), [])
+
+    def indexed():
+        for cp in chargepoints:
+            counter_all.get_counters_to_check(cp)
+        for counter in counters:
+            counter_all.get_chargepoints_of_counter(counter)
+
+    def rebuild():
+        counter_all._index = None
+        counter_all.get_hierarchy_index()
+
+    print(f"{NODES} Elemente, Tiefe {NODES // 2}, {len(chargepoints)} Ladepunkte, {len(counters)} Zähler")
+    for name, func in (("rekursiv", legacy), ("Index", indexed), ("Index-Aufbau", rebuild)):
+        duration = min(timeit.repeat(func, number=1, repeat=REPEAT))
+        print(f"{name:>12}: {duration * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    run()
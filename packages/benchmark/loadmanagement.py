@@ -0,0 +1,61 @@
+""" vergleicht das Lastmanagement vor Einführung des Ledgers mit dem Ledger für einen Regelzyklus, in dem für jeden
+Ladepunkt einer tiefen Zählerhierarchie die Reserven geprüft und anschließend alle Zähler überprüft werden.
+"""
+import copy
+import timeit
+from types import SimpleNamespace
+
+from benchmark.counter_hierarchy import deep_hierarchy
+from control import data
+from control import loadmanagement
+from control.counter import Counter, CounterAll
+from control.loadmanagement_test import LegacyLoadmanagement
+
+NODES = 200
+REPEAT = 5
+
+
+def site():
+    hierarchy = deep_hierarchy(NODES)
+    counters = {}
+    for id in range(0, NODES + 1, 2):
+        counter = Counter(id)
+        counter.data["config"] = {"max_currents": [10000, 10000, 10000]}
+        counter.data["set"] = {"currents_used": [1, 2, 3]}
+        counters[f"counter{id}"] = counter
+    counters["counter0"].data["set"]["consumption_left"] = 10**9
+    counter_all = CounterAll()
+    counter_all.data["get"] = {"hierarchy": hierarchy}
+    counters["all"] = counter_all
+    general = SimpleNamespace(data={"chargemode_config": {"unbalanced_load": True, "unbalanced_load_limit": 10000}})
+    chargepoints = [SimpleNamespace(num=id, data={"config": {"phase_1": 1}}) for id in range(1, NODES, 2)]
+    return counters, {"general": general}, chargepoints
+
+
+def run() -> None:
+    counters, general, chargepoints = site()
+    data.data_init()
+    data.data.general_data = general
+    legacy = LegacyLoadmanagement()
+
+    def cycle(check_cp, check_counters):
+        data.data.counter_data = copy.deepcopy(counters)
+        for cp in chargepoints:
+            check_cp(cp, 16, 1)
+        check_counters()
+
+    def baseline():
+        # Kopieren der Zähler, das in beiden Varianten enthalten ist
+        data.data.counter_data = copy.deepcopy(counters)
+
+    print(f"{NODES} Elemente, Tiefe {NODES // 2}, {len(chargepoints)} Ladepunkte")
+    copy_duration = min(timeit.repeat(baseline, number=1, repeat=REPEAT))
+    for name, args in (("bisher", (legacy.for_cp, legacy.for_counters)),
+                       ("Ledger", (loadmanagement.loadmanagement_for_cp,
+                                   loadmanagement.loadmanagement_for_counters))):
+        duration = min(timeit.repeat(lambda: cycle(*args), number=1, repeat=REPEAT)) - copy_duration
+        print(f"{name:>12}: {duration * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    run()
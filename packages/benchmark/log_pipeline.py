@@ -0,0 +1,117 @@
+""" misst Umfang und CPU-Zeit der Log-Ausgabe je Regelzyklus (benchmark.control_cycle) vor und nach der Umstellung
+auf das Logging über die Warteschlange.
+
+vorher: Die Datei-Handler schreiben im aufrufenden Thread, der Level wird am Root-Logger gesetzt und print_all wandelt
+    alle Dictionaries in Text um, auch wenn Debug nicht protokolliert wird.
+nachher: setup_logging mit Ringpuffer, der Level wird mit set_level an den Datei-Handlern gesetzt.
+
+Die Formatierung der MQTT-Topics in SubData wird in beiden Fällen mit dem aktuellen Code gemessen. Ausgegeben werden
+je Level die geschriebenen Bytes (main.log und mqtt.log), die CPU-Zeit des Prozesses einschließlich des Threads des
+Listeners und die CPU-Zeit des Regel-Threads je Zyklus.
+
+python -m benchmark.log_pipeline [--chargepoints 50] [--cycles 30]
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from benchmark.control_cycle import CycleRunner, site_config
+from benchmark.site import synthesize
+from control import chargelog_store, data
+from helpermodules import logger
+
+CHARGEPOINTS = 50
+CYCLES = 30
+WARMUP = 3
+LEVELS = (logging.DEBUG, logging.WARNING)
+
+
+def legacy_print_all(self) -> None:
+    for category in self._state:
+        for key in category:
+            if not isinstance(category[key], dict):
+                try:
+                    logging.getLogger("control.data").debug(key+"\n"+str(category[key].data))
+                except AttributeError:
+                    pass
+    logging.getLogger("control.data").debug("\n")
+
+
+def _legacy_setup(log_dir: Path, level: int):
+    format_str = '%(asctime)s - {%(name)s:%(lineno)s} - %(levelname)s - %(message)s'
+    main_handler = logging.FileHandler(str(log_dir / "main.log"))
+    main_handler.setFormatter(logging.Formatter(format_str))
+    mqtt_handler = logging.FileHandler(str(log_dir / "mqtt.log"))
+    mqtt_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    logging.getLogger().addHandler(main_handler)
+    logging.getLogger().setLevel(level)
+    logging.getLogger("mqtt").addHandler(mqtt_handler)
+    logging.getLogger("mqtt").propagate = False
+
+    def teardown() -> None:
+        logging.getLogger().removeHandler(main_handler)
+        logging.getLogger("mqtt").removeHandler(mqtt_handler)
+        main_handler.close()
+        mqtt_handler.close()
+    return teardown
+
+
+def measure(mode: str, level: int, chargepoints: int = CHARGEPOINTS, cycles: int = CYCLES) -> Dict:
+    runner = CycleRunner(synthesize(site_config(chargepoints)))
+    logging.disable(logging.CRITICAL)
+    for _ in range(WARMUP):
+        runner.cycle()
+    logging.disable(logging.NOTSET)
+    log_dir = Path(tempfile.mkdtemp())
+    print_all = data.Data.print_all
+    if mode == "vorher":
+        data.Data.print_all = legacy_print_all
+        teardown = _legacy_setup(log_dir, level)
+    else:
+        logger.setup_logging(log_dir)
+        logger.set_level(level)
+        teardown = logger.shutdown_logging
+    thread_time = 0.0
+    try:
+        process_start = time.process_time()
+        for _ in range(cycles):
+            logger.new_cycle()
+            start = time.thread_time()
+            runner.cycle()
+            thread_time += time.thread_time() - start
+        # Der Listener muss die Warteschlange vollständig abarbeiten.
+        teardown()
+        process_time = time.process_time() - process_start
+    finally:
+        data.Data.print_all = print_all
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("mqtt").setLevel(logging.NOTSET)
+    written = sum(path.stat().st_size for path in log_dir.iterdir())
+    return {"mode": mode, "level": logging.getLevelName(level), "kib": round(written / cycles / 1024, 1),
+            "process_ms": round(process_time / cycles * 1000, 2), "thread_ms": round(thread_time / cycles * 1000, 2)}
+
+
+def run(chargepoints: int = CHARGEPOINTS, cycles: int = CYCLES) -> None:
+    chargelog_store._store = chargelog_store.ChargelogStore(Path(tempfile.mkdtemp()))
+    print(f"{chargepoints} Ladepunkte, {cycles} Zyklen, je Zyklus:")
+    print(f"{'':8} {'Level':8} | {'KiB':>8} {'CPU ms':>8} {'Regel-Thread ms':>16}")
+    for level in LEVELS:
+        for mode in ("vorher", "nachher"):
+            result = measure(mode, level, chargepoints, cycles)
+            print(f"{result['mode']:8} {result['level']:8} | {result['kib']:8.1f} {result['process_ms']:8.2f} "
+                  f"{result['thread_ms']:16.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargepoints", type=int, default=CHARGEPOINTS)
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    args = parser.parse_args()
+    run(args.chargepoints, args.cycles)
+
+
+if __name__ == "__main__":
+    main()
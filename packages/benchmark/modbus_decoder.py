@@ -0,0 +1,43 @@
+""" vergleicht die Dekodierung einer Registerantwort über den BinaryPayloadDecoder (bisheriger Weg in
+ModbusClient.__read_registers) mit den vorkompilierten struct-Decodern für alle ModbusDataTypes.
+"""
+import random
+import struct
+import timeit
+from typing import List
+
+from pymodbus.constants import Endian
+from pymodbus.payload import BinaryPayloadDecoder
+
+from modules.common.modbus import ModbusDataType, decode_registers, number_of_registers
+
+# Anzahl Werte je Anfrage, z.B. drei Phasen
+VALUES = 3
+NUMBER = 20000
+
+
+def legacy_decode(registers: List[int], types: List[ModbusDataType], byteorder: Endian, wordorder: Endian) -> List:
+    decoder = BinaryPayloadDecoder.fromRegisters(registers, byteorder, wordorder)
+    return [struct.unpack(">e", struct.pack(">H", decoder.decode_16bit_uint())) if t ==
+            ModbusDataType.FLOAT_16 else getattr(decoder, t.decoding_method)() for t in types]
+
+
+def run() -> None:
+    rnd = random.Random(0)
+    print(f"{VALUES} Werte je Anfrage, Angaben in us/Anfrage")
+    print(f"{'Datentyp':>10} {'Wortfolge':>10} {'Payload':>9} {'struct':>9} {'Faktor':>7}")
+    for data_type in ModbusDataType:
+        for wordorder in (Endian.Big, Endian.Little):
+            types = [data_type] * VALUES
+            registers = [rnd.randrange(0x10000) for _ in range(number_of_registers(types))]
+            decode_registers(registers, types, Endian.Big, wordorder)
+            legacy = min(timeit.repeat(lambda: legacy_decode(registers, types, Endian.Big, wordorder),
+                                       number=NUMBER, repeat=3)) / NUMBER * 1e6
+            fast = min(timeit.repeat(lambda: decode_registers(registers, types, Endian.Big, wordorder),
+                                     number=NUMBER, repeat=3)) / NUMBER * 1e6
+            order = "big" if wordorder == Endian.Big else "little"
+            print(f"{data_type.name:>10} {order:>10} {legacy:9.2f} {fast:9.2f} {legacy / fast:7.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,165 @@
+""" Synthetische Anlage für Benchmarks des Regelzyklus.
+
+Die Anlage wird als retained Topics beschrieben, wie sie auf dem Broker liegen: Zählerhierarchie aus EVU-Zähler und
+Zwischenzählern, Ladepunkte, PV, Speicher, Fahrzeuge mit Lade- und Fahrzeug-Vorlagen. Als Geräte werden MQTT-Module
+verwendet, die nicht ausgelesen werden müssen. Die Messwerte liefert stattdessen measurements() für jeden Zyklus.
+"""
+import itertools
+import random
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from control import chargepoint, ev
+from helpermodules.update_config import UpdateConfig
+from modules.common.component_type import ComponentType
+
+Messages = List[Tuple[str, Any]]
+
+# Lademodi der Ladevorlagen (ctN), die reihum den Fahrzeugen zugeordnet werden
+CHARGEMODES = (("instant_charging", False), ("instant_charging", True), ("pv_charging", False), ("stop", False))
+
+
+class SiteConfig(NamedTuple):
+    chargepoints: int = 10
+    # Zwischenzähler unterhalb des EVU-Zählers
+    counters: int = 3
+    # Anzahl Zwischenzähler je Zähler, bei 1 entsteht eine Kette
+    fanout: int = 2
+    inverters: int = 1
+    bats: int = 1
+    seed: int = 0
+
+
+class Site(NamedTuple):
+    config: SiteConfig
+    messages: Messages
+    counters: Tuple[int, ...]
+    chargepoints: Tuple[int, ...]
+    inverters: Tuple[int, ...]
+    bats: Tuple[int, ...]
+
+
+def _counter_hierarchy(config: SiteConfig, ids) -> Tuple[List[Dict], List[int], List[int], List[int], List[int]]:
+    evu = {"id": next(ids), "type": ComponentType.COUNTER.value, "children": []}
+    counters = [evu]
+    # Zwischenzähler in Breitensuche anhängen, sodass jeder Zähler höchstens fanout Zwischenzähler hat.
+    for index in range(config.counters):
+        parent = counters[index // config.fanout]
+        counter = {"id": next(ids), "type": ComponentType.COUNTER.value, "children": []}
+        parent["children"].append(counter)
+        counters.append(counter)
+    # Ladepunkte reihum an die Zähler, bevorzugt an die Zwischenzähler
+    targets = counters[1:] or counters
+    chargepoints = []
+    for index in range(config.chargepoints):
+        cp = {"id": next(ids), "type": ComponentType.CHARGEPOINT.value, "children": []}
+        targets[index % len(targets)]["children"].append(cp)
+        chargepoints.append(cp["id"])
+    inverters, bats = [], []
+    for _ in range(config.inverters):
+        inverter = {"id": next(ids), "type": ComponentType.INVERTER.value, "children": []}
+        evu["children"].append(inverter)
+        inverters.append(inverter["id"])
+    for _ in range(config.bats):
+        bat = {"id": next(ids), "type": ComponentType.BAT.value, "children": []}
+        evu["children"].append(bat)
+        bats.append(bat["id"])
+    return [evu], [counter["id"] for counter in counters], chargepoints, inverters, bats
+
+
+def synthesize(config: SiteConfig = SiteConfig()) -> Site:
+    """ erzeugt die retained Topics der Anlage."""
+    ids = itertools.count()
+    hierarchy, counters, chargepoints, inverters, bats = _counter_hierarchy(config, ids)
+    messages: Messages = list(UpdateConfig.default_topic)
+    messages += [("openWB/general/grid_protection_active", False),
+                 ("openWB/general/ripple_control_receiver/r1_active", False),
+                 ("openWB/general/ripple_control_receiver/r2_active", False),
+                 ("openWB/general/chargemode_config/unbalanced_load", True),
+                 # Die MQTT-Ladepunkte unterstützen keine Phasenumschaltung.
+                 ("openWB/general/chargemode_config/instant_charging/phases_to_use", 3),
+                 ("openWB/general/chargemode_config/pv_charging/phases_to_use", 3),
+                 ("openWB/counter/get/hierarchy", hierarchy),
+                 ("openWB/system/device/0/config", {"type": "mqtt", "name": "MQTT", "id": 0, "configuration": {}})]
+    for component_type, component_ids in (("counter", counters), ("inverter", inverters), ("bat", bats)):
+        for id in component_ids:
+            messages.append((f"openWB/system/device/0/component/{id}/config",
+                             {"type": component_type, "id": id, "name": f"{component_type} {id}",
+                              "configuration": {}}))
+    for id in counters:
+        # Hausanschluss wächst mit der Anzahl Ladepunkte, damit nicht jede Ladung das Lastmanagement auslöst.
+        max_current = max(63, 16 * config.chargepoints) if id == counters[0] else 32
+        messages += [(f"openWB/counter/{id}/config/max_currents", [max_current] * 3),
+                     (f"openWB/counter/{id}/config/max_total_power", max_current * 230 * 3)]
+    for id in inverters:
+        messages.append((f"openWB/pv/{id}/config/max_ac_out", 10000))
+    for index, (chargemode, prio) in enumerate(CHARGEMODES):
+        charge_template = ev.get_charge_template_default()
+        charge_template["chargemode"]["selected"] = chargemode
+        charge_template["prio"] = prio
+        messages.append((f"openWB/vehicle/template/charge_template/{index}", charge_template))
+    for index, id in enumerate(chargepoints):
+        config_cp = chargepoint.get_chargepoint_default()
+        config_cp.update({"id": id, "name": f"Ladepunkt {id}", "ev": index, "phase_1": index % 4,
+                          "connection_module": {"type": "mqtt", "name": "MQTT-Ladepunkt", "configuration": {}},
+                          "power_module": {}})
+        messages.append((f"openWB/chargepoint/{id}/config", config_cp))
+        messages += [(f"openWB/vehicle/{index}/name", f"Fahrzeug {index}"),
+                     (f"openWB/vehicle/{index}/charge_template", index % len(CHARGEMODES)),
+                     (f"openWB/vehicle/{index}/ev_template", 0),
+                     (f"openWB/vehicle/{index}/tag_id", []),
+                     (f"openWB/vehicle/{index}/soc_module/config", {"type": None, "configuration": {}}),
+                     (f"openWB/vehicle/{index}/get/soc", 50)]
+    site = Site(config, messages, tuple(counters), tuple(chargepoints), tuple(inverters), tuple(bats))
+    return site._replace(messages=messages + measurements(site, 0))
+
+
+def measurements(site: Site, cycle: int) -> Messages:
+    """ Messwerte der Geräte für einen Zyklus. Je Zyklus reproduzierbar, aber leicht schwankend."""
+    rng = random.Random(site.config.seed * 100003 + cycle)
+    messages: Messages = []
+    cp_power = 0.0
+    for index, id in enumerate(site.chargepoints):
+        # Drei von vier Fahrzeugen sind angesteckt, die Hälfte davon lädt.
+        plugged = index % 4 != 3
+        charging = plugged and index % 2 == 0
+        current = rng.uniform(6, 16) if charging else 0
+        phases = 3 if charging else 0
+        power = current * 230 * phases
+        cp_power += power
+        messages += [(f"openWB/chargepoint/{id}/get/plug_state", plugged),
+                     (f"openWB/chargepoint/{id}/get/charge_state", charging),
+                     (f"openWB/chargepoint/{id}/get/currents", [current if charging else 0] * 3),
+                     (f"openWB/chargepoint/{id}/get/power", power),
+                     (f"openWB/chargepoint/{id}/get/phases_in_use", phases),
+                     (f"openWB/chargepoint/{id}/get/imported", 1000 + cycle * power / 360),
+                     (f"openWB/chargepoint/{id}/get/exported", 0),
+                     (f"openWB/chargepoint/{id}/get/fault_state", 0),
+                     (f"openWB/chargepoint/{id}/get/fault_str", "Kein Fehler.")]
+    pv_power = 0.0
+    for id in site.inverters:
+        power = -rng.uniform(2000, 9000)
+        pv_power += power
+        messages += [(f"openWB/pv/{id}/get/power", power),
+                     (f"openWB/pv/{id}/get/counter", 5000000),
+                     (f"openWB/pv/{id}/get/exported", 5000000),
+                     (f"openWB/pv/{id}/get/fault_state", 0),
+                     (f"openWB/pv/{id}/get/fault_str", "Kein Fehler.")]
+    for id in site.bats:
+        messages += [(f"openWB/bat/{id}/get/power", rng.uniform(-1000, 1000)),
+                     (f"openWB/bat/{id}/get/soc", rng.randint(20, 90)),
+                     (f"openWB/bat/{id}/get/imported", 100000),
+                     (f"openWB/bat/{id}/get/exported", 80000),
+                     (f"openWB/bat/{id}/get/fault_state", 0),
+                     (f"openWB/bat/{id}/get/fault_str", "Kein Fehler.")]
+    for id in site.counters:
+        power = cp_power + pv_power + rng.uniform(300, 1500) if id == site.counters[0] else rng.uniform(0, 11000)
+        currents = [power / 230 / 3 + rng.uniform(-2, 2) for _ in range(3)]
+        messages += [(f"openWB/counter/{id}/get/power", power),
+                     (f"openWB/counter/{id}/get/currents", currents),
+                     (f"openWB/counter/{id}/get/voltages", [230.0] * 3),
+                     (f"openWB/counter/{id}/get/imported", 2000000),
+                     (f"openWB/counter/{id}/get/exported", 100000),
+                     (f"openWB/counter/{id}/get/frequency", 50.0),
+                     (f"openWB/counter/{id}/get/fault_state", 0),
+                     (f"openWB/counter/{id}/get/fault_str", "Kein Fehler.")]
+    return messages
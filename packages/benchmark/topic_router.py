@@ -0,0 +1,73 @@
+""" vergleicht die Zuordnung der Topics eines synthetischen Retained-Dumps über die if/elif-Ketten von
+SubData.on_message und SetData.on_message und die Indexsuche mit regulären Ausdrücken mit dem TopicRouter.
+"""
+import re
+import timeit
+from typing import List
+
+from helpermodules import setdata, subdata, topic_router
+from helpermodules.update_config import UpdateConfig
+
+INSTANCES = 8
+REPEAT = 5
+
+
+def retained_dump(instances: int = INSTANCES) -> List[str]:
+    """ erzeugt aus den gültigen Topics der Konfiguration einen Dump, wie ihn der Broker beim Verbinden sendet."""
+    topics = []
+    for pattern in UpdateConfig.valid_topic:
+        topic = pattern.lstrip("^").rstrip("$")
+        for i in range(instances if "[0-9]+" in topic else 1):
+            concrete = topic.replace("[0-9]+", str(i)).replace("[a-z_]+", "loadvars")
+            topics.append(concrete)
+            topics.append(concrete.replace("openWB/", "openWB/set/", 1))
+    return topics
+
+
+# Präfixe in der Reihenfolge der if/elif-Ketten vor der Umstellung auf den TopicRouter
+LEGACY_SET_BRANCHES = ("openWB/set/vehicle/", "openWB/set/chargepoint/", "openWB/set/pv/", "openWB/set/bat/",
+                       "openWB/set/general/", "openWB/set/optional/", "openWB/set/counter/", "openWB/set/log/",
+                       "openWB/set/graph/", "openWB/set/system/", "openWB/set/command/")
+LEGACY_SUB_BRANCHES = ("openWB/vehicle/template/charge_template/", "openWB/vehicle/template/ev_template/",
+                       "openWB/vehicle/", "openWB/chargepoint/template/", "openWB/chargepoint/", "openWB/pv/",
+                       "openWB/bat/", "openWB/general/", "openWB/graph/", "openWB/optional/", "openWB/counter/",
+                       "openWB/system/")
+
+
+def legacy_dispatch(topic: str) -> str:
+    for branch in LEGACY_SET_BRANCHES if "openWB/set/" in topic else LEGACY_SUB_BRANCHES:
+        if branch in topic:
+            break
+    index = re.search('(?!/)([0-9]*)(?=/|$)', topic)
+    key = re.search("/([a-z,A-Z,0-9,_]+)(?!.*/)", topic)
+    return index.group() + key.group(1)
+
+
+def router_dispatch(topic: str) -> str:
+    if topic.startswith("openWB/set/"):
+        setdata.ROUTER.match(topic)
+        index = topic_router.get_index(topic)
+    else:
+        route = subdata.ROUTER.match(topic)
+        index = route.indices[0] if route is not None and route.indices else ""
+    return index + topic_router.get_key(topic)
+
+
+def run(topics: List[str]) -> None:
+    def legacy():
+        for topic in topics:
+            legacy_dispatch(topic)
+
+    def router():
+        for topic in topics:
+            router_dispatch(topic)
+
+    router()
+    print(f"{len(topics)} Topics")
+    for name, func in (("if/elif + re", legacy), ("TopicRouter", router)):
+        duration = min(timeit.repeat(func, number=1, repeat=REPEAT))
+        print(f"{name:>14}: {duration * 1000:8.2f} ms, {duration / len(topics) * 1e6:6.2f} us/Topic")
+
+
+if __name__ == "__main__":
+    run(retained_dump())
@@ -0,0 +1,131 @@
+""" misst die Dauer des Regelzyklus (benchmark.control_cycle) und den Anteil der Transaktionen
+(data.Data.begin_transaction, commit und rollback) mit den bisherigen und der aktuellen Umsetzung.
+
+deepcopy: Kopie der Kategorien mit copy.deepcopy, beim Zurücksetzen werden die Kopien zugewiesen.
+struktur: Kopie der Struktur der data-Dictionaries aller Objekte beim Start jeder Transaktion.
+journal: JournalDict hält nur die bei einem Schreibzugriff überschriebenen Werte fest (aktuelle Umsetzung).
+
+Gemessen wird jeweils der erste Zyklus einer neu aufgebauten Anlage, in dem die Ladepunkte eingeschaltet werden. Im
+eingeschwungenen Zustand der synthetischen Anlage startet der Algorithmus keine Transaktionen.
+
+python -m benchmark.transaction [--chargepoints 5 20 50] [--cycles 10]
+"""
+import argparse
+import copy
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from benchmark.control_cycle import CycleRunner, site_config
+from benchmark.site import synthesize
+from control import chargelog_store, data
+
+CHARGEPOINTS = (5, 20, 50)
+CYCLES = 10
+MODES = ("deepcopy", "struktur", "journal")
+
+
+class DeepcopyTransaction:
+    def __init__(self, data_: data.Data, categories) -> None:
+        self.data = data_
+        self.saved = {category: copy.deepcopy(getattr(data_, category)) for category in categories}
+
+    def commit(self) -> None:
+        self.saved = {}
+
+    def rollback(self) -> None:
+        for category, value in self.saved.items():
+            setattr(self.data, category, value)
+        self.saved = {}
+
+
+class StructureTransaction:
+    def __init__(self, objects: List) -> None:
+        memo: Dict[int, object] = {}
+        self.journal = [(obj, data._copy_structure(obj.data, memo)) for obj in objects]
+
+    def commit(self) -> None:
+        self.journal.clear()
+
+    def rollback(self) -> None:
+        for obj, saved in self.journal:
+            data._restore(obj.data, saved)
+        self.journal.clear()
+
+
+class TimedTransaction:
+    """ addiert die Dauer von Start, commit und rollback."""
+
+    def __init__(self, timer: List[float], start) -> None:
+        self.timer = timer
+        begin = time.perf_counter()
+        self.transaction = start()
+        self.timer[0] += time.perf_counter() - begin
+
+    def commit(self) -> None:
+        begin = time.perf_counter()
+        self.transaction.commit()
+        self.timer[0] += time.perf_counter() - begin
+
+    def rollback(self) -> None:
+        begin = time.perf_counter()
+        self.transaction.rollback()
+        self.timer[0] += time.perf_counter() - begin
+
+
+def measure(mode: str, chargepoints: int, cycles: int = CYCLES) -> Dict:
+    timer = [0.0]
+    transactions = [0]
+    journaled = data.Data.begin_transaction
+
+    def begin_transaction(self: data.Data, *categories: str):
+        transactions[0] += 1
+        if mode == "deepcopy":
+            return TimedTransaction(timer, lambda: DeepcopyTransaction(self, categories))
+        elif mode == "struktur":
+            return TimedTransaction(timer, lambda: StructureTransaction(
+                list({id(obj): obj for category in categories
+                      for obj in data._objects(getattr(self._state, category))}.values())))
+        else:
+            return TimedTransaction(timer, lambda: journaled(self, *categories))
+
+    data.Data.begin_transaction = begin_transaction
+    site = synthesize(site_config(chargepoints))
+    durations = []
+    try:
+        for _ in range(cycles):
+            runner = CycleRunner(site)
+            durations.append(runner.cycle()["cycle"])
+    finally:
+        data.Data.begin_transaction = journaled
+    return {"mode": mode, "chargepoints": chargepoints,
+            "cycle_ms": round(statistics.median(durations) * 1000, 2),
+            "transaction_ms": round(timer[0] / cycles * 1000, 2),
+            "transactions": transactions[0] // cycles}
+
+
+def run(chargepoints: Iterable[int] = CHARGEPOINTS, cycles: int = CYCLES) -> None:
+    chargelog_store._store = chargelog_store.ChargelogStore(Path(tempfile.mkdtemp()))
+    logging.disable(logging.ERROR)
+    print(f"{'LP':>4} {'':9} | {'Zyklus p50 ms':>14} {'Transaktionen':>14} {'davon ms':>9}")
+    for count in chargepoints:
+        for mode in MODES:
+            result = measure(mode, count, cycles)
+            print(f"{count:>4} {mode:9} | {result['cycle_ms']:14.2f} {result['transactions']:14} "
+                  f"{result['transaction_ms']:9.2f}")
+    logging.disable(logging.NOTSET)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargepoints", type=int, nargs="+", default=CHARGEPOINTS)
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    args = parser.parse_args()
+    run(args.chargepoints, args.cycles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+""" misst die Prüfung der retained Topics beim Start (UpdateConfig) für einen synthetischen Dump mit etwa 20.000
+Topics, von denen ein Teil veraltet ist: je Topic alle regulären Ausdrücke aus valid_topic nacheinander gegenüber dem
+TopicMatcher.
+"""
+import re
+import timeit
+from typing import List
+
+from benchmark.topic_router import retained_dump
+from helpermodules.update_config import TopicMatcher, UpdateConfig
+
+INSTANCES = 95
+REPEAT = 3
+
+
+def broker_dump(instances: int = INSTANCES) -> List[str]:
+    """ gültige Topics aus retained_dump und je Instanz veraltete Topics, die entfernt werden müssen"""
+    topics = retained_dump(instances)
+    for i in range(instances):
+        topics += [f"openWB/vehicle/{i}/get/outdated", f"openWB/chargepoint/{i}/set/outdated",
+                   f"openWB/system/device/{i}/component/{i}/outdated", f"openWB/outdated/{i}"]
+    return topics
+
+
+def legacy_invalid(topics: List[str]) -> List[str]:
+    invalid = []
+    for topic in topics:
+        for valid_topic in UpdateConfig.valid_topic:
+            if re.search(valid_topic, topic) is not None:
+                break
+        else:
+            invalid.append(topic)
+    return invalid
+
+
+def matcher_invalid(topics: List[str]) -> List[str]:
+    matcher = TopicMatcher(UpdateConfig.valid_topic)
+    return [topic for topic in topics if not matcher.search(topic)]
+
+
+def run() -> None:
+    topics = broker_dump()
+    invalid = matcher_invalid(topics)
+    assert invalid == legacy_invalid(topics)
+    print(f"{len(topics)} Topics, {len(invalid)} ungültig, {len(UpdateConfig.valid_topic)} Ausdrücke")
+    for name, func in (("re.search je Ausdruck", legacy_invalid), ("TopicMatcher", matcher_invalid)):
+        duration = min(timeit.repeat(lambda: func(topics), number=1, repeat=REPEAT))
+        print(f"{name:>22}: {duration * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    run()
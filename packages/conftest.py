@@ -2,7 +2,7 @@ import datetime
 from unittest.mock import MagicMock, Mock
 import pytest
 
-from helpermodules import pub
+from helpermodules import mqtt_pool, pub
 
 
 @pytest.fixture(autouse=True)
@@ -17,3 +17,8 @@ def mock_pub(monkeypatch) -> None:
     pub_mock = Mock()
     pub_mock.pub.return_value = None
     monkeypatch.setattr(pub, 'PubSingleton', pub_mock)
+
+
+@pytest.fixture(autouse=True)
+def mock_mqtt_pool(monkeypatch) -> None:
+    monkeypatch.setattr(mqtt_pool, 'pool', Mock())
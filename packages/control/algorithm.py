@@ -1,7 +1,6 @@
 """ Algorithmus zur Berechnung der Ladeströme
 """
 
-import copy
 import logging
 from typing import Dict, List, Optional, Tuple
 
@@ -214,7 +213,7 @@ class Algorithm:
 
     def _down_regulation(self,
                          mode_tuple: Tuple[Optional[str], str, bool],
-                         cps_to_reduce: List[str],
+                         cps_to_reduce: Tuple[str, ...],
                          max_current_overshoot: float,
                          max_overshoot_phase: int,
                          prevent_stop: bool = False) -> float:
@@ -403,11 +402,7 @@ class Algorithm:
                     try:
                         # aktuelle Werte speichern (werden wieder hergestellt, wenn das Lastmanagement die Anpassung
                         # verhindert)
-                        counter_data_old = copy.deepcopy(
-                            data.data.counter_data)
-                        pv_data_old = copy.deepcopy(data.data.pv_data)
-                        bat_data = copy.deepcopy(data.data.bat_data)
-                        cp_data_old = copy.deepcopy(data.data.cp_data)
+                        transaction = data.data.begin_transaction("counter_data", "pv_data", "bat_data", "cp_data")
                         # Fehlenden Ladestrom ermitteln
                         missing_current = cp.data["set"]["charging_ev_data"].data[
                             "control_parameter"]["required_current"] - cp.data["set"]["current"]
@@ -439,18 +434,11 @@ class Algorithm:
                             # In diesem Fall soll keine Anpassung erfolgen.
                             if undo_missing_current*-1 > missing_current:
                                 # Zustand von vor dem Lastmanagement wieder herstellen
-                                data.data.counter_data = counter_data_old
-                                data.data.pv_data = pv_data_old
-                                data.data.bat_data = bat_data
-                                data.data.cp_data = cp_data_old
+                                transaction.rollback()
                                 log.debug("Keine Hochregelung für Ladepunkt "+str(cp.num) +
                                           ", da nur noch das Offset zum Maximalstrom verfügbar ist.")
                                 message = "Das Lastmanagement konnte den Ladepunkt nicht auf die gewünschte \
                                     Stromstärke hochregeln."
-                                # Beim Wiederherstellen der Kopie wird die Adresse der Kopie zugewiesen, sodass die
-                                # Adresse des LP aktualisiert werden muss,
-                                # um Änderungen in der Klasse vorzunehmen, die das data-Modul referenziert.
-                                cp = data.data.cp_data["cp" + str(cp.num)]
                             # Es kann nur ein Teil des fehlenden Ladestroms hochgeregelt werden.
                             else:
                                 # Werte aktualisieren
@@ -469,6 +457,7 @@ class Algorithm:
                             message = "Das Lastmanagement hat den Ladestrom um " + \
                                 str(round(missing_current, 2))+"A angepasst."
                             log.debug(message)
+                        transaction.commit()
                         ev_data = cp.data["set"]["charging_ev_data"]
                         current_diff = round(ev_data.data[
                             "control_parameter"]["required_current"] - cp.data["set"]["current"], 2)
@@ -651,10 +640,7 @@ class Algorithm:
         try:
             evu_counter = data.data.counter_data["all"].get_evu_counter()
             # aktuelle Werte speichern (werden wieder hergestellt, wenn das Lastmanagement die Ladung verhindert)
-            counter_data_old = copy.deepcopy(data.data.counter_data)
-            pv_data_old = copy.deepcopy(data.data.pv_data)
-            bat_data = copy.deepcopy(data.data.bat_data)
-            cp_data_old = copy.deepcopy(data.data.cp_data)
+            transaction = data.data.begin_transaction("counter_data", "pv_data", "bat_data", "cp_data")
 
             # Wenn bereits geladen wird, nur die Änderung zuteilen
             current_to_allocate = required_current
@@ -729,14 +715,7 @@ class Algorithm:
                     if remaining_current_overshoot != 0:
                         # Ladepunkt darf nicht laden
                         # Zustand von vor dem Lastmanagement wieder herstellen
-                        data.data.counter_data = counter_data_old
-                        data.data.pv_data = pv_data_old
-                        data.data.bat_data = bat_data
-                        data.data.cp_data = cp_data_old
-                        # Beim Wiederherstellen der Kopie wird die Adresse der Kopie zugewiesen, sodass die Adresse des
-                        # LP aktualisiert werden muss,
-                        # um Änderungen in der Klasse vorzunehmen, die das data-Modul referenziert.
-                        chargepoint = data.data.cp_data[f"cp{chargepoint.num}"]
+                        transaction.rollback()
                         # keine weitere Zuteilung
                         message = "Keine Ladung, da das Reduzieren/Abschalten der anderen Ladepunkte nicht ausreicht."
                         log.info("LP "+str(chargepoint.num)+": "+message)
@@ -753,6 +732,7 @@ class Algorithm:
                     str(
                         (chargepoint.data["set"]["charging_ev_data"].data["control_parameter"]["phases"] *
                          chargepoint.data["set"]["current"] * 230)) + "W"))
+            transaction.commit()
             data.data.counter_data[evu_counter].print_stats()
         except Exception:
             log.exception("Fehler im Algorithmus-Modul")
@@ -789,8 +769,7 @@ class Algorithm:
             else:
                 set_current = 0
                 # Zustand merken
-                pv_data_old = copy.deepcopy(data.data.pv_data)
-                cp_data_old = copy.deepcopy(data.data.cp_data)
+                transaction = data.data.begin_transaction("pv_data", "cp_data")
                 # LP mit niedrigerer Priorität abschalten (Reduktion ist bereits zu Beginn des Zyklus erfolgt)
                 for mode_tuple in reversed(self.chargemodes[current_mode_index+1:-4]):
                     mode = mode_tuple[0]
@@ -843,11 +822,11 @@ class Algorithm:
                             except Exception:
                                 log.exception(f"Fehler im Algorithmus-Modul für Ladepunkt{cp.num}")
                         if threshold_reached:
+                            transaction.commit()
                             break
                 else:
                     # Es konnte nicht genug Leistung freigegeben werden.
-                    data.data.pv_data = pv_data_old
-                    data.data.cp_data = cp_data_old
+                    transaction.rollback()
                     log.info("Keine Ladung an LP"+str(chargepoint.num) +
                              ", da das Reduzieren/Abschalten der anderen Ladepunkte nicht ausreicht.")
                     log.debug("Wiederherstellen des Zustands, bevor LP" +
@@ -1,8 +1,7 @@
-import json
 import logging
 import math
-import pathlib
 
+from control import chargelog_store
 from control import data
 from helpermodules.pub import Pub
 from helpermodules import timecheck
@@ -173,24 +172,7 @@ def save_data(chargepoint, charging_ev, immediately=True, reset=False):
             }
         }
 
-        # json-Objekt in Datei einfügen
-        (pathlib.Path(__file__).resolve(
-        ).parents[2] / "data"/"charge_log").mkdir(mode=0o755, parents=True, exist_ok=True)
-        filepath = str(
-            pathlib.Path(__file__).resolve().parents[2] / "data" / "charge_log" /
-            (timecheck.create_timestamp_YYYYMM() + ".json"))
-        try:
-            with open(filepath, "r", encoding="utf-8") as json_file:
-                content = json.load(json_file)
-        except FileNotFoundError:
-            # with open(filepath, "w", encoding="utf-8") as jsonFile:
-            #     json.dump([], jsonFile)
-            # with open(filepath, "r", encoding="utf-8") as jsonFile:
-            #     content = json.load(jsonFile)
-            content = []
-        content.append(new_entry)
-        with open(filepath, "w", encoding="utf-8") as json_file:
-            json.dump(content, json_file)
+        chargelog_store.get_store().add(timecheck.create_timestamp_YYYYMM(), new_entry)
 
         # Werte zurücksetzen
         log_data["timestamp_start_charging"] = None
@@ -224,101 +206,15 @@ def get_log_data(request):
     Parameter
     ---------
     request: dict
-        Infos zum Request: Monat, Jahr, Filter
+        Infos zum Request: Monat, Jahr, Filter. Optional end_year und end_month, um mehrere Monate abzufragen.
     """
     log_data = {"entries": [], "totals": {}}
     try:
-        # Datei einlesen
-        filepath = str(
-            pathlib.Path(__file__).resolve().parents[2] / "data" / "charge_log" /
-            (str(request["year"]) + str(request["month"]) + ".json"))
-        try:
-            with open(filepath, "r", encoding="utf-8") as json_file:
-                chargelog = json.load(json_file)
-        except FileNotFoundError:
+        first_month = str(request["year"]) + str(request["month"])
+        last_month = str(request.get("end_year", request["year"])) + str(request.get("end_month", request["month"]))
+        log_data = chargelog_store.get_store().query(first_month, last_month, request["filter"])
+        if len(log_data["entries"]) == 0:
             log.debug("Kein Ladelog für %s gefunden!" % (str(request)))
-            return log_data
-        # Liste mit gefilterten Einträgen erstellen
-        for entry in chargelog:
-            if len(entry) > 0:
-                if(
-                    "id" in request["filter"]["chargepoint"] and
-                    len(request["filter"]["chargepoint"]["id"]) > 0 and
-                    entry["chargepoint"]["id"] not in request["filter"]["chargepoint"]["id"]
-                ):
-                    log.debug(
-                        "Verwerfe Eintrag wegen Ladepunkt ID: %s != %s" %
-                        (str(entry["chargepoint"]["id"]), str(request["filter"]["chargepoint"]["id"]))
-                    )
-                    continue
-                if(
-                    "id" in request["filter"]["vehicle"] and
-                    len(request["filter"]["vehicle"]["id"]) > 0 and
-                    entry["vehicle"]["id"] not in request["filter"]["vehicle"]["id"]
-                ):
-                    log.debug(
-                        "Verwerfe Eintrag wegen Fahrzeug ID: %s != %s" %
-                        (str(entry["vehicle"]["id"]), str(request["filter"]["vehicle"]["id"]))
-                    )
-                    continue
-                if(
-                    "rfid" in request["filter"]["vehicle"] and
-                    len(request["filter"]["vehicle"]["rfid"]) > 0 and
-                    entry["vehicle"]["rfid"] not in request["filter"]["vehicle"]["rfid"]
-                ):
-                    log.debug(
-                        "Verwerfe Eintrag wegen RFID Tag: %s != %s" %
-                        (str(entry["vehicle"]["rfid"]), str(request["filter"]["vehicle"]["rfid"]))
-                    )
-                    continue
-                if(
-                    "chargemode" in request["filter"]["vehicle"] and
-                    len(request["filter"]["vehicle"]["chargemode"]) > 0 and
-                    entry["vehicle"]["chargemode"] not in request["filter"]["vehicle"]["chargemode"]
-                ):
-                    log.debug(
-                        "Verwerfe Eintrag wegen Lademodus: %s != %s" %
-                        (str(entry["vehicle"]["chargemode"]), str(request["filter"]["vehicle"]["chargemode"]))
-                    )
-                    continue
-                if(
-                    "prio" in request["filter"]["vehicle"] and
-                    request["filter"]["vehicle"]["prio"] is not entry["vehicle"]["prio"]
-                ):
-                    log.debug(
-                        "Verwerfe Eintrag wegen Priorität: %s != %s" %
-                        (str(entry["vehicle"]["prio"]), str(request["filter"]["vehicle"]["prio"]))
-                    )
-                    continue
-
-                # wenn wir hier ankommen, passt der Eintrag zum Filter
-                log_data["entries"].append(entry)
-
-        if len(log_data["entries"]) > 0:
-            # Summen bilden
-            duration = "00:00"
-            range_charged = 0
-            mode = 0
-            plugged = 0
-            power = 0
-            costs = 0
-            for entry in log_data["entries"]:
-                duration = timecheck.duration_sum(
-                    duration, entry["time"]["time_charged"])
-                range_charged += entry["data"]["range_charged"]
-                mode += entry["data"]["imported_since_mode_switch"]
-                plugged += entry["data"]["imported_since_plugged"]
-                power += entry["data"]["power"]
-                costs += entry["data"]["costs"]
-            power = power / len(log_data["entries"])
-            log_data["totals"] = {
-                "time_charged": duration,
-                "range_charged": range_charged,
-                "imported_since_mode_switch": mode,
-                "imported_since_plugged": plugged,
-                "power": power,
-                "costs": costs,
-            }
     except Exception:
         log.exception("Fehler im Ladelog-Modul")
     return log_data
@@ -0,0 +1,172 @@
+""" Ablage des Ladelogs in einer SQLite-Datenbank. Die Spalten, nach denen gefiltert wird, sind indiziert. Zusätzlich
+werden die Summen je Monat und Filterkombination bei jedem Eintrag fortgeschrieben, sodass sie für die Abfrage nicht aus
+den Einträgen berechnet werden müssen.
+Die Filterwerte werden als json-Text gespeichert, damit der Vergleich wie beim json-Ladelog typgenau erfolgt (z.B. RFID
+1234 ungleich "1234", None möglich).
+"""
+from contextlib import closing
+import json
+import logging
+from pathlib import Path
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from helpermodules import timecheck
+
+log = logging.getLogger(__name__)
+
+CHARGE_LOG_FOLDER = Path(__file__).resolve().parents[2] / "data" / "charge_log"
+
+# Filter im Request -> Spalte
+FILTER_COLUMNS = ((("chargepoint", "id"), "cp_id"),
+                  (("vehicle", "id"), "vehicle_id"),
+                  (("vehicle", "rfid"), "rfid"),
+                  (("vehicle", "chargemode"), "chargemode"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    month TEXT NOT NULL,
+    cp_id TEXT, vehicle_id TEXT, rfid TEXT, chargemode TEXT, prio TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_cp ON entries (month, cp_id);
+CREATE INDEX IF NOT EXISTS entries_vehicle ON entries (month, vehicle_id);
+CREATE INDEX IF NOT EXISTS entries_rfid ON entries (month, rfid);
+CREATE INDEX IF NOT EXISTS entries_chargemode ON entries (month, chargemode);
+CREATE TABLE IF NOT EXISTS totals (
+    month TEXT NOT NULL,
+    cp_id TEXT NOT NULL, vehicle_id TEXT NOT NULL, rfid TEXT NOT NULL, chargemode TEXT NOT NULL, prio TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    time_charged TEXT NOT NULL,
+    range_charged REAL NOT NULL,
+    imported_since_mode_switch REAL NOT NULL,
+    imported_since_plugged REAL NOT NULL,
+    power REAL NOT NULL,
+    costs REAL NOT NULL,
+    PRIMARY KEY (month, cp_id, vehicle_id, rfid, chargemode, prio)
+);
+CREATE TABLE IF NOT EXISTS migrated (file TEXT PRIMARY KEY);
+"""
+
+
+class ChargelogStore:
+    def __init__(self, folder: Path = CHARGE_LOG_FOLDER) -> None:
+        self.folder = folder
+        self.folder.mkdir(mode=0o755, parents=True, exist_ok=True)
+        self.path = folder / "chargelog.db"
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+        self.migrate()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=10)
+
+    def migrate(self) -> None:
+        """ übernimmt einmalig die Einträge der json-Ladelogs (YYYYMM.json). Die Dateien bleiben erhalten.
+        """
+        with closing(self._connect()) as conn:
+            migrated = {row[0] for row in conn.execute("SELECT file FROM migrated")}
+        for path in sorted(self.folder.glob("*.json")):
+            if path.name in migrated:
+                continue
+            try:
+                with open(str(path), "r", encoding="utf-8") as json_file:
+                    entries = json.load(json_file)
+                # Jede Datei in einer eigenen Transaktion, damit eine fehlerhafte Datei nicht teilweise übernommen
+                # wird.
+                with closing(self._connect()) as conn, conn:
+                    for entry in entries:
+                        if len(entry) > 0:
+                            self._insert(conn, path.stem, entry)
+                    conn.execute("INSERT INTO migrated (file) VALUES (?)", (path.name,))
+                log.debug(f"Ladelog {path.name} mit {len(entries)} Einträgen übernommen.")
+            except Exception:
+                log.exception(f"Ladelog {path.name} konnte nicht übernommen werden.")
+
+    def add(self, month: str, entry: Dict) -> None:
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, month, entry)
+
+    def _insert(self, conn: sqlite3.Connection, month: str, entry: Dict) -> None:
+        group = _group(month, entry)
+        conn.execute("INSERT INTO entries (month, cp_id, vehicle_id, rfid, chargemode, prio, entry) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)", group + (json.dumps(entry),))
+        data = entry["data"]
+        row = conn.execute("SELECT time_charged FROM totals WHERE month=? AND cp_id=? AND vehicle_id=? AND rfid=? "
+                           "AND chargemode=? AND prio=?", group).fetchone()
+        if row is None:
+            conn.execute("INSERT INTO totals VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?)",
+                         group + (timecheck.duration_sum("00:00", entry["time"]["time_charged"]),
+                                  data["range_charged"], data["imported_since_mode_switch"],
+                                  data["imported_since_plugged"], data["power"], data["costs"]))
+        else:
+            conn.execute("UPDATE totals SET count=count+1, time_charged=?, range_charged=range_charged+?, "
+                         "imported_since_mode_switch=imported_since_mode_switch+?, "
+                         "imported_since_plugged=imported_since_plugged+?, power=power+?, costs=costs+? "
+                         "WHERE month=? AND cp_id=? AND vehicle_id=? AND rfid=? AND chargemode=? AND prio=?",
+                         (timecheck.duration_sum(row[0], entry["time"]["time_charged"]),
+                          data["range_charged"], data["imported_since_mode_switch"], data["imported_since_plugged"],
+                          data["power"], data["costs"]) + group)
+
+    def query(self, first_month: str, last_month: str, filter: Dict) -> Dict:
+        """ liefert die Einträge und Summen der Monate first_month bis last_month (YYYYMM), die zum Filter passen.
+        """
+        where, params = _where(first_month, last_month, filter)
+        with closing(self._connect()) as conn:
+            entries = [json.loads(row[0]) for row in
+                       conn.execute(f"SELECT entry FROM entries WHERE {where} ORDER BY id", params)]
+            groups = conn.execute(
+                "SELECT count, time_charged, range_charged, imported_since_mode_switch, imported_since_plugged, "
+                f"power, costs FROM totals WHERE {where}", params).fetchall()
+        log_data = {"entries": entries, "totals": {}}
+        if entries:
+            duration = "00:00"
+            count, range_charged, mode, plugged, power, costs = 0, 0, 0, 0, 0, 0
+            for group in groups:
+                count += group[0]
+                duration = timecheck.duration_sum(duration, group[1])
+                range_charged += group[2]
+                mode += group[3]
+                plugged += group[4]
+                power += group[5]
+                costs += group[6]
+            log_data["totals"] = {
+                "time_charged": duration,
+                "range_charged": range_charged,
+                "imported_since_mode_switch": mode,
+                "imported_since_plugged": plugged,
+                "power": power / count,
+                "costs": costs,
+            }
+        return log_data
+
+
+def _group(month: str, entry: Dict) -> Tuple:
+    vehicle = entry["vehicle"]
+    return (month, json.dumps(entry["chargepoint"]["id"]), json.dumps(vehicle["id"]), json.dumps(vehicle.get("rfid")),
+            json.dumps(vehicle["chargemode"]), json.dumps(vehicle["prio"]))
+
+
+def _where(first_month: str, last_month: str, filter: Dict) -> Tuple[str, List]:
+    conditions = ["month BETWEEN ? AND ?"]
+    params: List = [first_month, last_month]
+    for (section, key), column in FILTER_COLUMNS:
+        values: Optional[List] = filter.get(section, {}).get(key)
+        if values is not None and len(values) > 0:
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(json.dumps(value) for value in values)
+    if "prio" in filter.get("vehicle", {}):
+        conditions.append("prio = ?")
+        params.append(json.dumps(filter["vehicle"]["prio"]))
+    return " AND ".join(conditions), params
+
+
+_store: Optional[ChargelogStore] = None
+
+
+def get_store() -> ChargelogStore:
+    global _store
+    if _store is None:
+        _store = ChargelogStore()
+    return _store
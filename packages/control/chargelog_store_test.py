@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from control.chargelog_store import ChargelogStore
+
+
+def entry(cp: int, ev: int, rfid, chargemode: str, prio: bool, imported: float, time_charged: str = "1:30"):
+    return {"chargepoint": {"id": cp, "name": f"LP{cp}"},
+            "vehicle": {"id": ev, "name": f"EV{ev}", "chargemode": chargemode, "prio": prio, "rfid": rfid},
+            "time": {"begin": "01.05.2022 07:43", "end": "01.05.2022 09:13", "time_charged": time_charged},
+            "data": {"range_charged": imported/150, "imported_since_mode_switch": imported,
+                     "imported_since_plugged": imported, "power": 4000, "costs": imported*0.0003}}
+
+
+MAY = [entry(1, 1, "1234", "pv_charging", False, 3000),
+       entry(2, 2, 1234, "instant_charging", True, 6000, "2:45"),
+       entry(1, 2, None, "pv_charging", False, 1000)]
+JUNE = [entry(1, 1, "1234", "pv_charging", False, 5000)]
+
+
+@pytest.fixture
+def store(tmp_path) -> ChargelogStore:
+    (tmp_path / "202205.json").write_text(json.dumps(MAY))
+    store = ChargelogStore(tmp_path)
+    for e in JUNE:
+        store.add("202206", e)
+    return store
+
+
+@pytest.mark.parametrize("filter, expected_entries", [
+    pytest.param({"chargepoint": {}, "vehicle": {}}, MAY, id="ohne Filter"),
+    pytest.param({"chargepoint": {"id": [1]}, "vehicle": {}}, [MAY[0], MAY[2]], id="Ladepunkt"),
+    pytest.param({"chargepoint": {"id": []}, "vehicle": {"id": [2]}}, MAY[1:], id="Fahrzeug"),
+    pytest.param({"chargepoint": {}, "vehicle": {"rfid": ["1234"]}}, [MAY[0]], id="RFID typgenau"),
+    pytest.param({"chargepoint": {}, "vehicle": {"chargemode": ["pv_charging"], "prio": False}}, [MAY[0], MAY[2]],
+                 id="Lademodus und Priorität"),
+])
+def test_query_filter(store: ChargelogStore, filter, expected_entries):
+    # execution
+    log_data = store.query("202205", "202205", filter)
+
+    # evaluation
+    assert log_data["entries"] == expected_entries
+
+
+def test_query_totals_across_months(store: ChargelogStore):
+    # execution
+    log_data = store.query("202205", "202206", {"chargepoint": {"id": [1]}, "vehicle": {}})
+
+    # evaluation
+    assert log_data["entries"] == [MAY[0], MAY[2], JUNE[0]]
+    assert log_data["totals"]["time_charged"] == "4:30"
+    assert log_data["totals"]["imported_since_mode_switch"] == 9000
+    assert log_data["totals"]["power"] == 4000
+
+
+def test_migration_only_once(store: ChargelogStore, tmp_path):
+    # execution
+    ChargelogStore(tmp_path)
+
+    # evaluation
+    assert len(store.query("202205", "202205", {"chargepoint": {}, "vehicle": {}})["entries"]) == 3
+
+
+def test_no_entries(store: ChargelogStore):
+    assert store.query("202207", "202207", {"chargepoint": {}, "vehicle": {}}) == {"entries": [], "totals": {}}
@@ -1,7 +1,7 @@
 """Zähler-Logik
 """
 import logging
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 
 from control import data
 from helpermodules.pub import Pub
@@ -11,6 +11,46 @@ from modules.common.fault_state import FaultStateLevel
 log = logging.getLogger(__name__)
 
 
+class HierarchyIndex:
+    """ Index der Zählerhierarchie, damit die Abfragen im Regelzyklus die Hierarchie nicht jedes Mal rekursiv
+    durchsuchen müssen. Wie bisher werden neben den Elementen der obersten Ebene nur die Elemente unterhalb des ersten
+    Elements (EVU-Zähler) berücksichtigt. Der Index wird nur neu aufgebaut, wenn sich die Hierarchie ändert.
+    """
+
+    def __init__(self, hierarchy: List) -> None:
+        self.source = hierarchy
+        # id -> Eintrag
+        self.entries: Dict[int, Dict] = {}
+        # id -> Eintrag des übergeordneten Elements
+        self.parents: Dict[int, Dict] = {}
+        # id -> Zähler im Pfad zur Spitze, beginnend beim direkt übergeordneten Element
+        self.paths: Dict[int, Tuple[str, ...]] = {}
+        # id -> Ladepunkte in den folgenden Zweigen des Elements
+        self.chargepoints: Dict[int, Tuple[str, ...]] = {}
+        for item in hierarchy:
+            self.entries.setdefault(item["id"], item)
+        if hierarchy:
+            root = hierarchy[0]
+            self.chargepoints[root["id"]] = self.__index_children(root, ())
+
+    def __index_children(self, entry: Dict, path: Tuple[str, ...]) -> Tuple[str, ...]:
+        path = (f"counter{entry['id']}",) + path
+        chargepoints: Tuple[str, ...] = ()
+        for child in entry["children"]:
+            if child["id"] not in self.paths:
+                self.entries.setdefault(child["id"], child)
+                self.parents[child["id"]] = entry
+                self.paths[child["id"]] = path
+            child_chargepoints = self.__index_children(child, path)
+            self.chargepoints.setdefault(child["id"], child_chargepoints)
+            if child["type"] == ComponentType.CHARGEPOINT.value:
+                # Elemente unterhalb eines Ladepunkts werden nicht dem Zähler zugeordnet.
+                chargepoints += (f"cp{child['id']}",)
+            else:
+                chargepoints += child_chargepoints
+        return chargepoints
+
+
 class CounterAll:
     """
     """
@@ -20,9 +60,7 @@ class CounterAll:
                              "home_consumption": 0,
                              "invalid_home_consumption": 0,
                              "daily_yield_home_consumption": 0}}
-        # Hilfsvariablen für die rekursiven Funktionen
-        self.connected_counters = []
-        self.connected_chargepoints = []
+        self._index: Optional[HierarchyIndex] = None
 
     def get_evu_counter(self) -> str:
         return f"counter{self.get_id_evu_counter()}"
@@ -121,8 +159,20 @@ class CounterAll:
 
     # Hierarchie analysieren
 
-    def get_chargepoints_of_counter(self, counter):
-        """ gibt eine Liste der Ladepunkte, die in den folgenden Zweigen des Zählers sind, zurück.
+    def get_hierarchy_index(self) -> HierarchyIndex:
+        index = self._index
+        hierarchy = self.data["get"]["hierarchy"]
+        # Wird die Hierarchie über das Topic neu gesetzt, ist es ein neues Objekt.
+        if index is None or index.source is not hierarchy:
+            index = self._index = HierarchyIndex(hierarchy)
+        return index
+
+    def _hierarchy_changed(self) -> None:
+        self._index = None
+        Pub().pub("openWB/set/counter/get/hierarchy", self.data["get"]["hierarchy"])
+
+    def get_chargepoints_of_counter(self, counter: str) -> Optional[Tuple[str, ...]]:
+        """ gibt die Ladepunkte, die in den folgenden Zweigen des Zählers sind, zurück.
 
         Parameter
         ---------
@@ -131,74 +181,43 @@ class CounterAll:
 
         Return
         ------
-        chargepoints: list
+        chargepoints: tuple
             Ladepunkte, die in den folgenden Zweigen des Zählers sind
         """
-        self.connected_chargepoints.clear()
         try:
+            index = self.get_hierarchy_index()
             if counter == self.get_evu_counter():
-                counter_object = self.data["get"]["hierarchy"][0]
+                return index.chargepoints[self.data["get"]["hierarchy"][0]["id"]]
             else:
-                counter_object = self.__get_entry(
-                    self.data["get"]["hierarchy"][0],
-                    int(counter[7:]),
-                    self.__get_entry_of_element)
-            self._get_all_cp_connected_to_counter(counter_object)
-            return self.connected_chargepoints
+                counter_id = int(counter[7:])
+                if counter_id not in index.paths:
+                    raise KeyError(f"Zähler {counter} ist nicht in der Hierarchie.")
+                return index.chargepoints[counter_id]
         except Exception:
             log.exception("Fehler in der allgemeinen Zähler-Klasse")
             return None
 
-    def _get_all_cp_connected_to_counter(self, child):
-        """ Rekursive Funktion, die alle Ladepunkte ermittelt, die an den angegebenen Zähler angeschlossen sind.
-
-        Parameter
-        ---------
-        child: object
-            Zähler, dessen Ladepunkte ermittelt werden sollen
-        """
-        # Alle Objekte der Ebene durchgehen
-        for child in child["children"]:
-            try:
-                if child["type"] == ComponentType.CHARGEPOINT.value:
-                    self.connected_chargepoints.append(f"cp{child['id']}")
-                # Wenn das Objekt noch Kinder hat, diese ebenfalls untersuchen.
-                elif len(child["children"]) != 0:
-                    self._get_all_cp_connected_to_counter(child)
-            except Exception:
-                log.exception("Fehler in der allgemeinen Zähler-Klasse")
-
-    def get_counters_to_check(self, num: int):
+    def get_counters_to_check(self, num: int) -> Optional[Tuple[str, ...]]:
         """ ermittelt alle Zähler im Zweig des Ladepunkts.
 
         Return
         ------
-        counters: list
-            Liste der gesuchten Zähler
+        counters: tuple
+            gesuchte Zähler, beginnend beim direkt übergeordneten Zähler
         """
         try:
-            self.connected_counters.clear()
-            self.__get_all_counter_in_branch(self.data["get"]["hierarchy"][0], num)
-            return self.connected_counters
+            # Prüfen, ob die Hierarchie ein Element enthält.
+            self.data["get"]["hierarchy"][0]
+            return self.get_hierarchy_index().paths.get(num, ())
         except Exception:
             log.exception("Fehler in der allgemeinen Zähler-Klasse")
             return None
 
     def get_entry_of_element(self, id_to_find: int) -> Dict:
-        item = self.__is_id_in_top_level(id_to_find)
-        if item:
-            return item
-        else:
-            return self.__get_entry(self.data["get"]["hierarchy"][0], id_to_find, self.__get_entry_of_element)
+        return self.get_hierarchy_index().entries.get(id_to_find, {})
 
     def get_entry_of_parent(self, id_to_find: int) -> Dict:
-        if self.__is_id_in_top_level(id_to_find):
-            return {}
-        for child in self.data["get"]["hierarchy"][0]["children"]:
-            if child["id"] == id_to_find:
-                return self.data["get"]["hierarchy"][0]
-        else:
-            return self.__get_entry(self.data["get"]["hierarchy"][0], id_to_find, self.__get_entry_of_parent)
+        return self.get_hierarchy_index().parents.get(id_to_find, {})
 
     def __is_id_in_top_level(self, id_to_find: int) -> Dict:
         for item in self.data["get"]["hierarchy"]:
@@ -207,66 +226,13 @@ class CounterAll:
         else:
             return {}
 
-    def __get_all_counter_in_branch(self, child: Dict, id_to_find: int):
-        """ Rekursive Funktion, die alle Zweige durchgeht, bis der entsprechende Ladepunkt gefunden wird und dann alle
-        Zähler in diesem Pfad der Liste anhängt.
-
-        Parameter
-        ---------
-        child: object
-            Zweig, der als nächstes durchsucht werden soll
-        num: int
-            Nummer des gesuchten Ladepunkts/Zählers
-
-        Return
-        ------
-        True/False: Ladepunkt wurde gefunden.
-        """
-        parent_id = child["id"]
-        for child in child["children"]:
-            if child["id"] == id_to_find:
-                self.connected_counters.append(f"counter{parent_id}")
-                return True
-            if len(child["children"]) != 0:
-                found = self.__get_all_counter_in_branch(child, id_to_find)
-                if found:
-                    self.connected_counters.append(f"counter{parent_id}")
-                    return True
-        else:
-            return False
-
-    def __get_entry(self, child: Dict, id_to_find: int, func: Callable[[Dict, int], bool]) -> Dict:
-        for child in child["children"]:
-            found = func(child, id_to_find)
-            if found:
-                return child
-            if len(child["children"]) != 0:
-                entry = self.__get_entry(child, id_to_find, func)
-                if entry:
-                    return entry
-        else:
-            return {}
-
-    def __get_entry_of_element(self, child: Dict, id_to_find: int) -> bool:
-        if child["id"] == id_to_find:
-            return True
-        else:
-            return False
-
-    def __get_entry_of_parent(self, child: Dict, id_to_find: int) -> bool:
-        for child2 in child["children"]:
-            if child2["id"] == id_to_find:
-                return True
-        else:
-            return False
-
     def hierarchy_add_item_aside(self, new_id: int, new_type: ComponentType, id_to_find: int) -> None:
         """ ruft die rekursive Funktion zum Hinzufügen eines Zählers oder Ladepunkts in die Zählerhierarchie auf
         derselben Ebene wie das angegebene Element.
         """
         if self.__is_id_in_top_level(id_to_find):
             self.data["get"]["hierarchy"].append({"id": new_id, "type": new_type.value, "children": []})
-            Pub().pub("openWB/set/counter/get/hierarchy", self.data["get"]["hierarchy"])
+            self._hierarchy_changed()
         else:
             if (self.__edit_element_in_hierarchy(
                     self.data["get"]["hierarchy"][0],
@@ -277,7 +243,7 @@ class CounterAll:
             self, child: Dict, current_entry: Dict, id_to_find: int, new_id: int, new_type: ComponentType) -> bool:
         if id_to_find == child["id"]:
             current_entry["children"].append({"id": new_id, "type": new_type.value, "children": []})
-            Pub().pub("openWB/set/counter/get/hierarchy", self.data["get"]["hierarchy"])
+            self._hierarchy_changed()
             return True
         else:
             return False
@@ -291,7 +257,7 @@ class CounterAll:
             if keep_children:
                 self.data["get"]["hierarchy"].extend(item["children"])
             self.data["get"]["hierarchy"].remove(item)
-            Pub().pub("openWB/set/counter/get/hierarchy", self.data["get"]["hierarchy"])
+            self._hierarchy_changed()
         else:
             if (self.__edit_element_in_hierarchy(
                     self.data["get"]["hierarchy"][0],
@@ -303,7 +269,7 @@ class CounterAll:
             if keep_children:
                 current_entry["children"].extend(child["children"])
             current_entry["children"].remove(child)
-            Pub().pub("openWB/set/counter/get/hierarchy", self.data["get"]["hierarchy"])
+            self._hierarchy_changed()
             return True
         else:
             return False
@@ -314,7 +280,7 @@ class CounterAll:
         item = self.__is_id_in_top_level(id_to_find)
         if item:
             item["children"].append({"id": new_id, "type": new_type.value, "children": []})
-            Pub().pub("openWB/set/counter/get/hierarchy", self.data["get"]["hierarchy"])
+            self._hierarchy_changed()
         else:
             if (self.__edit_element_in_hierarchy(
                     self.data["get"]["hierarchy"][0],
@@ -324,7 +290,7 @@ class CounterAll:
     def _add_item_below(self, child: Dict, current_entry: Dict, id_to_find: int, new_id: int, new_type: ComponentType):
         if id_to_find == child["id"]:
             child["children"].append({"id": new_id, "type": new_type.value, "children": []})
-            Pub().pub("openWB/set/counter/get/hierarchy", self.data["get"]["hierarchy"])
+            self._hierarchy_changed()
             return True
         else:
             return False
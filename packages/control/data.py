@@ -2,256 +2,327 @@
 Dictionary: Zugriff erfolgt bei Dictionary über Keys, nicht über Indizes wie bei Listen. Das hat den Vorteil, dass
 Instanzen gelöscht werden können, der Zugriff aber nicht verändert werden muss.
 """
+import copy
 import logging
 import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from helpermodules import logger
+from helpermodules.pub import Pub
 
 log = logging.getLogger(__name__)
 
 data = None
 
 
-class Data:
-    def __init__(self):
-        self.event = threading.Event()
-        self.event.set()
-        self._bat_data = {}
-        self._bat_module_data = {}
-        self._counter_data = {}
-        self._counter_module_data = {}
-        self._cp_data = {}
-        self._cp_template_data = {}
-        self._ev_charge_template_data = {}
-        self._ev_data = {}
-        self._ev_template_data = {}
-        self._general_data = {}
-        self._graph_data = {}
-        self._optional_data = {}
-        self._pv_data = {}
-        self._system_data = {}
-
-    # getter-Funktion, der Zugriff erfolgt wie bei einem Zugriff auf eine öffentliche Variable.
-    @property
-    def bat_data(self):
-        """ gibt die Variable zurück. Durch das Event wird verhindert, das gleichzeitig geschrieben und gelesen wird.
-
-        Return
-        ------
-        temp: Variable
-        """
-        self.event.wait()
-        self.event.clear()
-        temp = self._bat_data
-        self.event.set()
-        return temp
+# Kategorien, deren Objekte der Algorithmus verändert. Die data-Dictionaries dieser Objekte werden beim Zuweisen der
+# Kategorie in JournalDicts umgewandelt.
+JOURNALED_CATEGORIES = ("bat_data", "counter_data", "cp_data", "ev_data", "pv_data")
 
-    @bat_data.setter
-    def bat_data(self, value):
-        """ setzt die Variable. Durch das Event wird verhindert, das gleichzeitig geschrieben und gelesen wird.
+_MISSING = object()
+_CONTAINERS = (dict, list)
+# aktive Transaktion je Thread
+_active = threading.local()
 
-        Parameter
-        ---------
-        value: Wert, der gesetzt werden soll.
+
+class JournalDict(dict):
+    """ Dictionary, das bei einer aktiven Transaktion im schreibenden Thread vor dem ersten Schreibzugriff auf einen
+    Key den bisherigen Wert im Undo-Log der Transaktion festhält. Zugewiesene Dictionaries werden ebenfalls in
+    JournalDicts umgewandelt, sodass auch Schreibzugriffe auf diese erfasst werden.
+    """
+    __slots__ = ()
+
+    def __setitem__(self, key, value) -> None:
+        _record(self, key)
+        super().__setitem__(key, _journaled(value))
+
+    def __delitem__(self, key) -> None:
+        _record(self, key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        _record(self, key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        if not self:
+            return super().popitem()
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return super().__getitem__(key)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        for key in list(self):
+            del self[key]
+
+    def __copy__(self) -> "JournalDict":
+        return JournalDict(self)
+
+    def __deepcopy__(self, memo: Dict) -> "JournalDict":
+        # Die Kopie wird ohne __setitem__ befüllt, damit sie nicht im Undo-Log einer Transaktion landet.
+        copied = JournalDict()
+        memo[id(self)] = copied
+        dict.update(copied, ((copy.deepcopy(k, memo), copy.deepcopy(v, memo)) for k, v in self.items()))
+        return copied
+
+
+def _record(target: JournalDict, key) -> None:
+    transaction = getattr(_active, "transaction", None)
+    if transaction is not None:
+        transaction.record(target, key)
+
+
+def _journaled(value, memo: Optional[Dict[int, JournalDict]] = None):
+    """ wandelt Dictionaries (auch in Listen) in JournalDicts um."""
+    if type(value) is dict:
+        if memo is None:
+            memo = {}
+        if id(value) not in memo:
+            converted = memo[id(value)] = JournalDict()
+            dict.update(converted, {k: _journaled(v, memo) if type(v) in _CONTAINERS else v
+                                    for k, v in value.items()})
+        return memo[id(value)]
+    elif type(value) is list and any(type(v) in _CONTAINERS for v in value):
+        return [_journaled(v, memo) for v in value]
+    else:
+        return value
+
+
+class Transaction:
+    """ Undo-Log für die Daten, die der Algorithmus beim Zuteilen des Stroms verändert. Beim Start werden nur die
+    Attribute der Objekte und die Einträge der Kategorien festgehalten. Von den data-Dictionaries wird jeweils vor dem
+    ersten Schreibzugriff auf einen Key der bisherige Wert festgehalten (JournalDict), sodass der Aufwand von der Anzahl
+    der Änderungen und nicht von der Größe der Daten abhängt. Beim Zurücksetzen werden die Dictionaries an Ort und
+    Stelle wiederhergestellt, sodass Referenzen auf die Ladepunkte, Zähler, etc gültig bleiben.
+    Je Thread ist nur eine Transaktion aktiv, eine neue Transaktion beendet eine nicht abgeschlossene.
+    """
+
+    def __init__(self, data: "Data", categories: Tuple[str, ...], objects: List) -> None:
+        self._data = data
+        self._categories = [(category, getattr(data._state, category)) for category in categories]
+        self._entries = [(mapping, dict(mapping)) for _, mapping in self._categories]
+        self._attributes = [(obj, dict(vars(obj))) for obj in objects]
+        # Objekte, deren Daten nicht über eine Kategorie zugewiesen wurden, werden wie bisher kopiert.
+        memo: Dict[int, object] = {}
+        self._copies = [(obj, _copy_structure(obj.data, memo))
+                        for obj in objects if not isinstance(obj.data, JournalDict)]
+        self._seen = set()
+        self._journal: List[Tuple[JournalDict, object, object]] = []
+        _active.transaction = self
+
+    def record(self, target: JournalDict, key) -> None:
+        entry = (id(target), key)
+        if entry not in self._seen:
+            self._seen.add(entry)
+            self._journal.append((target, key, dict.get(target, key, _MISSING)))
+
+    def commit(self) -> None:
+        self._end()
+
+    def rollback(self) -> None:
+        if getattr(_active, "transaction", None) is not self:
+            return
+        _active.transaction = None
+        for obj, saved in self._attributes:
+            attributes = vars(obj)
+            for name in [name for name in attributes if name not in saved]:
+                delattr(obj, name)
+            for name, value in saved.items():
+                if attributes.get(name, _MISSING) is not value:
+                    setattr(obj, name, value)
+        for target, key, value in reversed(self._journal):
+            if value is _MISSING:
+                dict.pop(target, key, None)
+            else:
+                dict.__setitem__(target, key, value)
+        for obj, saved in self._copies:
+            _restore(obj.data, saved)
+        for (category, mapping), (_, saved) in zip(self._categories, self._entries):
+            if len(mapping) != len(saved) or any(mapping.get(k, _MISSING) is not v for k, v in saved.items()):
+                mapping.clear()
+                mapping.update(saved)
+            if getattr(self._data._state, category) is not mapping:
+                self._data._write(**{category: mapping})
+        self._end()
+
+    def _end(self) -> None:
+        if getattr(_active, "transaction", None) is self:
+            _active.transaction = None
+        self._attributes.clear()
+        self._entries.clear()
+        self._copies.clear()
+        self._seen.clear()
+        self._journal.clear()
+
+
+def _copy_structure(value, memo: Dict[int, object]):
+    """ kopiert Dictionaries und Listen, alle anderen Objekte werden als Referenz übernommen."""
+    if isinstance(value, dict):
+        if id(value) not in memo:
+            memo[id(value)] = {k: _copy_structure(v, memo) for k, v in value.items()}
+        return memo[id(value)]
+    elif isinstance(value, list):
+        if id(value) not in memo:
+            memo[id(value)] = [_copy_structure(v, memo) for v in value]
+        return memo[id(value)]
+    else:
+        return value
+
+
+def _restore(target: Dict, saved: Dict) -> None:
+    for key in [k for k in target if k not in saved]:
+        target.pop(key)
+    for key, value in saved.items():
+        current = target.get(key)
+        if isinstance(value, dict) and isinstance(current, dict) and current is not value:
+            _restore(current, value)
+        else:
+            target[key] = value
+
+
+class _State(NamedTuple):
+    """ unveränderlicher Stand der Referenzen auf die Dictionaries. Lesende greifen immer auf einen vollständigen
+    Stand zu, Schreibende ersetzen ihn als Ganzes.
+    """
+    bat_data: Dict = {}
+    bat_module_data: Dict = {}
+    counter_data: Dict = {}
+    counter_module_data: Dict = {}
+    cp_data: Dict = {}
+    cp_template_data: Dict = {}
+    ev_charge_template_data: Dict = {}
+    ev_data: Dict = {}
+    ev_template_data: Dict = {}
+    general_data: Dict = {}
+    graph_data: Dict = {}
+    optional_data: Dict = {}
+    pv_data: Dict = {}
+    system_data: Dict = {}
+
+
+class Contention:
+    """ Zähler für Zugriffskonflikte. Das Lock ist unabhängig vom Lock für die Schreibzugriffe, sodass Lesende nicht
+    auf Schreibende warten.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Schreibzugriffe, die auf einen anderen Schreibzugriff warten mussten
+        self.writers = 0
+        # Lesezugriffe während eines Schreibzugriffs, die den vorherigen Stand erhalten haben
+        self.readers = 0
+
+    def add_writer(self) -> None:
+        with self._lock:
+            self.writers += 1
+
+    def add_reader(self) -> None:
+        with self._lock:
+            self.readers += 1
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {"writers": self.writers, "readers": self.readers}
+
+
+def _category(name: str) -> property:
+    """ erzeugt die Property für eine Kategorie. Der Getter liest nur die aktuelle Referenz auf den Stand und
+    blockiert daher nie. Der Setter erzeugt einen neuen Stand und tauscht die Referenz aus.
+    """
+    def getter(self: "Data"):
+        if self._writing:
+            self.contention.add_reader()
+        return getattr(self._state, name)
+
+    def setter(self: "Data", value) -> None:
+        if name in JOURNALED_CATEGORIES:
+            for obj in _objects(value):
+                if type(obj.data) is dict:
+                    obj.data = _journaled(obj.data)
+        self._write(**{name: value})
+    return property(getter, setter)
+
+
+def _objects(mapping: Dict) -> Iterator:
+    """ liefert die Objekte einer Kategorie mit data-Dictionary. Bei Ladepunkten auch das zugeordnete EV."""
+    for value in mapping.values():
+        if hasattr(value, "data"):
+            yield value
+            try:
+                charging_ev = value.data["set"]["charging_ev_data"]
+                if hasattr(charging_ev, "data"):
+                    yield charging_ev
+            except (KeyError, TypeError):
+                pass
+
+
+class Data:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._writing = False
+        self._state = _State(**{field: {} for field in _State._fields})
+        self.contention = Contention()
+
+    def _write(self, **values) -> None:
+        if not self._lock.acquire(blocking=False):
+            self.contention.add_writer()
+            self._lock.acquire()
+        try:
+            self._writing = True
+            self._state = self._state._replace(**values)
+        finally:
+            self._writing = False
+            self._lock.release()
+
+    # Der Zugriff erfolgt wie bei einem Zugriff auf eine öffentliche Variable.
+    bat_data = _category("bat_data")
+    bat_module_data = _category("bat_module_data")
+    counter_data = _category("counter_data")
+    counter_module_data = _category("counter_module_data")
+    cp_data = _category("cp_data")
+    cp_template_data = _category("cp_template_data")
+    ev_charge_template_data = _category("ev_charge_template_data")
+    ev_data = _category("ev_data")
+    ev_template_data = _category("ev_template_data")
+    general_data = _category("general_data")
+    graph_data = _category("graph_data")
+    optional_data = _category("optional_data")
+    pv_data = _category("pv_data")
+    system_data = _category("system_data")
+
+    def pub_contention(self) -> None:
+        log.debug(f"Zugriffskonflikte auf data: {self.contention.to_dict()}")
+        Pub().pub("openWB/system/perf/data_contention", self.contention.to_dict())
+
+    def begin_transaction(self, *categories: str) -> Transaction:
+        """ startet eine Transaktion für die angegebenen Kategorien (z.B. "cp_data"). Bei Ladepunkten werden auch die
+        zugeordneten EVs berücksichtigt.
         """
-        self.event.wait()
-        self.event.clear()
-        self._bat_data = value
-        self.event.set()
-
-    @property
-    def graph_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._graph_data
-        self.event.set()
-        return temp
-
-    @graph_data.setter
-    def graph_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._graph_data = value
-        self.event.set()
-
-    @property
-    def counter_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._counter_data
-        self.event.set()
-        return temp
-
-    @counter_data.setter
-    def counter_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._counter_data = value
-        self.event.set()
-
-    @property
-    def counter_module_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._counter_module_data
-        self.event.set()
-        return temp
-
-    @counter_module_data.setter
-    def counter_module_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._counter_module_data = value
-        self.event.set()
-
-    @property
-    def cp_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._cp_data
-        self.event.set()
-        return temp
-
-    @cp_data.setter
-    def cp_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._cp_data = value
-        self.event.set()
-
-    @property
-    def cp_template_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._cp_template_data
-        self.event.set()
-        return temp
-
-    @cp_template_data.setter
-    def cp_template_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._cp_template_data = value
-        self.event.set()
-
-    @property
-    def ev_charge_template_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._ev_charge_template_data
-        self.event.set()
-        return temp
-
-    @ev_charge_template_data.setter
-    def ev_charge_template_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._ev_charge_template_data = value
-        self.event.set()
-
-    @property
-    def ev_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._ev_data
-        self.event.set()
-        return temp
-
-    @ev_data.setter
-    def ev_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._ev_data = value
-        self.event.set()
-
-    @property
-    def ev_template_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._ev_template_data
-        self.event.set()
-        return temp
-
-    @ev_template_data .setter
-    def ev_template_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._ev_template_data = value
-        self.event.set()
-
-    @property
-    def general_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._general_data
-        self.event.set()
-        return temp
-
-    @general_data.setter
-    def general_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._general_data = value
-        self.event.set()
-
-    @property
-    def optional_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._optional_data
-        self.event.set()
-        return temp
-
-    @optional_data.setter
-    def optional_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._optional_data = value
-        self.event.set()
-
-    @property
-    def pv_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._pv_data
-        self.event.set()
-        return temp
-
-    @pv_data.setter
-    def pv_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._pv_data = value
-        self.event.set()
-
-    @property
-    def system_data(self):
-        self.event.wait()
-        self.event.clear()
-        temp = self._system_data
-        self.event.set()
-        return temp
-
-    @system_data.setter
-    def system_data(self, value):
-        self.event.wait()
-        self.event.clear()
-        self._system_data = value
-        self.event.set()
+        objects = {}
+        for category in categories:
+            for obj in _objects(getattr(self._state, category)):
+                objects[id(obj)] = obj
+        return Transaction(self, categories, list(objects.values()))
 
     def print_all(self):
-        self._print_dictionaries(self._bat_data)
-        self._print_dictionaries(self._bat_module_data)
-        self._print_dictionaries(self._cp_data)
-        self._print_dictionaries(self._cp_template_data)
-        self._print_dictionaries(self._counter_data)
-        self._print_dictionaries(self._counter_module_data)
-        self._print_dictionaries(self._ev_charge_template_data)
-        self._print_dictionaries(self._ev_data)
-        self._print_dictionaries(self._ev_template_data)
-        self._print_dictionaries(self._general_data)
-        self._print_dictionaries(self._graph_data)
-        self._print_dictionaries(self._optional_data)
-        self._print_dictionaries(self._pv_data)
-        self._print_dictionaries(self._system_data)
+        # Die Dictionaries werden nur in Text umgewandelt, wenn sie in main.log geschrieben werden.
+        if logger.is_debug_logged() is False:
+            return
+        state = self._state
+        for category in state:
+            self._print_dictionaries(category)
         log.debug("\n")
 
     def _print_dictionaries(self, data):
@@ -265,12 +336,12 @@ class Data:
             try:
                 if not isinstance(data[key], dict):
                     try:
-                        log.debug(key+"\n"+str(data[key].data))
+                        log.debug("%s\n%s", key, str(data[key].data))
                     except AttributeError:
                         # Devices haben kein data-Dict
                         pass
                 else:
-                    log.debug(key+"\n"+"Klasse fehlt")
+                    log.debug("%s\nKlasse fehlt", key)
             except Exception:
                 log.exception("Fehler im Data-Modul")
 
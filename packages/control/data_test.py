@@ -0,0 +1,151 @@
+import threading
+import time
+from unittest.mock import Mock
+
+from control import data
+from control.chargepoint import Chargepoint
+from control.counter import Counter
+from control.ev import Ev
+
+
+def test_rollback_restores_in_place():
+    # setup
+    data.data_init()
+    cp = Chargepoint(1)
+    ev = Ev(0)
+    ev.data["control_parameter"] = {"required_current": 16}
+    cp.data["set"]["current"] = 6
+    cp.data["set"]["charging_ev_data"] = ev
+    counter = Counter(0)
+    counter.data["set"] = {"currents_used": [10, 10, 10]}
+    data.data.cp_data = {"cp1": cp}
+    data.data.counter_data = {"counter0": counter}
+    set_dict = cp.data["set"]
+
+    # execution
+    transaction = data.data.begin_transaction("cp_data", "counter_data")
+    cp.data["set"]["current"] = 16
+    cp.data["set"]["phases_to_use"] = 3
+    ev.data["control_parameter"]["required_current"] = 6
+    counter.data["set"]["currents_used"] = [20, 20, 20]
+    transaction.rollback()
+
+    # evaluation
+    assert data.data.cp_data["cp1"] is cp
+    assert cp.data["set"] is set_dict
+    assert cp.data["set"]["current"] == 6
+    assert "phases_to_use" not in cp.data["set"]
+    assert cp.data["set"]["charging_ev_data"] is ev
+    assert ev.data["control_parameter"]["required_current"] == 16
+    assert counter.data["set"]["currents_used"] == [10, 10, 10]
+
+
+def test_commit_keeps_changes():
+    # setup
+    data.data_init()
+    counter = Counter(0)
+    counter.data["set"] = {"consumption_left": 1000}
+    data.data.counter_data = {"counter0": counter}
+
+    # execution
+    transaction = data.data.begin_transaction("counter_data")
+    counter.data["set"]["consumption_left"] = 500
+    transaction.commit()
+    transaction.rollback()
+
+    # evaluation
+    assert counter.data["set"]["consumption_left"] == 500
+
+
+def test_readers_do_not_block_during_write():
+    # setup
+    data.data_init()
+    old = {"counter0": Counter(0)}
+    data.data.counter_data = old
+    new = {"counter1": Counter(1)}
+    writer = threading.Thread(target=setattr, args=(data.data, "counter_data", new))
+
+    # execution
+    with data.data._lock:
+        # Schreibzugriff läuft
+        data.data._writing = True
+        writer.start()
+        while data.data.contention.writers == 0:
+            time.sleep(0.001)
+        read_during_write = data.data.counter_data
+        data.data._writing = False
+    writer.join()
+
+    # evaluation
+    assert read_during_write is old
+    assert data.data.counter_data is new
+    assert data.data.contention.to_dict() == {"writers": 1, "readers": 1}
+
+
+def test_only_written_keys_are_journaled():
+    # setup
+    data.data_init()
+    cp = Chargepoint(1)
+    cp.data["set"]["current"] = 6
+    data.data.cp_data = {"cp1": cp}
+    log_dict = cp.data["set"]["log"]
+
+    # execution
+    transaction = data.data.begin_transaction("cp_data")
+    cp.data["set"]["current"] = 10
+    cp.data["set"]["current"] = 16
+    cp.data["set"]["log"] = {"imported_since_mode_switch": 0}
+    cp.data["set"]["log"]["imported_since_mode_switch"] = 100
+    journal = len(transaction._journal)
+    transaction.rollback()
+
+    # evaluation
+    # current nur beim ersten Schreibzugriff, log und der Key im neuen Dictionary
+    assert journal == 3
+    assert cp.data["set"]["current"] == 6
+    assert cp.data["set"]["log"] is log_dict
+
+
+def test_rollback_restores_attributes_and_categories():
+    # setup
+    data.data_init()
+    cp = Chargepoint(1)
+    template = Mock()
+    cp.template = template
+    cp_data = {"cp1": cp}
+    data.data.cp_data = cp_data
+
+    # execution
+    transaction = data.data.begin_transaction("cp_data")
+    cp.template = Mock()
+    cp.added = True
+    data.data.cp_data["cp2"] = Chargepoint(2)
+    data.data.cp_data = {"cp1": cp}
+    transaction.rollback()
+
+    # evaluation
+    assert cp.template is template
+    assert not hasattr(cp, "added")
+    assert data.data.cp_data is cp_data
+    assert list(cp_data) == ["cp1"]
+
+
+def test_writes_of_other_threads_are_kept():
+    # setup
+    data.data_init()
+    counter = Counter(0)
+    counter.data["get"] = {"power": 100}
+    counter.data["set"] = {"consumption_left": 1000}
+    data.data.counter_data = {"counter0": counter}
+
+    # execution
+    transaction = data.data.begin_transaction("counter_data")
+    counter.data["set"]["consumption_left"] = 500
+    writer = threading.Thread(target=counter.data["get"].__setitem__, args=("power", 200))
+    writer.start()
+    writer.join()
+    transaction.rollback()
+
+    # evaluation
+    assert counter.data["set"]["consumption_left"] == 1000
+    assert counter.data["get"]["power"] == 200
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional, Union
+import copy
+from typing import Dict, List, Optional, Tuple, Union
 import pytest
 from unittest.mock import Mock
 
@@ -62,7 +63,7 @@ class ParamsItem:
     def __init__(self, name: str,
                  counter_all: CounterAll,
                  id,
-                 expected_return: Optional[Union[List, Dict]] = None,
+                 expected_return: Optional[Union[Tuple, Dict]] = None,
                  expected_hierarchy: Optional[List] = None) -> None:
         self.name = name
         self.counter_all = counter_all
@@ -136,8 +137,8 @@ def test_delete_discard_children(params: ParamsItem):
 
 
 cases_get_chargepoints_of_counter = [
-    ParamsItem("get_chargepoints_of_counter", hierarchy_cp(), "counter2", expected_return=["cp3", "cp5", "cp6"]),
-    ParamsItem("get_chargepoints_of_counter", hierarchy_two_level(), "counter0", expected_return=["cp2"])
+    ParamsItem("get_chargepoints_of_counter", hierarchy_cp(), "counter2", expected_return=("cp3", "cp5", "cp6")),
+    ParamsItem("get_chargepoints_of_counter", hierarchy_two_level(), "counter0", expected_return=("cp2",))
 ]
 
 
@@ -153,8 +154,8 @@ def test_get_chargepoints_of_counter(params: ParamsItem):
 
 
 cases_get_counters_to_check = [
-    ParamsItem("get_counters_to_check", hierarchy_cp(), 5, expected_return=["counter4", "counter2", "counter0"]),
-    ParamsItem("get_counters_to_check", hierarchy_two_level(), 2, expected_return=["counter0"])
+    ParamsItem("get_counters_to_check", hierarchy_cp(), 5, expected_return=("counter4", "counter2", "counter0")),
+    ParamsItem("get_counters_to_check", hierarchy_two_level(), 2, expected_return=("counter0",))
 ]
 
 
@@ -207,6 +208,39 @@ def test_get_entry_of_parent(params: ParamsItem):
     assert actual == params.expected_return
 
 
+def test_index_follows_hierarchy_changes():
+    # setup
+    c = hierarchy_cp()
+    assert c.get_chargepoints_of_counter("counter4") == ("cp5", "cp6")
+
+    # execution
+    c.hierarchy_add_item_below(8, ComponentType.CHARGEPOINT, 4)
+    added = c.get_chargepoints_of_counter("counter4")
+    c.hierarchy_remove_item(2, keep_children=False)
+    removed = c.get_counters_to_check(5)
+    c.data["get"]["hierarchy"] = [{"id": 0, "type": "counter", "children": [{"id": 5, "type": "cp", "children": []}]}]
+    replaced = c.get_counters_to_check(5)
+
+    # evaluation
+    assert added == ("cp5", "cp6", "cp8")
+    assert removed == ()
+    assert replaced == ("counter0",)
+
+
+def test_index_survives_deepcopy():
+    # setup
+    c = hierarchy_cp()
+    index = c.get_hierarchy_index()
+
+    # execution
+    copied = copy.deepcopy(c)
+
+    # evaluation
+    assert copied.get_hierarchy_index() is not index
+    assert copied.get_hierarchy_index() is copied._index
+    assert copied.get_entry_of_parent(5) is copied.data["get"]["hierarchy"][0]["children"][1]["children"][1]
+
+
 def test_empty_hierarchy():
     # execution
     c = hierarchy_empty()
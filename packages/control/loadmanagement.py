@@ -9,7 +9,7 @@ Information, welche LP-Phase an welche EVU-Phase angeschlossen ist, nicht. Beim
 auf allen 3 Phasen geprüft, ob genug Leistung/Stromstärke verfügbar ist.
 """
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from control import data
 from control.chargepoint import Chargepoint
@@ -25,6 +25,118 @@ overloaded_counters = {}
 # phase_with_max_overshoot = 1-3 -> Phase, auf der die Überlastung auftritt
 
 
+class CounterHeadroom:
+    """ Reserven eines Zählers im Regelzyklus: verbleibende Stromstärke je Phase, verbleibende Leistung und
+    verbleibende Schieflast. Die Reserven werden beim Aufbau des Ledgers einmal berechnet und bei jeder Zuteilung
+    fortgeschrieben. Die Zuteilungen werden direkt in data["set"] des Zählers geschrieben, damit alle anderen Module
+    und das Zurücksetzen einer Transaktion (data.Transaction.rollback) den aktuellen Stand sehen. Die Reserven der
+    Phasen gehören zu der Liste currents_used, aus der sie berechnet wurden. Ist in data["set"] eine andere Liste
+    hinterlegt (z.B. nach dem Zurücksetzen), werden sie neu berechnet.
+    """
+
+    def __init__(self, counter_data: Dict, chargemode_config: Optional[Dict]) -> None:
+        self.set_data = counter_data["set"]
+        self.max_currents: Optional[List[float]] = counter_data.get("config", {}).get("max_currents")
+        if chargemode_config is not None and chargemode_config["unbalanced_load"]:
+            self.unbalanced_load_limit: Optional[float] = chargemode_config["unbalanced_load_limit"]
+        else:
+            self.unbalanced_load_limit = None
+        self._update(self.set_data.get("currents_used"))
+
+    @property
+    def currents_used(self) -> Optional[List[float]]:
+        return self.set_data.get("currents_used")
+
+    @property
+    def consumption_left(self) -> float:
+        """ verbleibende Leistung"""
+        return self.set_data["consumption_left"]
+
+    @property
+    def remaining_currents(self) -> Optional[Tuple[float, float, float]]:
+        """ verbleibende Stromstärke je Phase ohne Offset, None, wenn keine Ströme vorliegen."""
+        currents_used = self.set_data.get("currents_used")
+        if currents_used is not self._currents_used:
+            self._update(currents_used)
+        return self._remaining_currents
+
+    @property
+    def unbalanced_load_slack(self) -> Optional[float]:
+        """ verbleibende zulässige Schieflast ohne Offset, None, wenn die Begrenzung nicht aktiv ist."""
+        currents_used = self.set_data.get("currents_used")
+        if currents_used is not self._currents_used:
+            self._update(currents_used)
+        return self._unbalanced_load_slack
+
+    def book_currents(self, currents_used: List[float]) -> None:
+        self.set_data["currents_used"] = currents_used
+        self._update(currents_used)
+
+    def book_power(self, required_power: float) -> None:
+        self.set_data["consumption_left"] -= required_power
+
+    def _update(self, currents_used: Optional[List[float]]) -> None:
+        self._currents_used = currents_used
+        if not currents_used or self.max_currents is None:
+            self._remaining_currents = None
+        else:
+            max_currents = self.max_currents
+            self._remaining_currents = (max_currents[0] - currents_used[0],
+                                        max_currents[1] - currents_used[1],
+                                        max_currents[2] - currents_used[2])
+        if self.unbalanced_load_limit is None or not currents_used:
+            self._unbalanced_load_slack = None
+        else:
+            self._unbalanced_load_slack = self.unbalanced_load_limit - (
+                max(max(currents_used), 0) - max(min(currents_used), 0))
+
+
+class HeadroomLedger:
+    """ Reserven aller Zähler für einen Regelzyklus. Das Ledger wird einmal je Zyklus nach dem Einrichten der Zähler
+    aufgebaut und bei jeder Zuteilung fortgeschrieben, sodass die Prüfungen für einen Ladepunkt nur die Reserven der
+    Zähler in dessen Pfad nachschlagen müssen.
+    """
+
+    def __init__(self) -> None:
+        # Die EVU und die Konfiguration werden nur einmal je Zyklus ermittelt.
+        try:
+            self.__evu: Optional[str] = data.data.counter_data["all"].get_evu_counter()
+        except Exception:
+            self.__evu = None
+        general = data.data.general_data.get("general")
+        self.chargemode_config: Optional[Dict] = general.data.get("chargemode_config") if general is not None else None
+        self.counter_data = data.data.counter_data
+        # Die Schieflast wird nur am EVU-Zähler geprüft.
+        self.counters = {name: CounterHeadroom(counter.data, self.chargemode_config
+                                               if self.__evu is None or name == self.__evu else None)
+                         for name, counter in self.counter_data.items() if "counter" in name}
+
+    @property
+    def evu(self) -> str:
+        if self.__evu is None:
+            return data.data.counter_data["all"].get_evu_counter()
+        return self.__evu
+
+
+_ledger: Optional[HeadroomLedger] = None
+
+
+def create_ledger() -> HeadroomLedger:
+    """ baut das Ledger für den Regelzyklus auf. Muss nach dem Einrichten der Zähler aufgerufen werden."""
+    global _ledger
+    _ledger = HeadroomLedger()
+    return _ledger
+
+
+def get_ledger() -> HeadroomLedger:
+    """ liefert das Ledger des Regelzyklus. Wurden die Zähler seit dem Aufbau ersetzt (neuer Zyklus), wird es neu
+    aufgebaut.
+    """
+    if _ledger is None or _ledger.counter_data is not data.data.counter_data:
+        return create_ledger()
+    return _ledger
+
+
 def loadmanagement_for_cp(chargepoint: Chargepoint,
                           required_current: float,
                           phases: int) -> Tuple[bool, Dict[str, Tuple[float, int]]]:
@@ -55,12 +167,13 @@ def loadmanagement_for_cp(chargepoint: Chargepoint,
                     chargepoint.data["config"]["phase_1"]+"ist keine gültige Zahl für die angeschlossene Phase (0-3")
         counters = data.data.counter_data["all"].get_counters_to_check(
             chargepoint.num)
+        ledger = get_ledger()
         # Stromstärke merken, wenn das Lastmanagement nicht aktiv wird, wird nach der Prüfung die neue verwendete
         # Stromstärke gesetzt.
         for counter in counters[:-1]:
             try:
                 loadmanagement, overshoot, phase = _check_max_currents(
-                    counter, required_current_phases, phases, True)
+                    ledger.counters[counter], required_current_phases, phases, True)
                 if loadmanagement:
                     loadmanagement_all_conditions = True
                     overloaded_counters[counter] = [overshoot, phase]
@@ -68,7 +181,7 @@ def loadmanagement_for_cp(chargepoint: Chargepoint,
                 log.exception("Fehler im Lastmanagement-Modul "+str(counter))
         # Wenn das Lastmanagement bei den Zwischenzählern aktiv wurde, darf es nicht wieder zurück gesetzt werden.
         loadmanagement = _loadmanagement_for_evu(
-            required_current_phases, phases, True)
+            ledger, required_current_phases, phases, True)
         if loadmanagement:
             loadmanagement_all_conditions = True
 
@@ -91,11 +204,12 @@ def loadmanagement_for_counters() -> Tuple[bool, Dict[str, Tuple[float, int]]]:
     loadmanagement_all_conditions = False
     try:
         # Für den EVU-Zähler max. Leistung, max. Stromstärke und Schieflast überprüfen.
+        ledger = get_ledger()
         loadmanagement_all_conditions = _loadmanagement_for_evu(
-            [0, 0, 0], 3, False)
+            ledger, [0, 0, 0], 3, False)
         # Überprüfung der Zwischenzähler
         loadmanagement = _check_all_intermediate_counters(
-            data.data.counter_data["all"].data["get"]["hierarchy"][0])
+            ledger, data.data.counter_data["all"].data["get"]["hierarchy"][0])
         # Wenn das Lastmanagement aktiv war, darf es nicht wieder zurück gesetzt werden.
         if not loadmanagement_all_conditions:
             loadmanagement_all_conditions = loadmanagement
@@ -110,7 +224,7 @@ def get_overloaded_counters():
     return overloaded_counters
 
 
-def _check_all_intermediate_counters(child):
+def _check_all_intermediate_counters(ledger: HeadroomLedger, child):
     """ Rekursive Funktion, die für alle Zwischenzähler prüft, ob die Maximal-Stromstärke ohne Beachtung des Offsets
     eingehalten wird.
 
@@ -128,13 +242,13 @@ def _check_all_intermediate_counters(child):
             if child["type"] == ComponentType.COUNTER.value:
                 # Wenn Objekt ein Zähler ist, Stromstärke prüfen.
                 loadmanagement, overshoot, phase = _check_max_currents(
-                    f"counter{child['id']}", [0, 0, 0], 3, False)
+                    ledger.counters[f"counter{child['id']}"], [0, 0, 0], 3, False)
                 if loadmanagement:
                     overloaded_counters[f"counter{child['id']}"] = [overshoot, phase]
                     return True
             # Wenn das Objekt noch Kinder hat, diese ebenfalls untersuchen.
             if len(child["children"]) != 0:
-                loadmanagement = _check_all_intermediate_counters(child)
+                loadmanagement = _check_all_intermediate_counters(ledger, child)
                 if loadmanagement:
                     return True
         except Exception:
@@ -146,11 +260,14 @@ def _check_all_intermediate_counters(child):
 # Überprüfen der Werte
 
 
-def _loadmanagement_for_evu(required_current_phases: List[float], phases: int, offset: bool) -> bool:
+def _loadmanagement_for_evu(ledger: HeadroomLedger,
+                            required_current_phases: List[float],
+                            phases: int,
+                            offset: bool) -> bool:
     """ führt die Überprüfung für das Lastmanagement der EVU durch und prüft dabei die maximale Stromstärke, maximalen
     Bezug und maximale Schieflast, falls aktiv.
     """
-    evu_counter = data.data.counter_data["all"].get_evu_counter()
+    evu_counter = ledger.evu
     max_current_overshoot = 0
     max_overshoot_phase = 0
     consumption_left = 0
@@ -159,7 +276,7 @@ def _loadmanagement_for_evu(required_current_phases: List[float], phases: int, o
         # Wenn das Lastmanagement einmal aktiv gesetzt wurde, darf es nicht mehr zurück gesetzt werden.
         loadmanagement_all_conditions = False
         loadmanagement, consumption_left = _check_max_power(
-            sum(required_current_phases) * 230, offset)
+            ledger.counters[evu_counter], sum(required_current_phases) * 230, offset)
         if loadmanagement:
             loadmanagement_all_conditions = True
             if consumption_left >= 0:
@@ -170,7 +287,7 @@ def _loadmanagement_for_evu(required_current_phases: List[float], phases: int, o
                 max_current_overshoot = overshoot
                 max_overshoot_phase = -1
         loadmanagement, overshoot_one_phase, phase = _check_max_currents(
-            evu_counter, required_current_phases, phases, offset)
+            ledger.counters[evu_counter], required_current_phases, phases, offset)
         if loadmanagement:
             loadmanagement_all_conditions = True
             # Wenn phase -1 ist, wurde die maximale Gesamtleistung überschritten und
@@ -181,7 +298,7 @@ def _loadmanagement_for_evu(required_current_phases: List[float], phases: int, o
                 max_current_overshoot = overshoot_one_phase
                 max_overshoot_phase = phase
         loadmanagement, overshoot_one_phase, phase = _check_unbalanced_load(
-            data.data.counter_data[evu_counter].data["set"].get("currents_used"), offset)
+            ledger.chargemode_config, ledger.counters[evu_counter], offset)
         if loadmanagement:
             loadmanagement_all_conditions = True
             # Wenn phase -1 ist, wurde die maximale Gesamtleistung überschritten und
@@ -200,11 +317,13 @@ def _loadmanagement_for_evu(required_current_phases: List[float], phases: int, o
         return False
 
 
-def _check_max_power(required_power, offset):
+def _check_max_power(evu: CounterHeadroom, required_power, offset):
     """ prüft, dass die maximale Leistung nicht überschritten wird.
 
     Parameter
     ---------
+    evu: CounterHeadroom
+        EVU-Zähler
     required_power: int
         benötigte Leistung
     offset: bool
@@ -215,31 +334,29 @@ def _check_max_power(required_power, offset):
         Lastmanagement aktiv/inaktiv, verbleibende verfügbare Leistung inklusive Offset (da beim Anpassen des
         Ladestroms nie der Maximalbezug ausgereizt werden)
     """
-    evu_counter = data.data.counter_data["all"].get_evu_counter()
     if offset:
         offset_power = 300
     else:
         offset_power = 0
     try:
-        consumption_left = data.data.counter_data[evu_counter].data[
-            "set"]["consumption_left"] - required_power - offset_power
-        data.data.counter_data[evu_counter].data["set"]["consumption_left"] -= required_power
+        consumption_left = evu.consumption_left - required_power - offset_power
+        evu.book_power(required_power)
         # Float-Ungenauigkeiten abfangen
         if consumption_left >= -0.01:
-            return False, data.data.counter_data[evu_counter].data["set"]["consumption_left"] - 300
+            return False, evu.consumption_left - 300
         else:
-            return True, data.data.counter_data[evu_counter].data["set"]["consumption_left"] - 300
+            return True, evu.consumption_left - 300
     except Exception:
         log.exception("Fehler im Lastmanagement-Modul")
         return 0, False
 
 
-def _check_max_currents(counter, required_current_phases, phases, offset):
+def _check_max_currents(counter: CounterHeadroom, required_current_phases, phases, offset):
     """ prüft, ob die maximale Stromstärke aller Phasen eingehalten wird.
 
     Parameter
     ---------
-    counter: str
+    counter: CounterHeadroom
         Zähler, der geprüft werden soll
     required_current_phases: list
         Stromstärke, mit der geladen werden soll
@@ -256,7 +373,8 @@ def _check_max_currents(counter, required_current_phases, phases, offset):
     phase: int
         Phase, die den höchsten Strom verbraucht
     """
-    if data.data.counter_data[counter].data["set"].get("currents_used"):
+    currents_used_before = counter.currents_used
+    if currents_used_before:
         currents_used = [0, 0, 0]
         max_current_overshoot = 0
         if offset:
@@ -265,12 +383,12 @@ def _check_max_currents(counter, required_current_phases, phases, offset):
             offset_current = 0
         try:
             loadmanagement = False
+            remaining_currents = counter.remaining_currents
             for phase in range(3):
-                currents_used[phase] = data.data.counter_data[counter].data["set"]["currents_used"][phase] + \
-                    required_current_phases[phase]
+                currents_used[phase] = currents_used_before[phase] + required_current_phases[phase]
                 # Wird die maximal zulässige Stromstärke inklusive des Offsets eingehalten?
-                max_current_of_phase = data.data.counter_data[counter].data["config"]["max_currents"][phase]
-                if (currents_used[phase] > max_current_of_phase - offset_current):
+                if required_current_phases[phase] > remaining_currents[phase] - offset_current:
+                    max_current_of_phase = counter.max_currents[phase]
                     if ((currents_used[phase]-(max_current_of_phase - offset_current)) > max_current_overshoot):
                         max_current_overshoot = currents_used[phase] - max_current_of_phase
                     loadmanagement = True
@@ -287,7 +405,7 @@ def _check_max_currents(counter, required_current_phases, phases, offset):
                         f"Benötigte Stromstärke {required_current_phases} überschreitet ohne Beachtung des Offsets"
                         f" die zulässige Stromstärke an Phase {(currents_used.index(max(currents_used))+1)} um"
                         f" {max_current_overshoot}A.")
-            data.data.counter_data[counter].data["set"]["currents_used"] = currents_used
+            counter.book_currents(currents_used)
             # Wenn Zähler geprüft werden, wird ohne Offset geprüft. Beim Runterregeln soll aber das Offset
             # berücksichtigt werden, um Schwingen zu vermeiden.
             return (loadmanagement,
@@ -300,13 +418,15 @@ def _check_max_currents(counter, required_current_phases, phases, offset):
         return False, 0, 0
 
 
-def _check_unbalanced_load(currents_used, offset) -> Tuple[bool, float, float]:
+def _check_unbalanced_load(chargemode_config: Dict, counter: CounterHeadroom, offset) -> Tuple[bool, float, float]:
     """ prüft, ob die Schieflastbegrenzung aktiv ist und ob diese eingehalten wird.
 
     Parameter
     ---------
-    currents_used: list
-        Strom, der gebraucht wird
+    chargemode_config: dict
+        Konfiguration der Lademodi
+    counter: CounterHeadroom
+        EVU-Zähler
     offset: bool
         Beachtung des Offsets
     Return
@@ -315,28 +435,20 @@ def _check_unbalanced_load(currents_used, offset) -> Tuple[bool, float, float]:
     max_current_overshoot: maximale Überschreitung der Stromstärke
     int: Phase, die den höchsten Strom verbraucht
     """
-    if data.data.general_data["general"].data["chargemode_config"]["unbalanced_load"] and currents_used:
-        max_current_overshoot = 0
+    currents_used = counter.currents_used
+    if chargemode_config["unbalanced_load"] and currents_used:
         if offset:
             offset_current = 1
         else:
             offset_current = 0
         try:
-            min_current = min(currents_used)
-            if min_current < 0:
-                min_current = 0
-            max_current = max(currents_used)
-            if max_current < 0:
-                max_current = 0
-            if ((max_current - min_current) <= data.data.general_data["general"].data["chargemode_config"][
-                    "unbalanced_load_limit"] - offset_current):
+            slack = counter.unbalanced_load_slack
+            if slack >= offset_current:
                 return False, 0, 0
             else:
-                max_current_overshoot = (
-                    max_current - min_current) - \
-                    data.data.general_data["general"].data["chargemode_config"]["unbalanced_load_limit"]
+                max_current_overshoot = -slack
                 log.warning("Schieflast wurde überschritten.")
-                return True, max_current_overshoot + 1, currents_used.index(max_current)+1
+                return True, max_current_overshoot + 1, currents_used.index(max(max(currents_used), 0))+1
         except Exception:
             log.exception("Fehler im Lastmanagement-Modul")
             return False, 0, 0
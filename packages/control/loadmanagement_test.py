@@ -0,0 +1,336 @@
+import copy
+import random
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pytest
+
+from control import data
+from control import loadmanagement
+from control.counter import Counter, CounterAll
+from modules.common.component_type import ComponentType
+
+
+class LegacyLoadmanagement:
+    """ Lastmanagement vor Einführung des Ledgers (ohne Logging) als Referenz. Jede Prüfung liest die Werte erneut
+    aus data.data.
+    """
+
+    def __init__(self) -> None:
+        self.overloaded_counters: Dict = {}
+
+    def for_cp(self, chargepoint, required_current, phases):
+        loadmanagement_all_conditions = False
+        self.overloaded_counters.clear()
+        try:
+            if phases == 3:
+                required_current_phases = [required_current]*3
+            else:
+                if chargepoint.data["config"]["phase_1"] == 0:
+                    required_current_phases = [required_current]*3
+                elif chargepoint.data["config"]["phase_1"] == 1:
+                    required_current_phases = [required_current, 0, 0]
+                elif chargepoint.data["config"]["phase_1"] == 2:
+                    required_current_phases = [0, required_current, 0]
+                elif chargepoint.data["config"]["phase_1"] == 3:
+                    required_current_phases = [0, 0, required_current]
+                else:
+                    raise ValueError(chargepoint.data["config"]["phase_1"])
+            counters = data.data.counter_data["all"].get_counters_to_check(chargepoint.num)
+            for counter in counters[:-1]:
+                try:
+                    loadmanagement, overshoot, phase = self._check_max_currents(
+                        counter, required_current_phases, phases, True)
+                    if loadmanagement:
+                        loadmanagement_all_conditions = True
+                        self.overloaded_counters[counter] = [overshoot, phase]
+                except Exception:
+                    pass
+            loadmanagement = self._loadmanagement_for_evu(required_current_phases, phases, True)
+            if loadmanagement:
+                loadmanagement_all_conditions = True
+            data.data.counter_data["all"].data["set"]["loadmanagement_active"] = loadmanagement_all_conditions
+            return loadmanagement_all_conditions, self.overloaded_counters
+        except Exception:
+            return False, {}
+
+    def for_counters(self):
+        self.overloaded_counters.clear()
+        loadmanagement_all_conditions = False
+        try:
+            loadmanagement_all_conditions = self._loadmanagement_for_evu([0, 0, 0], 3, False)
+            loadmanagement = self._check_all_intermediate_counters(
+                data.data.counter_data["all"].data["get"]["hierarchy"][0])
+            if not loadmanagement_all_conditions:
+                loadmanagement_all_conditions = loadmanagement
+            data.data.counter_data["all"].data["set"]["loadmanagement_active"] = loadmanagement_all_conditions
+            return loadmanagement_all_conditions, self.overloaded_counters
+        except Exception:
+            return False, {}
+
+    def _check_all_intermediate_counters(self, child):
+        for child in child["children"]:
+            try:
+                if child["type"] == ComponentType.COUNTER.value:
+                    loadmanagement, overshoot, phase = self._check_max_currents(
+                        f"counter{child['id']}", [0, 0, 0], 3, False)
+                    if loadmanagement:
+                        self.overloaded_counters[f"counter{child['id']}"] = [overshoot, phase]
+                        return True
+                if len(child["children"]) != 0:
+                    loadmanagement = self._check_all_intermediate_counters(child)
+                    if loadmanagement:
+                        return True
+            except Exception:
+                pass
+        else:
+            return False
+
+    def _loadmanagement_for_evu(self, required_current_phases, phases, offset):
+        evu_counter = data.data.counter_data["all"].get_evu_counter()
+        max_current_overshoot = 0
+        max_overshoot_phase = 0
+        try:
+            loadmanagement_all_conditions = False
+            loadmanagement, consumption_left = self._check_max_power(sum(required_current_phases) * 230, offset)
+            if loadmanagement:
+                loadmanagement_all_conditions = True
+                if consumption_left >= 0:
+                    overshoot = consumption_left / 230 / 3
+                else:
+                    overshoot = (consumption_left*-1) / 230 / 3
+                if max_current_overshoot < overshoot:
+                    max_current_overshoot = overshoot
+                    max_overshoot_phase = -1
+            loadmanagement, overshoot_one_phase, phase = self._check_max_currents(
+                evu_counter, required_current_phases, phases, offset)
+            if loadmanagement:
+                loadmanagement_all_conditions = True
+                if phase == -1:
+                    overshoot_one_phase = overshoot_one_phase * (3 - phases + 1)
+                if max_current_overshoot < overshoot_one_phase:
+                    max_current_overshoot = overshoot_one_phase
+                    max_overshoot_phase = phase
+            loadmanagement, overshoot_one_phase, phase = self._check_unbalanced_load(
+                data.data.counter_data[evu_counter].data["set"].get("currents_used"), offset)
+            if loadmanagement:
+                loadmanagement_all_conditions = True
+                if phase == -1:
+                    overshoot_one_phase = overshoot_one_phase * (3 - phases + 1)
+                if max_current_overshoot < overshoot_one_phase:
+                    max_current_overshoot = overshoot_one_phase
+                    max_overshoot_phase = phase
+            if loadmanagement_all_conditions:
+                self.overloaded_counters[evu_counter] = [max_current_overshoot, max_overshoot_phase]
+            return loadmanagement_all_conditions
+        except Exception:
+            return False
+
+    def _check_max_power(self, required_power, offset):
+        evu_counter = data.data.counter_data["all"].get_evu_counter()
+        offset_power = 300 if offset else 0
+        try:
+            consumption_left = data.data.counter_data[evu_counter].data[
+                "set"]["consumption_left"] - required_power - offset_power
+            data.data.counter_data[evu_counter].data["set"]["consumption_left"] -= required_power
+            if consumption_left >= -0.01:
+                return False, data.data.counter_data[evu_counter].data["set"]["consumption_left"] - 300
+            else:
+                return True, data.data.counter_data[evu_counter].data["set"]["consumption_left"] - 300
+        except Exception:
+            return 0, False
+
+    def _check_max_currents(self, counter, required_current_phases, phases, offset):
+        if data.data.counter_data[counter].data["set"].get("currents_used"):
+            currents_used = [0, 0, 0]
+            max_current_overshoot = 0
+            offset_current = 300 / 230 / phases if offset else 0
+            try:
+                loadmanagement = False
+                for phase in range(3):
+                    currents_used[phase] = data.data.counter_data[counter].data["set"]["currents_used"][phase] + \
+                        required_current_phases[phase]
+                    max_current_of_phase = data.data.counter_data[counter].data["config"]["max_currents"][phase]
+                    if (currents_used[phase] > max_current_of_phase - offset_current):
+                        if ((currents_used[phase]-(max_current_of_phase - offset_current)) > max_current_overshoot):
+                            max_current_overshoot = currents_used[phase] - max_current_of_phase
+                        loadmanagement = True
+                data.data.counter_data[counter].data["set"]["currents_used"] = currents_used
+                return (loadmanagement,
+                        max_current_overshoot + (300 / 230 / phases),
+                        currents_used.index(max(currents_used))+1)
+            except Exception:
+                return False, 0, 0
+        else:
+            return False, 0, 0
+
+    def _check_unbalanced_load(self, currents_used, offset):
+        if data.data.general_data["general"].data["chargemode_config"]["unbalanced_load"] and currents_used:
+            offset_current = 1 if offset else 0
+            try:
+                min_current = min(currents_used)
+                if min_current < 0:
+                    min_current = 0
+                max_current = max(currents_used)
+                if max_current < 0:
+                    max_current = 0
+                if ((max_current - min_current) <= data.data.general_data["general"].data["chargemode_config"][
+                        "unbalanced_load_limit"] - offset_current):
+                    return False, 0, 0
+                else:
+                    max_current_overshoot = (max_current - min_current) - \
+                        data.data.general_data["general"].data["chargemode_config"]["unbalanced_load_limit"]
+                    return True, max_current_overshoot + 1, currents_used.index(max_current)+1
+            except Exception:
+                return False, 0, 0
+        else:
+            return False, 0, 0
+
+
+def random_site(rng: random.Random) -> Dict:
+    """ erzeugt eine zufällige Anlage: Zählerhierarchie mit Ladepunkten, Ströme, Grenzwerte und Schieflast.
+    """
+    next_id = iter(range(1000))
+    counters: Dict = {}
+    cps: List[int] = []
+
+    def add_counter(depth: int) -> Dict:
+        num = next(next_id)
+        counter = Counter(num)
+        counter.data["config"] = {"max_currents": [rng.choice([16, 20, 32, 35, 63])]*3}
+        if rng.random() < 0.1:
+            # Zähler ohne Phasenströme
+            counter.data["set"] = {}
+        else:
+            currents = [round(rng.uniform(-10, 40), 2) for _ in range(3)]
+            counter.data["get"]["currents"] = currents
+            counter.data["set"] = {"currents_used": currents}
+        counters[f"counter{num}"] = counter
+        children = []
+        for _ in range(rng.randint(0, 3)):
+            if depth < 3 and rng.random() < 0.4:
+                children.append(add_counter(depth + 1))
+            else:
+                cp_num = next(next_id)
+                cps.append(cp_num)
+                children.append({"id": cp_num, "type": ComponentType.CHARGEPOINT.value, "children": []})
+        return {"id": num, "type": ComponentType.COUNTER.value, "children": children}
+
+    hierarchy = [add_counter(0)]
+    if rng.random() < 0.2:
+        hierarchy.append({"id": next(next_id), "type": ComponentType.INVERTER.value, "children": []})
+    evu = counters[f"counter{hierarchy[0]['id']}"]
+    if rng.random() < 0.9:
+        evu.data["set"]["consumption_left"] = rng.uniform(-2000, 40000)
+    counter_all = CounterAll()
+    counter_all.data["get"] = {"hierarchy": hierarchy}
+    counters["all"] = counter_all
+    general = SimpleNamespace(data={"chargemode_config": {"unbalanced_load": rng.random() < 0.5,
+                                                          "unbalanced_load_limit": rng.choice([10, 16, 20, 32])}})
+    chargepoints = [SimpleNamespace(num=num, data={"config": {"phase_1": rng.randint(0, 3)}}) for num in cps]
+    return {"counter_data": counters, "general_data": {"general": general}, "chargepoints": chargepoints}
+
+
+def run_cycle(site: Dict, operations: List, check_cp, check_counters) -> List:
+    data.data_init()
+    data.data.counter_data = site["counter_data"]
+    data.data.general_data = site["general_data"]
+    results = []
+    for operation in operations:
+        if operation[0] == "cp":
+            _, cp_index, required_current, phases = operation
+            returned = check_cp(site["chargepoints"][cp_index], required_current, phases)
+        else:
+            returned = check_counters()
+        results.append(copy.deepcopy(returned))
+    results.append({name: copy.deepcopy(counter.data["set"]) for name, counter in site["counter_data"].items()})
+    return results
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_legacy_implementation(seed: int):
+    # setup
+    rng = random.Random(seed)
+    site = random_site(rng)
+    operations = []
+    for _ in range(rng.randint(1, 12)):
+        if site["chargepoints"] and rng.random() < 0.8:
+            operations.append(("cp", rng.randrange(len(site["chargepoints"])),
+                               rng.choice([0, 6, 10, 16, 32]) + round(rng.random(), 2), rng.choice([1, 3])))
+        else:
+            operations.append(("counters",))
+    legacy = LegacyLoadmanagement()
+
+    # execution
+    expected = run_cycle(copy.deepcopy(site), operations, legacy.for_cp, legacy.for_counters)
+    actual = run_cycle(copy.deepcopy(site), operations,
+                       loadmanagement.loadmanagement_for_cp, loadmanagement.loadmanagement_for_counters)
+
+    # evaluation
+    assert actual == expected
+
+
+def test_rollback_is_seen_by_ledger():
+    # setup
+    data.data_init()
+    site = random_site(random.Random(1))
+    data.data.counter_data = site["counter_data"]
+    data.data.general_data = site["general_data"]
+    evu = data.data.counter_data["all"].get_evu_counter()
+    data.data.counter_data[evu].data["set"].update({"currents_used": [10, 10, 10], "consumption_left": 10000})
+    ledger = loadmanagement.create_ledger()
+
+    # execution
+    transaction = data.data.begin_transaction("counter_data")
+    loadmanagement.loadmanagement_for_counters()
+    loadmanagement._check_max_power(ledger.counters[evu], 5000, False)
+    transaction.rollback()
+
+    # evaluation
+    assert loadmanagement.get_ledger() is ledger
+    assert ledger.counters[evu].consumption_left == 10000
+    assert ledger.counters[evu].currents_used == [10, 10, 10]
+    assert ledger.counters[evu].remaining_currents == tuple(
+        max_current - 10 for max_current in data.data.counter_data[evu].data["config"]["max_currents"])
+
+
+def test_ledger_is_rebuilt_for_new_cycle():
+    # setup
+    data.data_init()
+    site = random_site(random.Random(2))
+    data.data.counter_data = site["counter_data"]
+    data.data.general_data = site["general_data"]
+    ledger = loadmanagement.create_ledger()
+
+    # execution
+    data.data.counter_data = copy.deepcopy(site["counter_data"])
+
+    # evaluation
+    assert loadmanagement.get_ledger() is not ledger
+
+
+def test_headroom_is_updated_on_booking():
+    # setup
+    data.data_init()
+    site = random_site(random.Random(3))
+    data.data.counter_data = site["counter_data"]
+    data.data.general_data = site["general_data"]
+    data.data.general_data["general"].data["chargemode_config"] = {"unbalanced_load": True,
+                                                                   "unbalanced_load_limit": 20}
+    evu = data.data.counter_data["all"].get_evu_counter()
+    data.data.counter_data[evu].data["config"]["max_currents"] = [32, 32, 32]
+    data.data.counter_data[evu].data["set"].update({"currents_used": [12, -3, 4], "consumption_left": 10000})
+    ledger = loadmanagement.create_ledger()
+    headroom = ledger.counters[evu]
+    slack = headroom.unbalanced_load_slack
+
+    # execution
+    loadmanagement._check_max_currents(headroom, [6, 0, 0], 1, False)
+    loadmanagement._check_max_power(headroom, 6 * 230, False)
+
+    # evaluation
+    assert slack == 8
+    assert headroom.remaining_currents == (14, 35, 28)
+    assert headroom.unbalanced_load_slack == 2
+    assert headroom.consumption_left == 10000 - 6 * 230
+    assert data.data.counter_data[evu].data["set"]["currents_used"] == [18, -3, 4]
@@ -3,12 +3,14 @@
 
 import copy
 import logging
-import threading
 
 from control import chargelog
 from control import data
+from control import loadmanagement
 from helpermodules.pub import Pub
+from helpermodules import snapshot
 from helpermodules import subdata
+from helpermodules.sync_barrier import SyncBarrier
 from control.bat import Bat
 from control.counter import Counter
 
@@ -19,8 +21,9 @@ log = logging.getLogger(__name__)
 
 
 class Prepare:
-    def __init__(self, event_module_update_completed: threading.Event):
-        self.event_module_update_completed = event_module_update_completed
+    def __init__(self, sync_barrier: SyncBarrier):
+        self.sync_barrier = sync_barrier
+        self.snapshot = snapshot.Snapshot(subdata.SubData.versions)
 
     def setup_algorithm(self) -> None:
         """ bereitet die Daten für den Algorithmus vor und startet diesen.
@@ -33,7 +36,8 @@ class Prepare:
         data.data.print_all()
 
     def copy_system_data(self) -> None:
-        with ModuleDataReceivedContext(self.event_module_update_completed):
+        with ModuleDataReceivedContext(self.sync_barrier):
+            self.snapshot.new_cycle()
             self.__copy_system_data()
 
     def __copy_system_data(self) -> None:
@@ -45,15 +49,15 @@ class Prepare:
             # mit simcount werden Werte aktualisiert, diese sollten jedoch nur einmal nach dem Auslesen aktualisiert
             # werden, sodass die Nutzung einer Referenz vorerst funktioniert.
             data.data.system_data = {
-                "system": copy.deepcopy(subdata.SubData.system_data["system"])} | {
+                "system": self.snapshot.copy("system_data", "system", subdata.SubData.system_data["system"])} | {
                 k: subdata.SubData.system_data[k] for k in subdata.SubData.system_data if "device" in k}
-            data.data.general_data = copy.deepcopy(subdata.SubData.general_data)
+            data.data.general_data = self.snapshot.copy_dict("general_data", subdata.SubData.general_data)
             self.__copy_cp_data()
         except Exception:
             log.exception("Fehler im Prepare-Modul")
 
     def __copy_counter_data(self) -> None:
-        data.data.counter_data.clear()
+        counter_data = {}
         for counter in subdata.SubData.counter_data:
             stop = False
             if isinstance(subdata.SubData.counter_data[counter], Counter):
@@ -61,35 +65,39 @@ class Prepare:
                     if "device" in dev:
                         for component in subdata.SubData.system_data[dev].components:
                             if component[9:] == counter[7:]:
-                                data.data.counter_data[counter] = copy.deepcopy(subdata.SubData.counter_data[counter])
+                                counter_data[counter] = self.snapshot.copy(
+                                    "counter_data", counter, subdata.SubData.counter_data[counter])
                                 stop = True
                                 break
                     if stop:
                         break
             else:
-                data.data.counter_data[counter] = copy.deepcopy(subdata.SubData.counter_data[counter])
+                counter_data[counter] = self.snapshot.copy(
+                    "counter_data", counter, subdata.SubData.counter_data[counter])
+        data.data.counter_data = counter_data
 
     def __copy_cp_data(self) -> None:
-        data.data.cp_data.clear()
+        cp_data = {}
         for cp in subdata.SubData.cp_data:
             if isinstance(subdata.SubData.cp_data[cp], Chargepoint):
                 if "config" in subdata.SubData.cp_data[cp].data:
-                    data.data.cp_data[cp] = copy.deepcopy(subdata.SubData.cp_data[cp])
+                    cp_data[cp] = self.snapshot.copy("cp_data", cp, subdata.SubData.cp_data[cp])
             else:
-                data.data.cp_data[cp] = copy.deepcopy(subdata.SubData.cp_data[cp])
-        data.data.cp_template_data = copy.deepcopy(subdata.SubData.cp_template_data)
-        for chargepoint in data.data.cp_data:
+                cp_data[cp] = self.snapshot.copy("cp_data", cp, subdata.SubData.cp_data[cp])
+        data.data.cp_template_data = self.snapshot.copy_dict("cp_template_data", subdata.SubData.cp_template_data)
+        for chargepoint in cp_data:
             try:
                 if "cp" in chargepoint:
-                    data.data.cp_data[chargepoint].template = data.data.cp_template_data["cpt" + str(
-                        data.data.cp_data[chargepoint].data["config"]["template"])]
+                    cp_data[chargepoint].template = data.data.cp_template_data["cpt" + str(
+                        cp_data[chargepoint].data["config"]["template"])]
                     # Status zurücksetzen (wird jeden Zyklus neu ermittelt)
-                    data.data.cp_data[chargepoint].data["get"]["state_str"] = None
+                    cp_data[chargepoint].data["get"]["state_str"] = None
             except Exception:
                 log.exception("Fehler im Prepare-Modul für Ladepunkt "+str(chargepoint))
+        data.data.cp_data = cp_data
 
     def copy_module_data(self) -> None:
-        with ModuleDataReceivedContext(self.event_module_update_completed):
+        with ModuleDataReceivedContext(self.sync_barrier):
             self.__copy_module_data()
 
     def __copy_module_data(self) -> None:
@@ -97,7 +105,7 @@ class Prepare:
         """
         try:
             self.__copy_counter_data()
-            data.data.pv_data.clear()
+            pv_data = {}
             for pv in subdata.SubData.pv_data:
                 stop = False
                 if isinstance(subdata.SubData.pv_data[pv], Pv):
@@ -105,14 +113,17 @@ class Prepare:
                         if "device" in dev:
                             for component in subdata.SubData.system_data[dev].components:
                                 if component[9:] == pv[2:]:
-                                    data.data.pv_data[pv] = copy.deepcopy(subdata.SubData.pv_data[pv])
+                                    pv_data[pv] = self.snapshot.copy(
+                                        "pv_data", pv, subdata.SubData.pv_data[pv])
                                     stop = True
                                     break
                         if stop:
                             break
                 else:
-                    data.data.pv_data[pv] = copy.deepcopy(subdata.SubData.pv_data[pv])
-            data.data.bat_data.clear()
+                    # pv_data["all"] wird von loadvars zwischen den Kopien verändert und daher immer kopiert.
+                    pv_data[pv] = copy.deepcopy(subdata.SubData.pv_data[pv])
+            data.data.pv_data = pv_data
+            bat_data = {}
             for bat in subdata.SubData.bat_data:
                 stop = False
                 if isinstance(subdata.SubData.bat_data[bat], Bat):
@@ -120,46 +131,54 @@ class Prepare:
                         if "device" in dev:
                             for component in subdata.SubData.system_data[dev].components:
                                 if component[9:] == bat[3:]:
-                                    data.data.bat_data[bat] = copy.deepcopy(subdata.SubData.bat_data[bat])
+                                    bat_data[bat] = self.snapshot.copy(
+                                        "bat_data", bat, subdata.SubData.bat_data[bat])
                                     stop = True
                                     break
                         if stop:
                             break
                 else:
-                    data.data.bat_data[bat] = copy.deepcopy(subdata.SubData.bat_data[bat])
+                    # bat_data["all"] wird von loadvars zwischen den Kopien verändert und daher immer kopiert.
+                    bat_data[bat] = copy.deepcopy(subdata.SubData.bat_data[bat])
+            data.data.bat_data = bat_data
         except Exception:
             log.exception("Fehler im Prepare-Modul")
 
     def copy_data(self) -> None:
         """ kopiert die Daten, die per MQTT empfangen wurden.
         """
-        with ModuleDataReceivedContext(self.event_module_update_completed):
+        with ModuleDataReceivedContext(self.sync_barrier):
             try:
-                data.data.general_data = copy.deepcopy(subdata.SubData.general_data)
-                data.data.optional_data = copy.deepcopy(subdata.SubData.optional_data)
+                data.data.general_data = self.snapshot.copy_dict("general_data", subdata.SubData.general_data)
+                data.data.optional_data = self.snapshot.copy_dict("optional_data", subdata.SubData.optional_data)
                 self.__copy_cp_data()
-                data.data.ev_data.clear()
+                ev_data = {}
                 for ev in subdata.SubData.ev_data:
                     if "name" in subdata.SubData.ev_data[ev].data:
-                        data.data.ev_data[ev] = copy.deepcopy(subdata.SubData.ev_data[ev])
-                data.data.ev_template_data = copy.deepcopy(subdata.SubData.ev_template_data)
-                data.data.ev_charge_template_data = copy.deepcopy(subdata.SubData.ev_charge_template_data)
-                for vehicle in data.data.ev_data:
+                        ev_data[ev] = self.snapshot.copy("ev_data", ev, subdata.SubData.ev_data[ev])
+                data.data.ev_template_data = self.snapshot.copy_dict(
+                    "ev_template_data", subdata.SubData.ev_template_data)
+                data.data.ev_charge_template_data = self.snapshot.copy_dict(
+                    "ev_charge_template_data", subdata.SubData.ev_charge_template_data)
+                for vehicle in ev_data:
                     try:
                         # Globaler oder individueller Lademodus?
                         if data.data.general_data["general"].data["chargemode_config"]["individual_mode"]:
-                            data.data.ev_data[vehicle].charge_template = data.data.ev_charge_template_data["ct" + str(
-                                data.data.ev_data[vehicle].data["charge_template"])]
+                            ev_data[vehicle].charge_template = data.data.ev_charge_template_data["ct" + str(
+                                ev_data[vehicle].data["charge_template"])]
                         else:
-                            data.data.ev_data[vehicle].charge_template = data.data.ev_charge_template_data["ct0"]
+                            ev_data[vehicle].charge_template = data.data.ev_charge_template_data["ct0"]
                         # zuerst das aktuelle Template laden
-                        data.data.ev_data[vehicle].ev_template = data.data.ev_template_data["et" + str(
-                            data.data.ev_data[vehicle].data["ev_template"])]
+                        ev_data[vehicle].ev_template = data.data.ev_template_data["et" + str(
+                            ev_data[vehicle].data["ev_template"])]
                     except Exception:
                         log.exception("Fehler im Prepare-Modul für EV "+str(vehicle))
+                data.data.ev_data = ev_data
 
                 self.__copy_counter_data()
-                data.data.graph_data = copy.deepcopy(subdata.SubData.graph_data)
+                data.data.graph_data = self.snapshot.copy_dict("graph_data", subdata.SubData.graph_data)
+                self.snapshot.pub_metrics()
+                data.data.pub_contention()
             except Exception:
                 log.exception("Fehler im Prepare-Modul")
 
@@ -388,6 +407,7 @@ class Prepare:
             for counter in data.data.counter_data:
                 if "counter" in counter:
                     data.data.counter_data[counter].setup_counter()
+            loadmanagement.create_ledger()
         except Exception:
             log.exception("Fehler im Prepare-Modul")
 
@@ -403,15 +423,15 @@ class Prepare:
 class ModuleDataReceivedContext:
     """ Moduldaten erst kopieren, wenn alle Daten vom Broker empfangen wurden."""
 
-    def __init__(self, event_module_update_completed):
-        self.event_module_update_completed = event_module_update_completed
+    def __init__(self, sync_barrier: SyncBarrier):
+        self.sync_barrier = sync_barrier
 
     def __enter__(self):
         try:
             timeout = data.data.general_data["general"].data["control_interval"]/2
         except KeyError:
             timeout = 5
-        if self.event_module_update_completed.wait(timeout) is False:
+        if self.sync_barrier.wait(timeout) is False:
             log.error(
                 "Modul-Daten wurden noch nicht vollständig empfangen. Timeout abgelaufen, fortsetzen der Regelung.")
         return None
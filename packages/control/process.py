@@ -1,24 +1,24 @@
 """ Starten des Lade-Vorgangs
 """
 import logging
-import threading
 from typing import List
 
 from control import chargelog
 from control import chargepoint
 from control import data
 from helpermodules.pub import Pub
+from helpermodules.worker_pool import Job, WorkerPool
 
 log = logging.getLogger(__name__)
 
 
 class Process:
     def __init__(self) -> None:
-        pass
+        self.pool = WorkerPool("process")
 
     def process_algorithm_results(self) -> None:
         try:
-            modules_threads = []  # type: List[threading.Thread]
+            modules_jobs: List[Job] = []
             log.debug("# Ladung starten.")
             for cp in data.data.cp_data:
                 try:
@@ -46,23 +46,15 @@ class Process:
                         else:
                             Pub().pub(
                                 f"openWB/set/chargepoint/{chargepoint.num}/get/state_str", "Ladevorgang läuft...")
-                        modules_threads.append(self._start_charging(chargepoint))
+                        modules_jobs.append(self._start_charging(chargepoint))
                 except Exception:
                     log.exception("Fehler im Process-Modul für Ladepunkt "+str(cp))
 
-            if modules_threads:
-                for thread in modules_threads:
-                    thread.start()
-
-                # Wait for all to complete
-                for thread in modules_threads:
-                    thread.join(timeout=3)
-
-                for thread in modules_threads:
-                    if thread.is_alive():
-                        log.error(
-                            thread.name +
-                            " konnte nicht innerhalb des Timeouts die Werte senden.")
+            stragglers = self.pool.run(
+                modules_jobs, timeout=data.data.general_data["general"].data["control_interval"]/3)
+            for key in stragglers:
+                log.error(key + " konnte nicht innerhalb des Timeouts die Werte senden.")
+            self.pool.pub_stats()
 
             data.data.pv_data["all"].put_stats()
             data.data.pv_data["all"].print_stats()
@@ -106,6 +98,6 @@ class Process:
         Pub().pub("openWB/set/chargepoint/"+str(chargepoint.num)+"/set/current", current)
         log.info("LP"+str(chargepoint.num)+": set current "+str(current)+" A")
 
-    def _start_charging(self, chargepoint: chargepoint.Chargepoint) -> threading.Thread:
-        return threading.Thread(target=chargepoint.chargepoint_module.set_current,
-                                args=(chargepoint.data["set"]["current"],))
+    def _start_charging(self, chargepoint: chargepoint.Chargepoint) -> Job:
+        return Job(f"cp{chargepoint.num}", chargepoint.chargepoint_module.set_current,
+                   (chargepoint.data["set"]["current"],))
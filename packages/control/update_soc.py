@@ -1,11 +1,11 @@
 import logging
 from typing import List
 import copy
-import threading
 import time
 
 from control import data
 from control.chargepoint import AllChargepoints
+from helpermodules.worker_pool import Job, WorkerPool
 
 log = logging.getLogger("soc."+__name__)
 
@@ -13,6 +13,7 @@ log = logging.getLogger("soc."+__name__)
 class UpdateSoc:
     def __init__(self) -> None:
         self.heartbeat = False
+        self.pool = WorkerPool("update_soc")
 
     def update(self) -> None:
         delay = 10
@@ -21,27 +22,19 @@ class UpdateSoc:
             self.heartbeat = True
             time.sleep(max(0, next_time - time.time()))
             try:
-                threads = self.__get_threads()
-                # Start them all
-                if threads:
-                    for thread in threads:
-                        thread.start()
-
-                    # Wait for all to complete
-                    for thread in threads:
-                        thread.join(timeout=10)
-
-                    for thread in threads:
-                        if thread.is_alive():
-                            log.error("thread.name konnte nicht innerhalb des Timeouts die Werte abfragen, die "
-                                      "abgefragten Werte werden nicht in der Regelung verwendet.")
+                # Das SoC-Update läuft in einem eigenen Intervall, daher entspricht die Deadline dem Intervall.
+                stragglers = self.pool.run(self.__get_jobs(), timeout=delay)
+                for key in stragglers:
+                    log.error(f"{key} konnte nicht innerhalb des Timeouts die Werte abfragen, die "
+                              "abgefragten Werte werden nicht in der Regelung verwendet.")
+                self.pool.pub_stats()
             except Exception:
                 log.exception("Fehler im Main-Modul")
             # skip tasks if we are behind schedule:
             next_time += (time.time() - next_time) // delay * delay + delay
 
-    def __get_threads(self) -> List[threading.Thread]:
-        threads = []
+    def __get_jobs(self) -> List[Job]:
+        jobs = []
         cp_data = copy.deepcopy(data.data.cp_data)
         ev_data = copy.deepcopy(data.data.ev_data)
         # Alle Autos durchgehen
@@ -57,6 +50,5 @@ class UpdateSoc:
                     charge_state = False
                     plug_state = False
                 if ev.ev_template.soc_interval_expired(plug_state, charge_state, ev.data["get"].get("soc_timestamp")):
-                    threads.append(threading.Thread(target=ev.soc_module.update,
-                                                    args=(charge_state,), name=f"soc_ev{ev.num}"))
-        return threads
+                    jobs.append(Job(f"soc_ev{ev.num}", ev.soc_module.update, (charge_state,)))
+        return jobs
@@ -5,14 +5,14 @@ import importlib
 import json
 import logging
 import subprocess
-from typing import List
+from typing import Dict, List
 import paho.mqtt.client as mqtt
 import re
 import time
 import traceback
 from pathlib import Path
 
-from helpermodules import measurement_log
+from helpermodules import cycle_timer, logger, measurement_log, retained_mirror
 from helpermodules.pub import Pub
 from control import bridge
 from control import chargelog
@@ -454,6 +454,8 @@ class Command:
 
     def sendDebug(self, connection_id: str, payload: dict) -> None:
         parent_file = Path(__file__).resolve().parents[2]
+        # Die Debug-Ausgabe der vorherigen Zyklen mitsenden.
+        logger.flush_debug_buffer()
         Pub().pub("openWB/set/system/debug_level", 10)
         subprocess.run([str(parent_file / "runs" / "send_debug.sh"),
                         str(payload["data"]["message"]),
@@ -478,6 +480,17 @@ class Command:
             measurement_log.get_monthly_log(payload["data"]["month"])
         )
 
+    def getCycleTimelines(self, connection_id: str, payload: dict) -> None:
+        """ sendet die Zeitleisten der letzten Regelzyklen, optional begrenzt auf payload["data"]["cycles"].
+        """
+        Pub().pub("openWB/system/perf/cycle_timelines",
+                  cycle_timer.timer.last_timelines(payload["data"].get("cycles")))
+
+    def dumpDebugLog(self, connection_id: str, payload: dict) -> None:
+        """ schreibt die vorgehaltene Debug-Ausgabe der letzten Regelzyklen in main.log.
+        """
+        logger.flush_debug_buffer()
+
     def initCloud(self, connection_id: str, payload: dict) -> None:
         parent_file = Path(__file__).resolve().parents[2]
         try:
@@ -566,94 +579,44 @@ def pub_error(payload: dict, connection_id: str, error_str: str) -> None:
 
 
 class ProcessBrokerBranch:
+    """ fragt einen Topic-Zweig aus dem Abbild der retained Topics ab.
+    """
+
     def __init__(self, topic_str: str) -> None:
         self.topic_str = topic_str
 
     def get_payload(self):
-        self.payload: str
-        self.__connect_to_broker(self.__get_payload)
-        return json.loads(self.payload)
+        return json.loads(self.__branch()["openWB/"+self.topic_str[:-1]])
 
     def remove_topics(self):
         """ löscht einen Topic-Zweig auf dem Broker. Payload "" löscht nur ein einzelnes Topic.
         """
         try:
-            self.__connect_to_broker(self.__on_message_rm)
+            self.__remove(self.__branch())
         except Exception:
             log.exception("Fehler im Command-Modul")
 
     def get_max_id(self) -> List[str]:
         try:
-            self.received_topics = []
-            self.__connect_to_broker(self.__on_message_max_id)
-            return self.received_topics
-        except Exception:
-            log.exception("Fehler im Command-Modul")
-            return[]
-
-    def __connect_to_broker(self, on_message):
-        """ abonniert alle Topics.
-        """
-        try:
-            mqtt_broker_ip = "localhost"
-            client = mqtt.Client(
-                "openWB-processBrokerBranch-" + str(self.__getserial()))
-
-            client.on_connect = self.__on_connect
-            client.on_message = on_message
-
-            client.connect(mqtt_broker_ip, 1886)
-            client.loop_start()
-            time.sleep(0.5)
-            client.loop_stop()
-
-        except Exception:
-            log.exception("Fehler im Command-Modul")
-
-    def __on_connect(self, client, userdata, flags, rc):
-        """ connect to broker and subscribe to set topics
-        """
-        try:
-            client.subscribe("openWB/"+self.topic_str+"#", 2)
-            client.subscribe("openWB/set/"+self.topic_str+"#", 2)
-        except Exception:
-            log.exception("Fehler im Command-Modul")
-
-    def __on_message_rm(self, client, userdata, msg):
-        """ wartet auf eingehende Topics.
-        """
-        try:
-            if str(msg.payload.decode("utf-8")) != '':
-                log.debug("Gelöschtes Topic: "+str(msg.topic))
-                Pub().pub(msg.topic, "")
-                if "openWB/system/device/" in msg.topic and "component" in msg.topic and "config" in msg.topic:
-                    payload = json.loads(str(msg.payload.decode("utf-8")))
-                    topic = type_to_topic_mapping(payload["type"])
-                    data.data.counter_data["all"].hierarchy_remove_item(payload["id"])
-                    client.subscribe("openWB/"+topic+"/"+str(payload["id"])+"/#", 2)
-        except Exception:
-            log.exception("Fehler im Command-Modul")
-
-    def __on_message_max_id(self, client, userdata, msg):
-        try:
-            self.received_topics.append(msg.topic)
-        except Exception:
-            log.exception("Fehler im Command-Modul")
-
-    def __get_payload(self, client, userdata, msg):
-        try:
-            self.payload = msg.payload
-        except Exception:
-            log.exception("Fehler im Command-Modul")
-
-    def __getserial(self):
-        """ Extract serial from cpuinfo file
-        """
-        try:
-            with open('/proc/cpuinfo', 'r') as f:
-                for line in f:
-                    if line[0:6] == 'Serial':
-                        return line[10:26]
-                return "0000000000000000"
+            return list(self.__branch())
         except Exception:
             log.exception("Fehler im Command-Modul")
+            return []
+
+    def __branch(self) -> Dict[str, bytes]:
+        retained_mirror.mirror.wait_synced()
+        topics = retained_mirror.mirror.branch("openWB/"+self.topic_str)
+        topics.update(retained_mirror.mirror.branch("openWB/set/"+self.topic_str))
+        return topics
+
+    def __remove(self, topics: Dict[str, bytes]) -> None:
+        for topic, payload in topics.items():
+            log.debug("Gelöschtes Topic: "+str(topic))
+            Pub().pub(topic, "")
+            # Nicht auf die Bestätigung des Brokers warten, damit ein folgender Befehl das Topic nicht mehr sieht.
+            retained_mirror.mirror.update(topic, b"")
+            if "openWB/system/device/" in topic and "component" in topic and "config" in topic:
+                payload = json.loads(str(payload.decode("utf-8")))
+                component_topic = type_to_topic_mapping(payload["type"])
+                data.data.counter_data["all"].hierarchy_remove_item(payload["id"])
+                self.__remove(retained_mirror.mirror.branch(f"openWB/{component_topic}/{payload['id']}/"))
@@ -0,0 +1,38 @@
+import pytest
+
+from helpermodules import retained_mirror
+from helpermodules.command import ProcessBrokerBranch
+from helpermodules.pub import Pub
+from helpermodules.retained_mirror import RetainedMirror
+
+
+@pytest.fixture
+def mirror(monkeypatch) -> RetainedMirror:
+    mirror = RetainedMirror()
+    mirror.synced.set()
+    for topic in ("openWB/vehicle/1/name", "openWB/vehicle/1/get/soc", "openWB/set/vehicle/1/get/soc",
+                  "openWB/vehicle/12/name"):
+        mirror.update(topic, b"1")
+    mirror.update("openWB/counter/get/hierarchy", b'[{"id": 0, "type": "counter", "children": []}]')
+    monkeypatch.setattr(retained_mirror, "mirror", mirror)
+    return mirror
+
+
+def test_remove_topics(mirror):
+    # execution
+    ProcessBrokerBranch("vehicle/1/").remove_topics()
+
+    # evaluation
+    removed = [c[0][0] for c in Pub().pub.call_args_list if c[0][1] == ""]
+    assert sorted(removed) == ["openWB/set/vehicle/1/get/soc", "openWB/vehicle/1/get/soc", "openWB/vehicle/1/name"]
+    assert list(mirror.branch("openWB/vehicle/")) == ["openWB/vehicle/12/name"]
+
+
+def test_get_max_id_and_payload(mirror):
+    # execution
+    topics = ProcessBrokerBranch("").get_max_id()
+    hierarchy = ProcessBrokerBranch("counter/get/hierarchy/").get_payload()
+
+    # evaluation
+    assert len(topics) == 5
+    assert hierarchy == [{"id": 0, "type": "counter", "children": []}]
@@ -0,0 +1,118 @@
+""" Zeitmessung des Regelzyklus: Dauer der einzelnen Abschnitte und der Abfrage der Geräte.
+
+Die Abschnitte werden mit lap() abgeschlossen, sodass je Abschnitt nur ein Aufruf der monotonen Uhr anfällt. Je
+Abschnitt und Gerät werden p50, p95 und Maximum über die letzten WINDOW Zyklen unter openWB/system/perf/cycle
+veröffentlicht und in die Ramdisk geschrieben. Die letzten TIMELINES Zyklen werden als Zeitleiste vorgehalten und
+können mit dem Befehl getCycleTimelines abgerufen werden. Wird der Zyklus abgebrochen, z.B. durch exit_after, wird
+die Zeitleiste mit dem Abschnitt, in dem abgebrochen wurde, protokolliert.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+from helpermodules.pub import Pub
+
+log = logging.getLogger(__name__)
+
+CYCLE_TIMING_FILE = Path(__file__).resolve().parents[2] / "ramdisk" / "cycle_timing.json"
+# Anzahl Zyklen, über die die Perzentile gebildet werden
+WINDOW = 60
+# Anzahl Zyklen, deren Zeitleiste vorgehalten wird
+TIMELINES = 30
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    return values[min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))]
+
+
+def _stats(window: Deque[float]) -> Dict[str, float]:
+    values = sorted(window)
+    return {"p50": round(_percentile(values, 50), 4), "p95": round(_percentile(values, 95), 4),
+            "max": round(values[-1], 4), "last": round(window[-1], 4)}
+
+
+class CycleTimer:
+    def __init__(self, path: Path = CYCLE_TIMING_FILE, window: int = WINDOW, timelines: int = TIMELINES) -> None:
+        self.path = path
+        self.window = window
+        self.stages: Dict[str, Deque[float]] = {}
+        self.devices: Dict[str, Deque[float]] = {}
+        self.timelines: Deque[Dict] = deque(maxlen=timelines)
+        self._lock = threading.Lock()
+        self._start = 0.0
+        self._last = 0.0
+        self._laps: List[List] = []
+
+    @contextmanager
+    def cycle(self, devices: Callable[[], Dict[str, float]] = dict) -> Iterator[None]:
+        """ misst einen Zyklus. devices liefert nach dem Zyklus die Dauer der Geräteabfragen je Gerät.
+        """
+        self._start = self._last = time.monotonic()
+        self._laps = []
+        try:
+            yield
+        except BaseException:
+            self._finish(devices(), aborted=True)
+            raise
+        else:
+            self._finish(devices())
+
+    def lap(self, stage: str) -> None:
+        """ schließt den Abschnitt ab, der mit dem vorherigen Abschnitt bzw. dem Zyklus begonnen hat.
+        """
+        now = time.monotonic()
+        self._laps.append([stage, round(self._last - self._start, 4), now - self._last])
+        self._last = now
+
+    def _finish(self, devices: Dict[str, float], aborted: bool = False) -> None:
+        now = time.monotonic()
+        timeline = {"timestamp": time.time(), "duration": round(now - self._start, 4),
+                    "stages": [[stage, offset, round(duration, 4)] for stage, offset, duration in self._laps],
+                    "devices": {key: round(duration, 4) for key, duration in devices.items()}}
+        if aborted:
+            after = self._laps[-1][0] if self._laps else None
+            timeline["aborted_after"] = after
+            log.error(f"Regelzyklus nach {timeline['duration']}s abgebrochen, letzter abgeschlossener Abschnitt: "
+                      f"{after}, Zeitleiste: {timeline}")
+        with self._lock:
+            self.timelines.append(timeline)
+            for stage, _, duration in self._laps:
+                self._add(self.stages, stage, duration)
+            self._add(self.stages, "cycle", now - self._start)
+            for key, duration in devices.items():
+                self._add(self.devices, key, duration)
+        self.pub()
+
+    def _add(self, windows: Dict[str, Deque[float]], key: str, duration: float) -> None:
+        try:
+            windows[key].append(duration)
+        except KeyError:
+            windows[key] = deque([duration], maxlen=self.window)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"window": self.window,
+                    "stages": {stage: _stats(window) for stage, window in self.stages.items()},
+                    "devices": {key: _stats(window) for key, window in self.devices.items()}}
+
+    def last_timelines(self, count: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            timelines = list(self.timelines)
+        return timelines[-count:] if count else timelines
+
+    def pub(self) -> None:
+        try:
+            stats = self.stats()
+            Pub().pub("openWB/system/perf/cycle", stats)
+            with open(str(self.path), "w") as f:
+                json.dump({"stats": stats, "timelines": self.last_timelines()}, f)
+        except Exception:
+            log.exception("Fehler beim Veröffentlichen der Zykluszeiten")
+
+
+timer = CycleTimer()
@@ -0,0 +1,61 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from helpermodules import cycle_timer
+from helpermodules.cycle_timer import CycleTimer
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Mock:
+    clock = Mock(return_value=0.0)
+    monkeypatch.setattr(cycle_timer.time, "monotonic", clock)
+    return clock
+
+
+def run_cycle(timer: CycleTimer, clock: Mock, durations, devices=None) -> None:
+    with timer.cycle(lambda: devices or {}):
+        for stage, duration in durations:
+            clock.return_value += duration
+            timer.lap(stage)
+
+
+def test_cycle_records_timeline_and_stats(tmp_path, clock):
+    # setup
+    timer = CycleTimer(tmp_path / "cycle_timing.json", window=3, timelines=2)
+
+    # execution
+    for duration in (1, 2, 3, 4):
+        run_cycle(timer, clock, [("copy_data", 0.5), ("calc_current", duration)], {"device0": duration / 10})
+
+    # evaluation
+    stats = timer.stats()
+    assert stats["stages"]["calc_current"] == {"p50": 3, "p95": 4, "max": 4, "last": 4}
+    assert stats["stages"]["cycle"]["max"] == 4.5
+    assert stats["devices"]["device0"]["p50"] == 0.3
+    timelines = timer.last_timelines()
+    assert len(timelines) == 2
+    assert timelines[-1]["stages"] == [["copy_data", 0, 0.5], ["calc_current", 0.5, 4]]
+    assert timer.last_timelines(1) == timelines[-1:]
+    with open(str(tmp_path / "cycle_timing.json")) as f:
+        assert json.load(f)["stats"] == stats
+
+
+def test_aborted_cycle_is_recorded(tmp_path, clock):
+    # setup
+    timer = CycleTimer(tmp_path / "cycle_timing.json")
+
+    # execution
+    with pytest.raises(KeyboardInterrupt):
+        with timer.cycle():
+            clock.return_value += 1
+            timer.lap("get_hardware_values")
+            clock.return_value += 30
+            raise KeyboardInterrupt
+
+    # evaluation
+    timeline = timer.last_timelines()[-1]
+    assert timeline["aborted_after"] == "get_hardware_values"
+    assert timeline["duration"] == 31
+    assert timer.stats()["stages"]["cycle"]["last"] == 31
@@ -1,5 +1,6 @@
+from collections import deque
 from pathlib import Path
-import subprocess
+from typing import Deque, List, Optional
 import time
 import datetime
 import logging
@@ -10,6 +11,69 @@ from modules.common.fault_state import FaultStateLevel
 
 log = logging.getLogger(__name__)
 
+GRAPH_LIVE_FILE = Path(__file__).resolve().parents[2] / "ramdisk" / "graph_live.json"
+CHUNK_SIZE = 50
+CHUNKS = 16
+# Intervall in Sekunden, in dem der Puffer in die Ramdisk geschrieben wird
+PERSIST_INTERVAL = 60
+
+
+class LiveGraph:
+    """ Ringpuffer mit den Zeilen des Live-Graphen. Die Chunks alllivevaluesJsonN entsprechen denen des 1.9er
+    graphing.sh und werden nur gesendet, wenn sich der Inhalt geändert hat.
+    """
+
+    def __init__(self, path: Path = GRAPH_LIVE_FILE) -> None:
+        self.path = path
+        self.lines: Optional[Deque[str]] = None
+        self.published: List[Optional[str]] = [None] * (CHUNKS + 1)
+        self.last_persisted = 0.0
+
+    def add(self, line: str, max_lines: int) -> None:
+        if self.lines is None:
+            self.lines = deque(self._load(), maxlen=max_lines)
+        elif self.lines.maxlen != max_lines:
+            self.lines = deque(self.lines, maxlen=max_lines)
+        self.lines.append(line)
+
+    def chunks(self) -> List[str]:
+        """ Index 0: letzte 50 Zeilen (alllivevaluesJson), Index 1-16 wie bei graphing.sh (tail -n +50*(N-1) |
+        head -n 50), sodass sich Chunk 1 und 2 eine Zeile teilen.
+        """
+        lines = list(self.lines or [])
+        chunks = ["\n".join(lines[-CHUNK_SIZE:]), "\n".join(lines[:CHUNK_SIZE])]
+        for n in range(2, CHUNKS + 1):
+            chunk = "\n".join(lines[CHUNK_SIZE*(n-1)-1:CHUNK_SIZE*n-1])
+            chunks.append(chunk if len(chunk) >= 10 else "-")
+        return chunks
+
+    def pub(self) -> None:
+        for n, chunk in enumerate(self.chunks()):
+            if chunk != self.published[n]:
+                # Die Zeilen werden wie bei mosquitto_pub als Text und nicht als JSON gesendet.
+                Pub().client.publish(f"openWB/graph/alllivevaluesJson{n if n else ''}", chunk, retain=True)
+                self.published[n] = chunk
+        if time.time() - self.last_persisted >= PERSIST_INTERVAL:
+            self.persist()
+
+    def persist(self) -> None:
+        try:
+            with open(str(self.path), "w") as f:
+                f.writelines(line + "\n" for line in self.lines or [])
+            self.last_persisted = time.time()
+        except Exception:
+            log.exception("Fehler beim Speichern des Live-Graphen")
+
+    def _load(self) -> List[str]:
+        try:
+            with open(str(self.path), "r") as f:
+                return [line.rstrip("\n") for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+
+live_graph = LiveGraph()
+
 
 class Graph:
     def __init__(self) -> None:
@@ -59,10 +123,7 @@ class Graph:
 
             Pub().pub("openWB/set/graph/lastlivevaluesJson", dataline)
             Pub().pub("openWB/set/system/lastlivevaluesJson", dataline)
-            with open(str(Path(__file__).resolve().parents[2] / "ramdisk"/"graph_live.json"), "a") as f:
-                f.write(str(dataline).replace("'", '"'))
-                f.write("\n")
-            subprocess.run([str(Path(__file__).resolve().parents[2] / "runs"/"graphing.sh"),
-                            str(self.data["config"]["duration"]*6)])
+            live_graph.add(str(dataline).replace("'", '"'), self.data["config"]["duration"]*6)
+            live_graph.pub()
         except Exception:
             log.exception("Fehler im Graph-Modul")
@@ -0,0 +1,63 @@
+from unittest.mock import Mock
+
+import pytest
+
+from helpermodules import graph
+from helpermodules.graph import LiveGraph
+
+
+@pytest.fixture
+def client(monkeypatch) -> Mock:
+    pub_mock = Mock()
+    monkeypatch.setattr(graph, "Pub", pub_mock)
+    return pub_mock.return_value.client
+
+
+def test_chunks_match_graphing_sh(tmp_path):
+    # setup
+    live_graph = LiveGraph(tmp_path / "graph_live.json")
+
+    # execution
+    for i in range(120):
+        live_graph.add(f'{{"timestamp": {i}}}', 100)
+    chunks = live_graph.chunks()
+
+    # evaluation
+    assert chunks[0].split("\n") == [f'{{"timestamp": {i}}}' for i in range(70, 120)]
+    assert chunks[1].split("\n") == [f'{{"timestamp": {i}}}' for i in range(20, 70)]
+    # tail -n +50 | head -n 50
+    assert chunks[2].split("\n") == [f'{{"timestamp": {i}}}' for i in range(69, 119)]
+    assert chunks[3] == '{"timestamp": 119}'
+    assert chunks[4:] == ["-"] * 13
+
+
+def test_pub_only_changed_chunks(tmp_path, client: Mock):
+    # setup
+    live_graph = LiveGraph(tmp_path / "graph_live.json")
+    live_graph.add('{"timestamp": 0}', 720)
+    live_graph.pub()
+    client.publish.reset_mock()
+
+    # execution
+    live_graph.add('{"timestamp": 1}', 720)
+    live_graph.pub()
+
+    # evaluation
+    topics = [c[0][0] for c in client.publish.call_args_list]
+    assert topics == ["openWB/graph/alllivevaluesJson", "openWB/graph/alllivevaluesJson1"]
+
+
+def test_persist_and_load(tmp_path, client: Mock):
+    # setup
+    path = tmp_path / "graph_live.json"
+    live_graph = LiveGraph(path)
+    live_graph.add('{"timestamp": 0}', 720)
+    live_graph.pub()
+
+    # execution
+    restored = LiveGraph(path)
+    restored.add('{"timestamp": 1}', 720)
+
+    # evaluation
+    assert path.read_text() == '{"timestamp": 0}\n'
+    assert list(restored.lines) == ['{"timestamp": 0}', '{"timestamp": 1}']
@@ -1,6 +1,33 @@
+""" Logging über eine Warteschlange: Die Aufrufer legen die Log-Records nur in die Warteschlange, Formatierung und
+Schreiben in die Ramdisk übernimmt der Thread des QueueListeners.
+
+Der Root-Logger protokolliert immer mit DEBUG. Welche Records in main.log und soc.log geschrieben werden, legt
+set_level() über den Level der Datei-Handler fest. Die übrigen Records der letzten DEBUG_CYCLES Regelzyklen werden im
+DebugRingBuffer vorgehalten und mit flush_debug_buffer() in main.log geschrieben. Ein Fehler schreibt den Puffer nur,
+wenn dieselbe Fehlermeldung nicht bereits in den letzten ERROR_DUMP_CYCLES Zyklen dazu geführt hat, damit ein
+dauerhafter Fehler, z.B. ein nicht erreichbares Gerät, nicht in jedem Zyklus die Debug-Ausgabe schreibt.
+"""
+import copy
+import atexit
 import logging
+import logging.handlers
+import queue
+from collections import deque
 from pathlib import Path
 import subprocess
+from typing import Deque, Dict, List, Optional, Tuple, Type
+
+RAMDISK = Path(__file__).resolve().parents[2] / "ramdisk"
+# Anzahl Regelzyklen, deren Debug-Ausgabe vorgehalten wird
+DEBUG_CYCLES = 3
+# Obergrenze der vorgehaltenen Records je Zyklus
+MAX_RECORDS_PER_CYCLE = 5000
+# Anzahl Zyklen, in denen dieselbe Fehlermeldung den Puffer nicht erneut schreibt (eine Stunde bei 10s Regelintervall)
+ERROR_DUMP_CYCLES = 360
+
+# Steuer-Records für den DebugRingBuffer, die in der Reihenfolge der übrigen Records verarbeitet werden
+_NEW_CYCLE = "new_cycle"
+_DUMP = "dump"
 
 
 def filter_soc_neg(record) -> bool:
@@ -15,36 +42,206 @@ def filter_soc_pos(record) -> bool:
     return False
 
 
-def setup_logging() -> None:
+_exception_formatter = logging.Formatter()
+
+
+class TargetQueueHandler(logging.handlers.QueueHandler):
+    """ legt den Record zusammen mit dem Handler, der ihn schreiben soll, in die gemeinsame Warteschlange. Die
+    Formatierung der Zeile und das Schreiben erfolgen im Thread des Listeners.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, target: logging.Handler) -> None:
+        super().__init__(log_queue)
+        self.target = target
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno >= self.target.level:
+            super().emit(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """ setzt wie QueueHandler.prepare die Argumente und den Traceback ein, da der Record im Ringpuffer mehrere
+        Zyklen vorgehalten wird und weder veränderliche Argumente noch die Frames des Tracebacks referenzieren soll.
+        """
+        if not record.args and not record.exc_info and isinstance(record.msg, str):
+            return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.queue.put_nowait((self.target, record))
+
+
+class TargetQueueListener(logging.handlers.QueueListener):
+    def handle(self, item) -> None:
+        target, record = item
+        if isinstance(record, str):
+            getattr(target, record)()
+        else:
+            target.handle(record)
+
+
+class RingQueueHandler(TargetQueueHandler):
+    """ übergibt dem Ringpuffer nur Fehler und Records, die nicht in die Datei geschrieben werden."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.ERROR or record.levelno < self.target.target.level:
+            super().emit(record)
+
+
+class DebugRingBuffer(logging.Handler):
+    """ hält die Records der letzten Zyklen vor, die nicht in die Datei geschrieben wurden, und schreibt sie bei einem
+    Fehler oder auf Anforderung in die Datei.
+    """
+
+    def __init__(self, target: logging.Handler, cycles: int = DEBUG_CYCLES,
+                 error_dump_cycles: int = ERROR_DUMP_CYCLES) -> None:
+        super().__init__(logging.DEBUG)
+        self.target = target
+        self.cycles: Deque[List[logging.LogRecord]] = deque([[]], maxlen=cycles)
+        self.dropped = 0
+        self.cycle_count = 0
+        self.error_dump_cycles = error_dump_cycles
+        # Fehlermeldung (Logger, Meldung) -> Zyklus, in dem sie den Puffer zuletzt geschrieben hat
+        self._dumped_errors: Dict[Tuple[str, str], int] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.ERROR:
+            key = (record.name, record.getMessage())
+            last = self._dumped_errors.get(key)
+            if last is None or self.cycle_count - last >= self.error_dump_cycles:
+                self._dumped_errors[key] = self.cycle_count
+                self.dump()
+        elif record.levelno < self.target.level:
+            if len(self.cycles[-1]) < MAX_RECORDS_PER_CYCLE:
+                self.cycles[-1].append(record)
+            else:
+                self.dropped += 1
+
+    def new_cycle(self) -> None:
+        self.cycles.append([])
+        self.cycle_count += 1
+        if self.cycle_count % self.error_dump_cycles == 0:
+            self._dumped_errors = {key: cycle for key, cycle in self._dumped_errors.items()
+                                   if self.cycle_count - cycle < self.error_dump_cycles}
+
+    def dump(self) -> None:
+        records = [record for cycle in self.cycles for record in cycle]
+        if records:
+            self.target.handle(logging.makeLogRecord(
+                {"name": __name__, "levelno": logging.INFO, "levelname": "INFO",
+                 "msg": "Debug-Ausgabe der letzten %s Zyklen (%s Records)", "args": (len(self.cycles), len(records))}))
+            for record in records:
+                self.target.handle(record)
+        self.cycles = deque([[]], maxlen=self.cycles.maxlen)
+
+
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: Optional[TargetQueueListener] = None
+_file_handlers: List[logging.Handler] = []
+_ring: Optional[DebugRingBuffer] = None
+_queue_handlers: List[Tuple[logging.Logger, logging.Handler]] = []
+
+
+def _file_handler(path: Path, format_str: str, filter=None) -> logging.FileHandler:
+    handler = logging.FileHandler(str(path))
+    handler.setFormatter(logging.Formatter(format_str))
+    if filter is not None:
+        handler.addFilter(filter)
+    return handler
+
+
+def _add_handler(target_logger: logging.Logger, target: logging.Handler,
+                 handler_class: Type[TargetQueueHandler] = TargetQueueHandler) -> None:
+    handler = handler_class(_queue, target)
+    target_logger.addHandler(handler)
+    _queue_handlers.append((target_logger, handler))
+
+
+def setup_logging(log_dir: Path = RAMDISK) -> None:
+    global _listener, _ring
     format_str_detailed = '%(asctime)s - {%(name)s:%(lineno)s} - %(levelname)s - %(message)s'
     format_str_short = '%(asctime)s - %(message)s'
-    logging.basicConfig(filename=str(Path(__file__).resolve().parents[2] / 'ramdisk' / ('main.log')),
-                        format=format_str_detailed,
-                        level=logging.DEBUG)
-    logging.getLogger().handlers[0].addFilter(filter_soc_neg)
+    main_handler = _file_handler(log_dir / 'main.log', format_str_detailed, filter_soc_neg)
+    _ring = DebugRingBuffer(main_handler)
+    _ring.addFilter(filter_soc_neg)
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    # Der Ringpuffer zuerst, damit die vorgehaltenen Records vor dem Fehler in der Datei stehen.
+    _add_handler(root, _ring, RingQueueHandler)
+    _add_handler(root, main_handler)
 
+    mqtt_handler = _file_handler(log_dir / 'mqtt.log', format_str_short)
+    # Der Level wird mit set_level am Logger gesetzt, damit die Topics nur bei Bedarf formatiert werden.
+    mqtt_handler.setLevel(logging.DEBUG)
     mqtt_log = logging.getLogger("mqtt")
     mqtt_log.propagate = False
-    mqtt_file_handler = logging.FileHandler(str(Path(__file__).resolve().parents[2] / 'ramdisk' / ('mqtt.log')))
-    mqtt_file_handler.setFormatter(logging.Formatter(format_str_short))
-    mqtt_log.addHandler(mqtt_file_handler)
+    _add_handler(mqtt_log, mqtt_handler)
 
+    soc_handler = _file_handler(log_dir / 'soc.log', format_str_detailed, filter_soc_pos)
     soc_log = logging.getLogger("soc")
     soc_log.propagate = True
-    soc_file_handler = logging.FileHandler(str(Path(__file__).resolve().parents[2] / 'ramdisk' / ('soc.log')))
-    soc_file_handler.setFormatter(logging.Formatter(format_str_detailed))
-    soc_file_handler.addFilter(filter_soc_pos)
-    soc_log.addHandler(soc_file_handler)
+    _add_handler(soc_log, soc_handler)
 
+    urllib3_handler = _file_handler(log_dir / 'soc.log', format_str_detailed, filter_soc_pos)
     urllib3_log = logging.getLogger("urllib3.connectionpool")
     urllib3_log.propagate = True
-    urllib3_file_handler = logging.FileHandler(str(Path(__file__).resolve().parents[2] / 'ramdisk' / ('soc.log')))
-    urllib3_file_handler.setFormatter(logging.Formatter(format_str_detailed))
-    urllib3_file_handler.addFilter(filter_soc_pos)
-    urllib3_log.addHandler(urllib3_file_handler)
+    _add_handler(urllib3_log, urllib3_handler)
 
     logging.getLogger("pymodbus").setLevel(logging.WARNING)
 
+    _file_handlers.extend((main_handler, soc_handler, urllib3_handler))
+    set_level(logging.DEBUG)
+    _listener = TargetQueueListener(_queue)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """ schreibt die Warteschlange aus und entfernt die Handler von setup_logging."""
+    global _listener, _ring
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    _ring = None
+    for target_logger, handler in _queue_handlers:
+        target_logger.removeHandler(handler)
+        handler.target.close()
+    _queue_handlers.clear()
+    _file_handlers.clear()
+
+
+def set_level(level: int) -> None:
+    """ legt fest, ab welchem Level in die Log-Dateien geschrieben wird."""
+    for handler in _file_handlers:
+        handler.setLevel(level)
+    logging.getLogger("mqtt").setLevel(level)
+
+
+def is_debug_logged() -> bool:
+    """ Debug-Ausgaben werden in main.log geschrieben."""
+    if not _file_handlers:
+        return logging.getLogger().isEnabledFor(logging.DEBUG)
+    return _file_handlers[0].level <= logging.DEBUG
+
+
+def new_cycle() -> None:
+    """ beginnt im Ringpuffer einen neuen Regelzyklus."""
+    if _ring is not None:
+        _queue.put_nowait((_ring, _NEW_CYCLE))
+
+
+def flush_debug_buffer() -> None:
+    """ schreibt die vorgehaltene Debug-Ausgabe in main.log."""
+    if _ring is not None:
+        _queue.put_nowait((_ring, _DUMP))
+
 
 log = logging.getLogger(__name__)
 
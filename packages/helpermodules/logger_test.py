@@ -0,0 +1,123 @@
+import logging
+import queue
+from typing import List
+
+import pytest
+
+from helpermodules.logger import DebugRingBuffer, RingQueueHandler, TargetQueueHandler, TargetQueueListener
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level: int) -> None:
+        super().__init__(level)
+        self.messages: List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def pipeline():
+    log_queue = queue.SimpleQueue()
+    target = ListHandler(logging.WARNING)
+    ring = DebugRingBuffer(target, cycles=2)
+    log = logging.getLogger("logger_test")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    handlers = [RingQueueHandler(log_queue, ring), TargetQueueHandler(log_queue, target)]
+    for handler in handlers:
+        log.addHandler(handler)
+    listener = TargetQueueListener(log_queue)
+    listener.start()
+    yield log, log_queue, ring, target, listener
+    if listener._thread is not None:
+        listener.stop()
+    for handler in handlers:
+        log.removeHandler(handler)
+
+
+def test_records_below_level_are_buffered(pipeline):
+    # setup
+    log, log_queue, ring, target, listener = pipeline
+
+    # execution
+    log.debug("Wert %s", 1)
+    log.warning("Warnung %s", 2)
+    listener.stop()
+
+    # evaluation
+    assert target.messages == ["Warnung 2"]
+    assert [record.getMessage() for record in ring.cycles[-1]] == ["Wert 1"]
+
+
+@pytest.mark.parametrize("dump", [True, False], ids=["auf Anforderung", "Fehler"])
+def test_dump_writes_last_cycles(pipeline, dump: bool):
+    # setup
+    log, log_queue, ring, target, listener = pipeline
+
+    # execution
+    for cycle in range(3):
+        log_queue.put_nowait((ring, "new_cycle"))
+        log.info("Zyklus %s", cycle)
+    if dump:
+        log_queue.put_nowait((ring, "dump"))
+    else:
+        log.error("Fehler")
+    listener.stop()
+
+    # evaluation
+    expected = ["Debug-Ausgabe der letzten 2 Zyklen (2 Records)", "Zyklus 1", "Zyklus 2"]
+    assert target.messages == expected if dump else expected + ["Fehler"]
+    assert list(ring.cycles) == [[]]
+
+
+def test_debug_level_writes_directly(pipeline):
+    # setup
+    log, log_queue, ring, target, listener = pipeline
+    target.setLevel(logging.DEBUG)
+
+    # execution
+    log.debug("Wert %s", 1)
+    log.error("Fehler")
+    listener.stop()
+
+    # evaluation
+    assert target.messages == ["Wert 1", "Fehler"]
+
+
+def test_repeated_error_dumps_once(pipeline):
+    # setup
+    log, log_queue, ring, target, listener = pipeline
+
+    # execution
+    for cycle in range(3):
+        log_queue.put_nowait((ring, "new_cycle"))
+        log.debug("Zyklus %s", cycle)
+        log.error("Gerät nicht erreichbar")
+    log.error("anderer Fehler")
+    listener.stop()
+
+    # evaluation
+    assert target.messages == ["Debug-Ausgabe der letzten 2 Zyklen (1 Records)", "Zyklus 0",
+                               "Gerät nicht erreichbar", "Gerät nicht erreichbar", "Gerät nicht erreichbar",
+                               "Debug-Ausgabe der letzten 2 Zyklen (2 Records)", "Zyklus 1", "Zyklus 2",
+                               "anderer Fehler"]
+
+
+def test_buffered_record_is_resolved(pipeline):
+    # setup
+    log, log_queue, ring, target, listener = pipeline
+    values = {"power": 1}
+
+    # execution
+    try:
+        raise ValueError("kaputt")
+    except ValueError:
+        log.debug("Werte %s", values, exc_info=True)
+    values["power"] = 2
+    listener.stop()
+
+    # evaluation
+    record = ring.cycles[-1][0]
+    assert (record.msg, record.args, record.exc_info) == ("Werte {'power': 1}", None, None)
+    assert "ValueError: kaputt" in record.exc_text
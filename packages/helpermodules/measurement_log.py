@@ -3,7 +3,7 @@
 from decimal import Decimal
 import json
 import logging
-import pathlib
+import os
 from pathlib import Path
 from typing import Dict, List
 
@@ -24,7 +24,8 @@ def measurement_log_daily():
 
 def save_log(folder):
     """ erstellt für jeden Tag eine Datei, die die Daten für den Langzeitgraph enthält.
-    Dazu werden alle 5 Min folgende Daten als json-Liste gespeichert:
+    Dazu werden alle 5 Min folgende Daten als Zeile im Format json-lines angehängt, get_daily_log und
+    get_monthly_log liefern sie in diesem Format:
     {"entries": [
         {
             "timestamp": int,
@@ -172,75 +173,147 @@ def save_log(folder):
         "bat": bat_dict
     }
 
-    # json-Objekt in Datei einfügen
+    # Eintrag an die Datei anhängen
     if folder == "daily":
-        (pathlib.Path(__file__).resolve().parents[2] / "data"/"daily_log").mkdir(mode=0o755,
-                                                                                 parents=True, exist_ok=True)
-        filepath = str(
-            Path(__file__).resolve().parents[2] / "data" / "daily_log" /
-            (timecheck.create_timestamp_YYYYMMDD() + ".json"))
+        name = timecheck.create_timestamp_YYYYMMDD()
     else:
-        (pathlib.Path(__file__).resolve().parents[2] / "data"/"monthly_log").mkdir(mode=0o755,
-                                                                                   parents=True, exist_ok=True)
-        filepath = str(
-            Path(__file__).resolve().parents[2] / "data" / "monthly_log" /
-            (timecheck.create_timestamp_YYYYMM() + ".json"))
+        name = timecheck.create_timestamp_YYYYMM()
+    return append_entry(_log_folder(folder) / name, new_entry)
+
+
+def _log_folder(folder: str) -> Path:
+    path = Path(__file__).resolve().parents[2] / "data" / f"{folder}_log"
+    path.mkdir(mode=0o755, parents=True, exist_ok=True)
+    return path
+
+
+def append_entry(base: Path, entry: Dict) -> Dict:
+    """ hängt den Eintrag als Zeile an <base>.jsonl an und aktualisiert die Summen in <base>.totals. Dort wird
+    neben den Summen auch der vorherige Eintrag abgelegt, damit für die Summen nicht alle Einträge gelesen werden
+    müssen. Eine Datei im alten Format (<base>.json) wird vorher konvertiert.
+
+    Return
+    ------
+    Summen aller Einträge
+    """
+    entries_path, totals_path = base.with_suffix(".jsonl"), base.with_suffix(".totals")
+    legacy_path = base.with_suffix(".json")
+    if legacy_path.exists() and not entries_path.exists():
+        _convert_legacy_log(legacy_path, entries_path, totals_path)
+    # Geht die Aktualisierung der Summen verloren, ist die Differenz zum nächsten Eintrag entsprechend größer, da
+    # die Zählerstände fortlaufend sind.
+    sidecar = _read_totals(entries_path, totals_path)
+    add_to_totals(sidecar["totals"], sidecar["prev_entry"], entry)
+    line = json.dumps(entry) + "\n"
+    with open(str(entries_path), "ab+") as f:
+        # Ist die letzte Zeile unvollständig geschrieben worden, den Eintrag in einer neuen Zeile beginnen.
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = "\n" + line
+        f.write(line.encode())
+    _write_totals(totals_path, sidecar["totals"], entry)
+    return sidecar["totals"]
+
+
+def _convert_legacy_log(legacy_path: Path, entries_path: Path, totals_path: Path) -> None:
+    with open(str(legacy_path), "r") as jsonFile:
+        entries = json.load(jsonFile)["entries"]
+    with open(str(entries_path), "w") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    _write_totals(totals_path, get_totals(entries), entries[-1] if entries else {})
+    legacy_path.unlink()
+    log.debug(f"Logfile {legacy_path} in das Format json-lines konvertiert.")
+
+
+def _read_entries(entries_path: Path) -> List[Dict]:
+    entries = []
+    with open(str(entries_path), "r") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except json.decoder.JSONDecodeError:
+                    # Unvollständig geschriebene Zeile, z.B. nach einem Stromausfall
+                    log.warning(f"Unvollständiger Eintrag in {entries_path} wird übersprungen: {line.strip()}")
+    return entries
+
+
+def _read_totals(entries_path: Path, totals_path: Path) -> Dict:
     try:
-        with open(filepath, "r") as jsonFile:
-            content = json.load(jsonFile)
-    except FileNotFoundError:
-        with open(filepath, "w") as jsonFile:
-            json.dump({"entries": [], "totals": {}}, jsonFile)
-        with open(filepath, "r") as jsonFile:
-            content = json.load(jsonFile)
-    entries = content["entries"]
-    entries.append(new_entry)
-    content["totals"] = get_totals(entries)
-    with open(filepath, "w") as jsonFile:
-        json.dump(content, jsonFile)
-    return content["totals"]
+        with open(str(totals_path), "r") as jsonFile:
+            return json.load(jsonFile)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        # Summen fehlen oder sind unvollständig geschrieben, aus den Einträgen neu berechnen.
+        try:
+            entries = _read_entries(entries_path)
+        except FileNotFoundError:
+            entries = []
+        return {"totals": get_totals(entries), "prev_entry": entries[-1] if entries else {}}
+
+
+def _write_totals(totals_path: Path, totals: Dict, prev_entry: Dict) -> None:
+    tmp_path = totals_path.with_suffix(".tmp")
+    with open(str(tmp_path), "w") as jsonFile:
+        json.dump({"totals": totals, "prev_entry": prev_entry}, jsonFile)
+    os.replace(str(tmp_path), str(totals_path))
 
 
 def get_totals(entries: List) -> Dict:
     totals = {"cp": {}, "counter": {}, "pv": {}, "bat": {}}
     prev_entry = {}
-    for group in totals.keys():
-        for entry in entries:
-            for module in entry[group]:
-                if not prev_entry or module not in totals[group]:
-                    totals[group][module] = {"exported": 0} if group == "pv" else {"imported": 0, "exported": 0}
-                else:
-                    for key, value in entry[group][module].items():
-                        if key != "soc":
-                            try:
-                                prev_value = prev_entry[group][module][key]
-                            # Wenn ein Modul neu hinzugefügt wurde, das es mit dieser ID schonmal gab, werden die Werte
-                            # zusammen addiert.
-                            except KeyError:
-                                prev_value = entry[group][module][key]
-                            # avoid floating point issues with using Decimal
-                            value = (Decimal(str(value))
-                                     - Decimal(str(prev_value))
-                                     + Decimal(str(totals[group][module][key])))
-                            value = f'{value: f}'
-                            # remove trailing zeros
-                            totals[group][module][key] = float(value) if "." in value else int(value)
-            prev_entry = entry
+    for entry in entries:
+        add_to_totals(totals, prev_entry, entry)
+        prev_entry = entry
     return totals
 
 
+def add_to_totals(totals: Dict, prev_entry: Dict, entry: Dict) -> None:
+    """ addiert die Differenz zwischen dem vorherigen und dem neuen Eintrag zu den Summen.
+    """
+    for group in totals.keys():
+        for module in entry[group]:
+            if not prev_entry or module not in totals[group]:
+                totals[group][module] = {"exported": 0} if group == "pv" else {"imported": 0, "exported": 0}
+            else:
+                for key, value in entry[group][module].items():
+                    if key != "soc":
+                        try:
+                            prev_value = prev_entry[group][module][key]
+                        # Wenn ein Modul neu hinzugefügt wurde, das es mit dieser ID schonmal gab, werden die Werte
+                        # zusammen addiert.
+                        except KeyError:
+                            prev_value = entry[group][module][key]
+                        # avoid floating point issues with using Decimal
+                        value = (Decimal(str(value))
+                                 - Decimal(str(prev_value))
+                                 + Decimal(str(totals[group][module][key])))
+                        value = f'{value: f}'
+                        # remove trailing zeros
+                        totals[group][module][key] = float(value) if "." in value else int(value)
+
+
 def get_daily_log(date: str):
-    try:
-        with open(str(Path(__file__).resolve().parents[2] / "data"/"daily_log"/(date+".json")), "r") as jsonFile:
-            return json.load(jsonFile)
-    except FileNotFoundError:
-        pass
-    return []
+    return _read_log("daily", date)
 
 
 def get_monthly_log(date: str):
+    return _read_log("monthly", date)
+
+
+def _read_log(folder: str, date: str):
+    """ liefert das Log im Format {"entries": [...], "totals": {...}}, unabhängig davon, ob es als json-lines oder
+    im alten Format gespeichert ist.
+    """
+    base = Path(__file__).resolve().parents[2] / "data" / f"{folder}_log" / date
+    entries_path = base.with_suffix(".jsonl")
+    try:
+        entries = _read_entries(entries_path)
+        return {"entries": entries, "totals": _read_totals(entries_path, base.with_suffix(".totals"))["totals"]}
+    except FileNotFoundError:
+        pass
     try:
-        with open(str(Path(__file__).resolve().parents[2] / "data"/"monthly_log"/(date+".json")), "r") as jsonFile:
+        with open(str(base.with_suffix(".json")), "r") as jsonFile:
             return json.load(jsonFile)
     except FileNotFoundError:
         pass
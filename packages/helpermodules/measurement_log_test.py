@@ -1,3 +1,4 @@
+import json
 from unittest.mock import Mock
 import pytest
 from helpermodules import measurement_log
@@ -54,6 +55,57 @@ def test_get_daily_yields(monkeypatch):
     assert calls[15].args[0] == "openWB/set/pv/1/get/daily_exported" and calls[15].args[1] == 247
 
 
+def test_append_entry_keeps_running_totals(tmp_path):
+    # execution
+    for entry in SAMPLE:
+        totals = measurement_log.append_entry(tmp_path / "20220610", entry)
+
+    # evaluation
+    assert totals == TOTALS
+    assert len((tmp_path / "20220610.jsonl").read_text().splitlines()) == len(SAMPLE)
+
+
+def test_append_entry_converts_legacy_log(tmp_path):
+    # setup
+    (tmp_path / "20220610.json").write_text(json.dumps({"entries": SAMPLE[:-1], "totals": {}}))
+
+    # execution
+    totals = measurement_log.append_entry(tmp_path / "20220610", SAMPLE[-1])
+
+    # evaluation
+    assert totals == TOTALS
+    assert not (tmp_path / "20220610.json").exists()
+
+
+def test_totals_recalculated_without_sidecar(tmp_path):
+    # setup
+    for entry in SAMPLE[:-1]:
+        measurement_log.append_entry(tmp_path / "20220610", entry)
+    (tmp_path / "20220610.totals").unlink()
+
+    # execution
+    totals = measurement_log.append_entry(tmp_path / "20220610", SAMPLE[-1])
+
+    # evaluation
+    assert totals == TOTALS
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    # setup
+    for entry in SAMPLE[:-1]:
+        measurement_log.append_entry(tmp_path / "20220610", entry)
+    (tmp_path / "20220610.totals").unlink()
+    with open(str(tmp_path / "20220610.jsonl"), "a") as f:
+        f.write(json.dumps(SAMPLE[-1])[:40])
+
+    # execution
+    totals = measurement_log.append_entry(tmp_path / "20220610", SAMPLE[-1])
+
+    # evaluation
+    assert totals == TOTALS
+    assert measurement_log._read_entries(tmp_path / "20220610.jsonl") == SAMPLE
+
+
 SAMPLE = [{'bat': {'all': {'exported': 0, 'imported': 58.774, 'soc': 51},
           'bat2': {'exported': 0, 'imported': 61.752, 'soc': 51}},
            'counter': {'counter0': {'exported': 3.816, 'imported': 0.284}},
@@ -0,0 +1,148 @@
+"""Prozessweiter Pool für MQTT-Verbindungen zu anderen Brokern, z.B. zu externen openWB.
+
+Je Host wird eine Verbindung offen gehalten, die paho im eigenen Thread bei Verbindungsabbruch wieder aufbaut. Die
+Nachrichten werden je Host in einer begrenzten Warteschlange gesammelt und gemeinsam gesendet, sobald die Verbindung
+besteht. Da alle Nachrichten retained gesendet werden, ersetzt eine neue Nachricht eine noch nicht gesendete für
+dasselbe Topic. Ist die Warteschlange voll, wird die älteste Nachricht verworfen.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+from helpermodules import pub
+
+log = logging.getLogger(__name__)
+
+# Anzahl Hosts, zu denen Verbindungen offen gehalten werden
+MAX_HOSTS = 32
+# noch nicht gesendete Nachrichten je Host
+MAX_QUEUED = 100
+# Wartezeit in Sekunden für das Senden der ausstehenden Nachrichten beim Beenden
+FLUSH_TIMEOUT = 2
+
+
+class RemoteBroker:
+    def __init__(self, host: str, port: int = 1883) -> None:
+        self.host = host
+        self._lock = threading.Lock()
+        # Topic -> (Payload, retain), in der Reihenfolge des Eingangs
+        self._pending: "OrderedDict[str, Tuple[Any, bool]]" = OrderedDict()
+        self._connected = False
+        self._last_sent: Optional[mqtt.MQTTMessageInfo] = None
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.connects = 0
+        self.client = mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.client.connect_async(host, port)
+        self.client.loop_start()
+
+    def publish(self, topic: str, payload: Any, retain: bool = True) -> None:
+        with self._lock:
+            if topic in self._pending:
+                self.coalesced += 1
+                del self._pending[topic]
+            self._pending[topic] = (payload, retain)
+            if len(self._pending) > MAX_QUEUED:
+                dropped, _ = self._pending.popitem(last=False)
+                self.dropped += 1
+                log.error(f"MQTT {self.host}: Warteschlange voll, {dropped} verworfen.")
+            if self._connected:
+                self._send_pending()
+
+    def _send_pending(self) -> None:
+        while self._pending:
+            topic, (payload, retain) = self._pending.popitem(last=False)
+            info = self.client.publish(topic, payload, retain=retain)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                # Die Verbindung ist abgebrochen, nach dem erneuten Verbinden senden.
+                self._pending[topic] = (payload, retain)
+                self._pending.move_to_end(topic, last=False)
+                self._connected = False
+                return
+            self._last_sent = info
+            self.published += 1
+
+    def _on_connect(self, client, userdata, flags, rc) -> None:
+        if rc != 0:
+            log.error(f"MQTT {self.host}: Verbindung abgelehnt, {mqtt.connack_string(rc)}")
+            return
+        with self._lock:
+            self.connects += 1
+            self._connected = True
+            self._send_pending()
+
+    def _on_disconnect(self, client, userdata, rc) -> None:
+        with self._lock:
+            self._connected = False
+        if rc != 0:
+            log.warning(f"MQTT {self.host}: Verbindung unterbrochen, wird erneut aufgebaut.")
+
+    def is_idle(self) -> bool:
+        """ alle Nachrichten wurden an den Socket übergeben"""
+        with self._lock:
+            return not self._pending and (self._last_sent is None or self._last_sent.is_published())
+
+    def close(self) -> None:
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {"connected": self._connected, "connects": self.connects, "published": self.published,
+                    "coalesced": self.coalesced, "dropped": self.dropped, "pending": len(self._pending)}
+
+
+class MqttClientPool:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._brokers: "OrderedDict[str, RemoteBroker]" = OrderedDict()
+
+    def get(self, host: str) -> RemoteBroker:
+        evicted = None
+        with self._lock:
+            try:
+                self._brokers.move_to_end(host)
+                return self._brokers[host]
+            except KeyError:
+                broker = self._brokers[host] = RemoteBroker(host)
+                if len(self._brokers) > MAX_HOSTS:
+                    _, evicted = self._brokers.popitem(last=False)
+        if evicted is not None:
+            evicted.close()
+        return broker
+
+    def publish(self, host: str, topic: str, payload: Any, retain: bool = True) -> None:
+        self.get(host).publish(topic, payload, retain)
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT) -> bool:
+        """ wartet höchstens timeout Sekunden, bis alle Nachrichten gesendet wurden.
+        """
+        with self._lock:
+            brokers = list(self._brokers.values())
+        deadline = time.monotonic() + timeout
+        while not all(broker.is_idle() for broker in brokers):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            brokers = list(self._brokers.items())
+        return {host: broker.to_dict() for host, broker in brokers}
+
+    def pub_stats(self) -> None:
+        pub.Pub().pub("openWB/system/perf/mqtt", self.stats())
+
+
+pool = MqttClientPool()
+atexit.register(pool.flush)
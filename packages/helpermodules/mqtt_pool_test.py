@@ -0,0 +1,99 @@
+from unittest.mock import Mock
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from helpermodules import mqtt_pool, pub
+from helpermodules.mqtt_pool import MqttClientPool, RemoteBroker
+
+
+@pytest.fixture(autouse=True)
+def client(monkeypatch) -> Mock:
+    client = Mock()
+    client.publish.return_value = Mock(rc=mqtt.MQTT_ERR_SUCCESS, **{"is_published.return_value": True})
+    monkeypatch.setattr(mqtt_pool.mqtt, "Client", Mock(return_value=client))
+    return client
+
+
+def published(client: Mock):
+    return [(c[0][0], c[0][1]) for c in client.publish.call_args_list]
+
+
+def test_messages_are_queued_until_connected(client):
+    # setup
+    broker = RemoteBroker("192.168.1.2")
+
+    # execution
+    broker.publish("openWB/set/isss/Current", 16)
+    broker.publish("openWB/set/isss/heartbeat", 0)
+    broker.publish("openWB/set/isss/Current", 10)
+    queued = published(client)
+    broker._on_connect(client, None, None, 0)
+
+    # evaluation
+    assert queued == []
+    assert published(client) == [("openWB/set/isss/heartbeat", 0), ("openWB/set/isss/Current", 10)]
+    assert broker.to_dict() == {"connected": True, "connects": 1, "published": 2, "coalesced": 1, "dropped": 0,
+                                "pending": 0}
+    client.connect_async.assert_called_once_with("192.168.1.2", 1883)
+
+
+def test_queue_is_bounded(client, monkeypatch):
+    # setup
+    monkeypatch.setattr(mqtt_pool, "MAX_QUEUED", 2)
+    broker = RemoteBroker("192.168.1.2")
+
+    # execution
+    for topic in ("a", "b", "c"):
+        broker.publish(topic, 1)
+    broker._on_connect(client, None, None, 0)
+
+    # evaluation
+    assert published(client) == [("b", 1), ("c", 1)]
+    assert broker.dropped == 1
+
+
+def test_failed_publish_is_resent_after_reconnect(client):
+    # setup
+    broker = RemoteBroker("192.168.1.2")
+    broker._on_connect(client, None, None, 0)
+    client.publish.return_value = Mock(rc=mqtt.MQTT_ERR_NO_CONN)
+
+    # execution
+    broker.publish("a", 1)
+    client.publish.return_value = Mock(rc=mqtt.MQTT_ERR_SUCCESS)
+    broker._on_connect(client, None, None, 0)
+
+    # evaluation
+    assert published(client) == [("a", 1), ("a", 1)]
+    assert broker.published == 1
+
+
+def test_pool_keeps_one_connection_per_host(monkeypatch):
+    # setup
+    monkeypatch.setattr(mqtt_pool, "MAX_HOSTS", 2)
+    pool = MqttClientPool()
+
+    # execution
+    first = pool.get("host1")
+    pool.get("host2")
+    reused = pool.get("host1")
+    pool.get("host3")
+
+    # evaluation
+    assert reused is first
+    assert list(pool.stats()) == ["host1", "host3"]
+
+
+def test_pub_single_uses_pool(monkeypatch):
+    # setup
+    pool = Mock()
+    monkeypatch.setattr(mqtt_pool, "pool", pool)
+
+    # execution
+    pub.pub_single("openWB/set/isss/parentWB", "192.168.1.1", hostname="192.168.1.2")
+    pub.pub_single("openWB/evu/WHImported_temp", 100, no_json=True)
+
+    # evaluation
+    assert pool.publish.call_args_list[0][0] == ("192.168.1.2", "openWB/set/isss/parentWB", '"192.168.1.1"')
+    assert pool.publish.call_args_list[1][0] == ("localhost", "openWB/evu/WHImported_temp", 100)
@@ -1,31 +1,132 @@
 """Modul, das die publish-Verbindung zum Broker bereit stellt.
 """
 
+from contextlib import contextmanager
 import json
 import logging
 import os
+import threading
+from typing import Dict
 
 import paho.mqtt.client as mqtt
-import paho.mqtt.publish as publish
+
+from helpermodules import mqtt_pool, retained_mirror
 
 log = logging.getLogger(__name__)
 
 
+class PubStats:
+    def __init__(self) -> None:
+        self.published = 0
+        # nicht gesendet, da der Broker bereits den identischen retained Wert hat
+        self.suppressed = 0
+        # innerhalb eines Batches durch einen späteren Wert für dasselbe Topic ersetzt
+        self.coalesced = 0
+
+    def to_dict(self) -> Dict:
+        return {"published": self.published, "suppressed": self.suppressed, "coalesced": self.coalesced}
+
+
 class PubSingleton:
+    """ Retained Werte, die identisch zum zuletzt gesendeten Wert sind, werden nicht erneut gesendet. Ändert oder
+    löscht ein anderer Client ein Topic, entfernt der retained_mirror den zuletzt gesendeten Wert, sodass der nächste
+    Wert wieder gesendet wird. Da der retained_mirror die eigenen Nachrichten erst nach dem Umweg über den Broker
+    empfängt, entscheidet er nie darüber, ob gesendet wird, sondern verwirft nur zwischengespeicherte Werte.
+    Innerhalb eines Batches (nur für den Thread, der den Batch gestartet hat) werden die Nachrichten gesammelt und erst
+    beim flush gesendet, wobei für jedes Topic nur der letzte Wert gesendet wird.
+    """
+
     def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Topic -> zuletzt gesendeter retained Payload
+        self._last: Dict[str, str] = {}
+        self._local = threading.local()
+        self.stats = PubStats()
+        retained_mirror.mirror.add_listener(self._on_broker_message)
         self.client = mqtt.Client("openWB-python-bulkpublisher-" + str(os.getpid()))
+        self.client.on_connect = self._on_connect
         self.client.connect("localhost", 1886)
         self.client.loop_start()
 
+    def _on_connect(self, client, userdata, flags, rc) -> None:
+        # Nach einem Verbindungsabbruch ist nicht bekannt, welche Werte der Broker noch hat.
+        with self._lock:
+            self._last.clear()
+
+    def _on_broker_message(self, topic: str, payload: bytes) -> None:
+        """ verwirft den zuletzt gesendeten Wert, wenn der Broker einen anderen Wert meldet. Das ist auch bei den
+        eigenen, noch nicht zurückgemeldeten Nachrichten der Fall und führt dann nur zu einem erneuten Senden.
+        """
+        with self._lock:
+            last = self._last.get(topic)
+            if last is not None and last.encode("utf-8") != payload:
+                del self._last[topic]
+
     def pub(self, topic: str, payload, qos: int = 0, retain: bool = True) -> None:
         try:
-            if payload == "":
-                self.client.publish(topic, payload, qos=qos, retain=retain)
+            encoded = payload if payload == "" else json.dumps(payload)
+            pending = getattr(self._local, "pending", None)
+            if pending is not None:
+                if topic in pending:
+                    with self._lock:
+                        self.stats.coalesced += 1
+                    # Reihenfolge der Topics beibehalten, der Wert wird ersetzt.
+                    del pending[topic]
+                pending[topic] = (encoded, qos, retain)
             else:
-                self.client.publish(topic, payload=json.dumps(payload), qos=qos, retain=retain)
+                self._publish(topic, encoded, qos, retain)
         except Exception:
             log.exception("Fehler im pub-Modul")
 
+    @contextmanager
+    def batch(self):
+        """ sammelt die Nachrichten des aufrufenden Threads und sendet sie am Ende gemeinsam. Ein verschachtelter
+        Batch gehört zum äußeren Batch und wird mit diesem gesendet.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
+        self._local.pending = {}
+        try:
+            yield
+        finally:
+            self.flush()
+
+    def flush(self) -> None:
+        pending = getattr(self._local, "pending", None)
+        self._local.pending = None
+        if pending:
+            for topic, (encoded, qos, retain) in pending.items():
+                try:
+                    self._publish(topic, encoded, qos, retain)
+                except Exception:
+                    log.exception("Fehler im pub-Modul")
+        with self._lock:
+            stats = self.stats.to_dict()
+        log.debug(f"Pub: {stats}")
+        self.client.publish("openWB/system/perf/pub", payload=json.dumps(stats), retain=True)
+
+    def _publish(self, topic: str, encoded: str, qos: int, retain: bool) -> None:
+        with self._lock:
+            if retain and encoded != "" and self._is_unchanged(topic, encoded):
+                self.stats.suppressed += 1
+                return
+            if retain:
+                self._last[topic] = encoded
+            else:
+                self._last.pop(topic, None)
+            self.stats.published += 1
+        self.client.publish(topic, payload=encoded, qos=qos, retain=retain)
+
+    def _is_unchanged(self, topic: str, encoded: str) -> bool:
+        if topic.startswith("openWB/set/"):
+            # setdata löscht das set-Topic nach der Verarbeitung und sendet den Wert an das Topic ohne "set/". Solange
+            # das set-Topic noch nicht verarbeitet wurde, muss jeder Wert gesendet werden.
+            if self._last.get(topic, "") != "":
+                return False
+            topic = topic.replace("set/", "", 1)
+        return self._last.get(topic) == encoded
+
 
 class Pub:
     instance = None
@@ -39,7 +140,8 @@ class Pub:
 
 
 def pub_single(topic, payload, hostname="localhost", no_json=False):
-    """ published eine einzelne Nachricht an einen Host, der nicht der localhost ist.
+    """ published eine einzelne Nachricht an einen Host, der nicht der localhost ist. Die Nachricht wird über die
+    Verbindung zum Host aus mqtt_pool gesendet, sobald diese besteht.
 
         Parameter
     ---------
@@ -53,9 +155,6 @@ def pub_single(topic, payload, hostname="localhost", no_json=False):
         Kompatibilität mit ISSS, die ramdisk verwenden.
     """
     try:
-        if no_json:
-            publish.single(topic, payload, hostname=hostname, retain=True)
-        else:
-            publish.single(topic, json.dumps(payload), hostname=hostname, retain=True)
+        mqtt_pool.pool.publish(hostname, topic, payload if no_json else json.dumps(payload))
     except Exception:
         log.exception(f"Fehler im pub-Modul. Host {hostname}")
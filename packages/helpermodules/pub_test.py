@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+from unittest.mock import Mock, call
+
+import pytest
+
+from helpermodules import pub, retained_mirror
+from helpermodules.pub import PubSingleton
+from helpermodules.retained_mirror import RetainedMirror
+
+
+@pytest.fixture
+def mirror(monkeypatch) -> RetainedMirror:
+    mirror = RetainedMirror()
+    monkeypatch.setattr(retained_mirror, "mirror", mirror)
+    return mirror
+
+
+@pytest.fixture
+def pub_singleton(monkeypatch, mirror: RetainedMirror) -> PubSingleton:
+    monkeypatch.setattr(pub.mqtt, "Client", Mock())
+    return PubSingleton()
+
+
+def broker_message(mirror: RetainedMirror, topic: str, payload: str) -> None:
+    mirror.on_message(None, None, SimpleNamespace(topic=topic, payload=payload.encode("utf-8")))
+
+
+def published(pub_singleton: PubSingleton):
+    return [c for c in pub_singleton.client.publish.call_args_list if c[0][0] != "openWB/system/perf/pub"]
+
+
+def test_unchanged_retained_value_suppressed(pub_singleton: PubSingleton):
+    # execution
+    pub_singleton.pub("openWB/counter/0/get/power", 100)
+    pub_singleton.pub("openWB/counter/0/get/power", 100)
+    pub_singleton.pub("openWB/counter/0/get/power", 200)
+    pub_singleton.pub("openWB/counter/0/get/power", 200, retain=False)
+
+    # evaluation
+    assert published(pub_singleton) == [
+        call("openWB/counter/0/get/power", payload="100", qos=0, retain=True),
+        call("openWB/counter/0/get/power", payload="200", qos=0, retain=True),
+        call("openWB/counter/0/get/power", payload="200", qos=0, retain=False)]
+    assert pub_singleton.stats.to_dict() == {"published": 3, "suppressed": 1, "coalesced": 0}
+
+
+def test_set_topic_suppressed_only_after_processing(pub_singleton: PubSingleton):
+    # execution
+    pub_singleton.pub("openWB/set/chargepoint/1/set/current", 16)
+    # noch nicht von setdata verarbeitet
+    pub_singleton.pub("openWB/set/chargepoint/1/set/current", 16)
+    # setdata
+    pub_singleton.pub("openWB/chargepoint/1/set/current", 16)
+    pub_singleton.pub("openWB/set/chargepoint/1/set/current", "")
+    pub_singleton.pub("openWB/set/chargepoint/1/set/current", 16)
+
+    # evaluation
+    assert pub_singleton.stats.published == 4
+    assert pub_singleton.stats.suppressed == 1
+
+
+def test_batch_coalesces_until_flush(pub_singleton: PubSingleton):
+    # execution
+    with pub_singleton.batch():
+        pub_singleton.pub("openWB/pv/1/get/power", -100)
+        pub_singleton.pub("openWB/pv/2/get/power", -200)
+        pub_singleton.pub("openWB/pv/1/get/power", -300)
+        assert published(pub_singleton) == []
+
+    # evaluation
+    assert published(pub_singleton) == [call("openWB/pv/2/get/power", payload="-200", qos=0, retain=True),
+                                        call("openWB/pv/1/get/power", payload="-300", qos=0, retain=True)]
+    assert pub_singleton.stats.coalesced == 1
+
+
+def test_value_changed_by_other_client_is_sent(pub_singleton: PubSingleton, mirror: RetainedMirror):
+    # execution
+    pub_singleton.pub("openWB/system/update_in_progress", False)
+    broker_message(mirror, "openWB/system/update_in_progress", "false")
+    pub_singleton.pub("openWB/system/update_in_progress", False)
+    # z.B. atreboot.sh
+    broker_message(mirror, "openWB/system/update_in_progress", "true")
+    pub_singleton.pub("openWB/system/update_in_progress", False)
+    broker_message(mirror, "openWB/system/update_in_progress", "")
+    pub_singleton.pub("openWB/system/update_in_progress", False)
+
+    # evaluation
+    assert len(published(pub_singleton)) == 3
+    assert pub_singleton.stats.suppressed == 1
+
+
+@pytest.mark.parametrize("values", [(100, 200, 100), (100, "", 100)], ids=["X-Y-X", "X-leer-X"])
+def test_changed_value_sent_before_broker_echo(pub_singleton: PubSingleton, values):
+    # execution
+    for value in values:
+        pub_singleton.pub("openWB/counter/0/get/power", value)
+
+    # evaluation
+    assert [c[1]["payload"] for c in published(pub_singleton)] == [str(value) for value in values]
+    assert pub_singleton.stats.suppressed == 0
+
+
+def test_late_broker_echo_does_not_suppress(pub_singleton: PubSingleton, mirror: RetainedMirror):
+    # execution
+    pub_singleton.pub("openWB/counter/0/get/power", 100)
+    pub_singleton.pub("openWB/counter/0/get/power", 200)
+    # Der Broker meldet den ersten Wert erst nach dem Senden des zweiten zurück.
+    broker_message(mirror, "openWB/counter/0/get/power", "100")
+    broker_message(mirror, "openWB/counter/0/get/power", "200")
+    pub_singleton.pub("openWB/counter/0/get/power", 100)
+
+    # evaluation
+    assert [c[1]["payload"] for c in published(pub_singleton)] == ["100", "200", "100"]
+
+
+def test_nested_batch_sent_with_outer_batch(pub_singleton: PubSingleton):
+    # execution
+    with pub_singleton.batch():
+        pub_singleton.pub("openWB/pv/1/get/power", -100)
+        with pub_singleton.batch():
+            pub_singleton.pub("openWB/pv/2/get/power", -200)
+        assert published(pub_singleton) == []
+        pub_singleton.pub("openWB/pv/1/get/power", -300)
+
+    # evaluation
+    assert published(pub_singleton) == [call("openWB/pv/2/get/power", payload="-200", qos=0, retain=True),
+                                        call("openWB/pv/1/get/power", payload="-300", qos=0, retain=True)]
@@ -0,0 +1,127 @@
+"""Abbild der retained Topics des Brokers im Speicher.
+
+Ein Client abonniert einmalig openWB/# und hält alle retained Topics vor, sodass Befehle und UpdateConfig einen
+Zweig abfragen können, ohne eine eigene Verbindung aufzubauen und eine feste Zeit auf die retained Nachrichten zu
+warten. Nach dem Abonnieren sendet der Client eine nicht retained Nachricht an SYNC_TOPIC. Da der Broker die
+retained Nachrichten vor später gesendeten Nachrichten ausliefert, ist das Abbild vollständig, sobald diese Nachricht
+empfangen wurde.
+
+Mit MQTT 3.1.1 ist bei einem bestehenden Abonnement nicht erkennbar, ob eine Nachricht retained gesendet wurde. Die
+Topics, die nicht retained gesendet werden, werden daher über NON_RETAINED_TOPICS ausgeschlossen.
+"""
+import bisect
+import logging
+import re
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import paho.mqtt.client as mqtt
+
+from helpermodules import pub
+
+log = logging.getLogger(__name__)
+
+SYNC_TOPIC = "openWB/system/mirror/synced"
+# Topics, die setdata bzw. die SyncBarrier mit retain=False senden
+NON_RETAINED_TOPICS = re.compile(
+    "^openWB/(log/[^/]+/data|log/daily/.+|log/monthly/.+|system/device/module_update_completed)$")
+
+
+class RetainedMirror:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._topics: Dict[str, bytes] = {}
+        # sortierte Topics für die Abfrage von Zweigen
+        self._sorted: List[str] = []
+        self._bytes = 0
+        self._token: Optional[str] = None
+        self.synced = threading.Event()
+        self.client: Optional[mqtt.Client] = None
+        # werden für jede empfangene retained Nachricht mit Topic und Payload aufgerufen
+        self._listeners: List[Callable[[str, bytes], None]] = []
+
+    def add_listener(self, listener: Callable[[str, bytes], None]) -> None:
+        self._listeners.append(listener)
+
+    def start(self, host: str = "localhost", port: int = 1886) -> None:
+        self.client = mqtt.Client("openWB-mirror-" + uuid.uuid4().hex[:8])
+        self.client.on_connect = self._on_connect
+        self.client.on_subscribe = self._on_subscribe
+        self.client.on_message = self.on_message
+        self.client.connect_async(host, port)
+        self.client.loop_start()
+
+    def wait_synced(self, timeout: float = 5) -> bool:
+        if self.synced.wait(timeout) is False:
+            log.error("Retained Topics wurden noch nicht vollständig empfangen. Timeout abgelaufen.")
+            return False
+        return True
+
+    def _on_connect(self, client, userdata, flags, rc) -> None:
+        # Nach einem Verbindungsabbruch neu aufbauen, da in der Zwischenzeit gelöschte Topics nicht empfangen wurden.
+        with self._lock:
+            self.synced.clear()
+            self._token = uuid.uuid4().hex
+            self._topics.clear()
+            self._sorted.clear()
+            self._bytes = 0
+        client.subscribe("openWB/#", 2)
+
+    def _on_subscribe(self, client, userdata, mid, granted_qos) -> None:
+        client.publish(SYNC_TOPIC, self._token, qos=2, retain=False)
+
+    def on_message(self, client, userdata, msg) -> None:
+        if msg.topic == SYNC_TOPIC:
+            if msg.payload.decode("utf-8") == self._token:
+                self.synced.set()
+            return
+        if NON_RETAINED_TOPICS.match(msg.topic):
+            return
+        self.update(msg.topic, msg.payload)
+        for listener in self._listeners:
+            listener(msg.topic, msg.payload)
+
+    def update(self, topic: str, payload: bytes) -> None:
+        """ übernimmt eine Nachricht. Ein leerer Payload löscht das Topic."""
+        with self._lock:
+            previous = self._topics.pop(topic, None)
+            if previous is not None:
+                self._bytes -= len(topic) + len(previous)
+            if payload:
+                self._topics[topic] = payload
+                self._bytes += len(topic) + len(payload)
+                if previous is None:
+                    bisect.insort(self._sorted, topic)
+            elif previous is not None:
+                del self._sorted[bisect.bisect_left(self._sorted, topic)]
+
+    def get(self, topic: str) -> Optional[bytes]:
+        with self._lock:
+            return self._topics.get(topic)
+
+    def branch(self, topic: str) -> Dict[str, bytes]:
+        """ Topics, die das Abonnement topic + "#" empfangen würde, also das Topic selbst und alle darunter.
+        topic endet mit "/" oder ist leer.
+        """
+        with self._lock:
+            result = {}
+            parent = topic[:-1]
+            if parent in self._topics:
+                result[parent] = self._topics[parent]
+            for index in range(bisect.bisect_left(self._sorted, topic), len(self._sorted)):
+                key = self._sorted[index]
+                if not key.startswith(topic):
+                    break
+                result[key] = self._topics[key]
+            return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"synced": self.synced.is_set(), "topics": len(self._topics), "bytes": self._bytes}
+
+    def pub_stats(self) -> None:
+        pub.Pub().pub("openWB/system/perf/mirror", self.stats())
+
+
+mirror = RetainedMirror()
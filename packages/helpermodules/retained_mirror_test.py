@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from helpermodules.retained_mirror import SYNC_TOPIC, RetainedMirror
+
+
+def message(topic: str, payload: bytes) -> SimpleNamespace:
+    return SimpleNamespace(topic=topic, payload=payload)
+
+
+def test_branch_contains_topic_and_children():
+    # setup
+    mirror = RetainedMirror()
+    for topic in ("openWB/vehicle/1", "openWB/vehicle/1/name", "openWB/vehicle/10/name", "openWB/vehicle/1/soc/x",
+                  "openWB/vehicle/2/name"):
+        mirror.update(topic, b'"x"')
+
+    # execution
+    branch = mirror.branch("openWB/vehicle/1/")
+
+    # evaluation
+    assert list(branch) == ["openWB/vehicle/1", "openWB/vehicle/1/name", "openWB/vehicle/1/soc/x"]
+    assert len(mirror.branch("")) == 5
+
+
+def test_empty_payload_removes_topic():
+    # setup
+    mirror = RetainedMirror()
+    mirror.update("openWB/vehicle/1/name", b'"Auto"')
+    mirror.update("openWB/vehicle/1/name", b'"Fahrzeug"')
+
+    # execution
+    mirror.update("openWB/vehicle/1/name", b"")
+    mirror.update("openWB/vehicle/2/name", b"")
+
+    # evaluation
+    assert mirror.branch("openWB/") == {}
+    assert mirror.stats() == {"synced": False, "topics": 0, "bytes": 0}
+
+
+def test_synced_after_own_sync_message():
+    # setup
+    mirror = RetainedMirror()
+    client = Mock()
+    mirror.update("openWB/stale", b"1")
+    mirror._on_connect(client, None, None, 0)
+    mirror._on_subscribe(client, None, 1, (2,))
+    token = client.publish.call_args[0][1]
+
+    # execution
+    mirror.on_message(client, None, message(SYNC_TOPIC, b"other"))
+    synced_early = mirror.synced.is_set()
+    mirror.on_message(client, None, message("openWB/general/extern", b"false"))
+    mirror.on_message(client, None, message(SYNC_TOPIC, token.encode()))
+
+    # evaluation
+    assert synced_early is False
+    assert mirror.wait_synced(0) is True
+    assert mirror.branch("openWB/") == {"openWB/general/extern": b"false"}
+
+
+def test_non_retained_topics_not_mirrored():
+    # setup
+    mirror = RetainedMirror()
+
+    # execution
+    for topic in ("openWB/system/device/module_update_completed", "openWB/log/ws-1/data",
+                  "openWB/log/daily/20221018", "openWB/log/monthly/202210", "openWB/system/device/1/config"):
+        mirror.on_message(None, None, message(topic, b"1"))
+
+    # evaluation
+    assert list(mirror.branch("openWB/")) == ["openWB/system/device/1/config"]
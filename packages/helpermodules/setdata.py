@@ -10,6 +10,7 @@ import re
 import logging
 from helpermodules.pub import Pub
 from helpermodules import subdata
+from helpermodules import topic_router
 
 log = logging.getLogger(__name__)
 mqtt_log = logging.getLogger("mqtt")
@@ -69,33 +70,11 @@ class SetData:
         """
         self.heartbeat = True
         if str(msg.payload.decode("utf-8")) != "":
-            mqtt_log.debug("Topic: "+str(msg.topic) + ", Payload: "+str(msg.payload.decode("utf-8")))
-            if "openWB/set/vehicle/" in msg.topic:
-                if "openWB/set/vehicle/template/ev_template/" in msg.topic:
-                    self.event_ev_template.wait(5)
-                elif "openWB/set/vehicle/template/charge_template/" in msg.topic:
-                    self.event_charge_template.wait(5)
-                self.process_vehicle_topic(msg)
-            elif "openWB/set/chargepoint/" in msg.topic:
-                self.process_chargepoint_topic(msg)
-            elif "openWB/set/pv/" in msg.topic:
-                self.process_pv_topic(msg)
-            elif "openWB/set/bat/" in msg.topic:
-                self.process_bat_topic(msg)
-            elif "openWB/set/general/" in msg.topic:
-                self.process_general_topic(msg)
-            elif "openWB/set/optional/" in msg.topic:
-                self.process_optional_topic(msg)
-            elif "openWB/set/counter/" in msg.topic:
-                self.process_counter_topic(msg)
-            elif "openWB/set/log/" in msg.topic:
-                self.process_log_topic(msg)
-            elif "openWB/set/graph/" in msg.topic:
-                self.process_graph_topic(msg)
-            elif "openWB/set/system/" in msg.topic:
-                self.process_system_topic(msg)
-            elif "openWB/set/command/" in msg.topic:
-                self.process_command_topic(msg)
+            if mqtt_log.isEnabledFor(logging.DEBUG):
+                mqtt_log.debug("Topic: %s, Payload: %s", msg.topic, msg.payload.decode("utf-8"))
+            route = ROUTER.match(msg.topic)
+            if route is not None:
+                route.handler(self, msg)
 
     def _validate_value(self, msg, data_type, ranges=[], collection=None, pub_json=False, retain: bool = True):
         """ prüft, ob der Wert vom angegebenen Typ ist.
@@ -140,8 +119,7 @@ class SetData:
                     Pub().pub(msg.topic, "")
                 else:
                     # aktuelles json-Objekt liegt in subdata
-                    index = re.search(
-                        '(?!/)([0-9]*)(?=/|$)', msg.topic).group()
+                    index = topic_router.get_index(msg.topic)
                     if "charge_template" in msg.topic:
                         event = self.event_charge_template
                         if "ct"+str(index) in subdata.SubData.ev_charge_template_data:
@@ -183,8 +161,7 @@ class SetData:
                         key_list = msg.topic.split("/")[6:]
                     self._change_key(template, key_list, value)
                     # publish
-                    index_pos = re.search(
-                        '(?!/)([0-9]*)(?=/|$)', msg.topic).end()
+                    index_pos = topic_router.get_index_end(msg.topic)
                     if event == self.event_cp_config:
                         topic = msg.topic[:index_pos]+"/config"
                     else:
@@ -913,7 +890,8 @@ class SetData:
                 elif "/get/fault_str" in msg.topic:
                     self._validate_value(msg, str)
                 elif "module_update_completed" in msg.topic:
-                    self._validate_value(msg, bool)
+                    # Marke der SyncBarrier, nicht retained, damit sie nach einem Neustart nicht erneut empfangen wird
+                    self._validate_value(msg, int, retain=False)
                 else:
                     self.__unknown_topic(msg)
             else:
@@ -943,3 +921,29 @@ class SetData:
                 self.__unknown_topic(msg)
         except Exception:
             log.exception(f"Fehler im setdata-Modul: Topic {msg.topic}, Value: {msg.payload}")
+
+
+def _process_ev_template_topic(set_data: SetData, msg) -> None:
+    set_data.event_ev_template.wait(5)
+    set_data.process_vehicle_topic(msg)
+
+
+def _process_charge_template_topic(set_data: SetData, msg) -> None:
+    set_data.event_charge_template.wait(5)
+    set_data.process_vehicle_topic(msg)
+
+
+ROUTER = topic_router.TopicRouter((
+    ("openWB/set/vehicle/template/ev_template/#", _process_ev_template_topic),
+    ("openWB/set/vehicle/template/charge_template/#", _process_charge_template_topic),
+    ("openWB/set/vehicle/#", SetData.process_vehicle_topic),
+    ("openWB/set/chargepoint/#", SetData.process_chargepoint_topic),
+    ("openWB/set/pv/#", SetData.process_pv_topic),
+    ("openWB/set/bat/#", SetData.process_bat_topic),
+    ("openWB/set/general/#", SetData.process_general_topic),
+    ("openWB/set/optional/#", SetData.process_optional_topic),
+    ("openWB/set/counter/#", SetData.process_counter_topic),
+    ("openWB/set/log/#", SetData.process_log_topic),
+    ("openWB/set/graph/#", SetData.process_graph_topic),
+    ("openWB/set/system/#", SetData.process_system_topic),
+    ("openWB/set/command/#", SetData.process_command_topic)))
@@ -0,0 +1,100 @@
+""" Copy-on-write-Schicht zwischen subdata und data.
+subdata erhöht bei jeder empfangenen Nachricht die Version des betroffenen Objekts. prepare kopiert ein Objekt nur,
+wenn sich dessen Version seit der letzten Kopie geändert hat, ansonsten wird die bereits vorhandene Kopie
+weiterverwendet.
+"""
+import copy
+import logging
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from helpermodules.pub import Pub
+
+log = logging.getLogger(__name__)
+
+# Objekte dieser Kategorien werden vom Algorithmus nur gelesen, sodass die Kopie auch über mehrere Regelzyklen
+# hinweg verwendet werden kann. Alle anderen Kopien werden zu Beginn jedes Regelzyklus verworfen, da der Algorithmus
+# diese verändert.
+PERSISTENT_CATEGORIES = ("cp_template_data", "ev_charge_template_data")
+
+
+class Versions:
+    """ Versionszähler je Objekt (Kategorie, Key). Eine Version für den Key None gilt für die gesamte Kategorie.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._versions: Dict[Tuple[str, Optional[str]], int] = {}
+
+    def mark_changed(self, category: str, key: Optional[str] = None) -> None:
+        with self._lock:
+            self._counter += 1
+            self._versions[(category, key)] = self._counter
+
+    def get(self, category: str, key: str) -> int:
+        return max(self._versions.get((category, key), 0), self._versions.get((category, None), 0))
+
+
+class CopyMetrics:
+    def __init__(self) -> None:
+        self.copied = 0
+        self.reused = 0
+        self.duration = 0.0
+        self.bytes = 0
+
+    def to_dict(self) -> Dict:
+        return {"copied": self.copied,
+                "reused": self.reused,
+                "time": round(self.duration * 1000, 3),
+                "bytes": self.bytes}
+
+
+class Snapshot:
+    """ verwaltet die Kopien der Objekte aus subdata, die dem Algorithmus zur Verfügung gestellt werden.
+    """
+
+    def __init__(self, versions: Versions) -> None:
+        self.versions = versions
+        # (Kategorie, Key) -> (Version, Quell-Objekt, Kopie)
+        self._copies: Dict[Tuple[str, str], Tuple[int, object, object]] = {}
+        self.metrics = CopyMetrics()
+
+    def new_cycle(self) -> None:
+        """ verwirft alle Kopien, die der Algorithmus im letzten Regelzyklus verändert haben könnte.
+        """
+        self._copies = {k: v for k, v in self._copies.items() if k[0] in PERSISTENT_CATEGORIES}
+        self.metrics = CopyMetrics()
+
+    def copy(self, category: str, key: str, source):
+        """ gibt eine Kopie des Objekts zurück. Die Kopie wird nur neu erstellt, wenn das Objekt seit der letzten
+        Kopie von subdata verändert oder ersetzt wurde.
+        """
+        # Version vor dem Kopieren lesen, damit eine Änderung während des Kopierens beim nächsten Mal erkannt wird.
+        version = self.versions.get(category, key)
+        cached = self._copies.get((category, key))
+        if cached is not None and cached[0] == version and cached[1] is source:
+            self.metrics.reused += 1
+            return cached[2]
+        start = time.perf_counter()
+        memo: Dict[int, object] = {}
+        copied = copy.deepcopy(source, memo)
+        self.metrics.duration += time.perf_counter() - start
+        self.metrics.copied += 1
+        self.metrics.bytes += sum(sys.getsizeof(v) for k, v in memo.items() if k != id(memo))
+        self._copies[(category, key)] = (version, source, copied)
+        return copied
+
+    def copy_dict(self, category: str, source: Dict) -> Dict:
+        """ kopiert alle Objekte eines Dictionaries aus subdata und entfernt Kopien gelöschter Objekte.
+        """
+        copied = {key: self.copy(category, key, value) for key, value in source.copy().items()}
+        for cached in [k for k in self._copies if k[0] == category and k[1] not in copied]:
+            self._copies.pop(cached)
+        return copied
+
+    def pub_metrics(self) -> None:
+        log.debug(f"Snapshot: {self.metrics.to_dict()}")
+        Pub().pub("openWB/system/perf/snapshot", self.metrics.to_dict())
@@ -0,0 +1,77 @@
+from helpermodules.snapshot import Snapshot, Versions
+
+
+class Obj:
+    def __init__(self, value: int) -> None:
+        self.data = {"get": {"value": value}}
+
+
+def test_copy_reuses_unchanged_object():
+    # setup
+    versions = Versions()
+    snapshot = Snapshot(versions)
+    source = Obj(1)
+
+    # execution
+    first = snapshot.copy("cp_data", "cp1", source)
+    second = snapshot.copy("cp_data", "cp1", source)
+
+    # evaluation
+    assert first is second
+    assert first is not source
+    assert snapshot.metrics.copied == 1
+    assert snapshot.metrics.reused == 1
+    assert snapshot.metrics.bytes > 0
+
+
+def test_copy_after_change():
+    # setup
+    versions = Versions()
+    snapshot = Snapshot(versions)
+    source = Obj(1)
+    first = snapshot.copy("cp_data", "cp1", source)
+
+    # execution
+    source.data["get"]["value"] = 2
+    versions.mark_changed("cp_data", "cp1")
+    second = snapshot.copy("cp_data", "cp1", source)
+    versions.mark_changed("cp_data")
+    third = snapshot.copy("cp_data", "cp1", source)
+
+    # evaluation
+    assert first.data["get"]["value"] == 1
+    assert second.data["get"]["value"] == 2
+    assert third is not second
+    assert snapshot.metrics.copied == 3
+
+
+def test_new_cycle_keeps_only_persistent_categories():
+    # setup
+    versions = Versions()
+    snapshot = Snapshot(versions)
+    cp = snapshot.copy("cp_data", "cp1", Obj(1))
+    template_source = Obj(1)
+    template = snapshot.copy("cp_template_data", "cpt0", template_source)
+
+    # execution
+    snapshot.new_cycle()
+
+    # evaluation
+    assert snapshot.copy("cp_data", "cp1", Obj(1)) is not cp
+    assert snapshot.copy("cp_template_data", "cpt0", template_source) is template
+
+
+def test_copy_dict_removes_deleted_objects():
+    # setup
+    versions = Versions()
+    snapshot = Snapshot(versions)
+    source = {"cpt0": Obj(0), "cpt1": Obj(1)}
+    snapshot.copy_dict("cp_template_data", source)
+
+    # execution
+    source.pop("cpt1")
+    copied = snapshot.copy_dict("cp_template_data", source)
+
+    # evaluation
+    assert list(copied.keys()) == ["cpt0"]
+    assert ("cp_template_data", "cpt1") not in snapshot._copies
@@ -7,6 +7,7 @@ from pathlib import Path
 import paho.mqtt.client as mqtt
 import re
 import subprocess
+from typing import Optional
 
 from control import bat
 from control import chargepoint
@@ -16,12 +17,29 @@ from control import general
 from helpermodules import graph
 from control import optional
 from helpermodules.pub import Pub
+from helpermodules import snapshot
 from helpermodules import system
+from helpermodules import topic_router
 from control import pv
 
 log = logging.getLogger(__name__)
 mqtt_log = logging.getLogger("mqtt")
 
+# Präfix des Topics, Kategorie in SubData, Präfix des Keys (gefolgt vom Index) und Key, wenn kein Index folgt.
+TOPIC_OBJECTS = (("openWB/vehicle/template/charge_template/", "ev_charge_template_data", "ct", None),
+                 ("openWB/vehicle/template/ev_template/", "ev_template_data", "et", None),
+                 ("openWB/vehicle/", "ev_data", "ev", None),
+                 ("openWB/chargepoint/template/", "cp_template_data", "cpt", None),
+                 ("openWB/chargepoint/", "cp_data", "cp", "all"),
+                 ("openWB/pv/", "pv_data", "pv", "all"),
+                 ("openWB/bat/", "bat_data", "bat", "all"),
+                 ("openWB/counter/", "counter_data", "counter", "all"),
+                 ("openWB/general/", "general_data", None, "general"),
+                 ("openWB/optional/", "optional_data", None, "optional"),
+                 ("openWB/graph/", "graph_data", None, "graph"),
+                 ("openWB/system/device/", "system_data", "device", "system"),
+                 ("openWB/system/", "system_data", None, "system"))
+
 
 class SubData:
     """ Klasse, die die benötigten Topics abonniert, die Instanzen erstellt, wenn z.b. ein Modul neu konfiguriert
@@ -41,12 +59,13 @@ class SubData:
     optional_data = {}
     system_data = {}
     graph_data = {}
+    versions = snapshot.Versions()
 
-    def __init__(self, event_ev_template, event_charge_template, event_cp_config, event_module_update_completed):
+    def __init__(self, event_ev_template, event_charge_template, event_cp_config, sync_barrier):
         self.event_ev_template = event_ev_template
         self.event_charge_template = event_charge_template
         self.event_cp_config = event_cp_config
-        self.event_module_update_completed = event_module_update_completed
+        self.sync_barrier = sync_barrier
         self.heartbeat = False
 
         self.bat_data["all"] = bat.BatAll()
@@ -105,58 +124,30 @@ class SubData:
     def on_message(self, client, userdata, msg):
         """ wartet auf eingehende Topics.
         """
-        mqtt_log.debug("Topic: "+str(msg.topic) +
-                       ", Payload: "+str(msg.payload.decode("utf-8")))
+        if mqtt_log.isEnabledFor(logging.DEBUG):
+            mqtt_log.debug("Topic: %s, Payload: %s", msg.topic, msg.payload.decode("utf-8"))
         self.heartbeat = True
-        if "openWB/vehicle/template/charge_template/" in msg.topic:
-            self.process_vehicle_charge_template_topic(
-                self.ev_charge_template_data, msg)
-        elif "openWB/vehicle/template/ev_template/" in msg.topic:
-            self.process_vehicle_ev_template_topic(self.ev_template_data, msg)
-        elif "openWB/vehicle/" in msg.topic:
-            self.process_vehicle_topic(self.ev_data, msg)
-        elif "openWB/chargepoint/template/" in msg.topic:
-            self.process_chargepoint_template_topic(self.cp_template_data, msg)
-        elif "openWB/chargepoint/" in msg.topic:
-            self.process_chargepoint_topic(self.cp_data, msg)
-        elif "openWB/pv/" in msg.topic:
-            self.process_pv_topic(self.pv_data, msg)
-        elif "openWB/bat/" in msg.topic:
-            self.process_bat_topic(self.bat_data, msg)
-        elif "openWB/general/" in msg.topic:
-            self.process_general_topic(self.general_data, msg)
-        elif "openWB/graph/" in msg.topic:
-            self.process_graph_topic(self.graph_data, msg)
-        elif "openWB/optional/" in msg.topic:
-            self.process_optional_topic(self.optional_data, msg)
-        elif "openWB/counter/" in msg.topic:
-            self.process_counter_topic(self.counter_data, msg)
-        elif "openWB/system/" in msg.topic:
-            self.process_system_topic(client, self.system_data, msg)
-        else:
+        route = ROUTER.match(msg.topic)
+        if route is None:
             log.warning("unknown subdata-topic: "+str(msg.topic))
+            return
+        route.handler(self, client, msg, route.indices)
+        self._mark_changed(msg.topic)
 
-    def get_index(self, topic):
-        """extrahiert den Index aus einem Topic (Zahl zwischen zwei // oder am Stringende)
-
-         Parameters
-        ----------
-        topic : str
-            Topic, aus dem der Index extrahiert wird
+    def _mark_changed(self, topic: str) -> None:
+        """ erhöht die Version des Objekts, das durch das Topic verändert wurde. Erst nach dem Verarbeiten aufrufen,
+        damit prepare keine veraltete Kopie mit der neuen Version ablegt.
         """
-        index = re.search('(?!/)([0-9]*)(?=/|$)', topic)
-        return index.group()
-
-    def get_second_index(self, topic):
-        """extrahiert den zweiten Index aus einem Topic (Zahl zwischen zwei //)
-
-            Parameters
-        ----------
-        topic : str
-            Topic, aus dem der Index extrahiert wird
-        """
-        index = re.search('^.+/([0-9]*)/.+/([0-9]+)/*.*$', topic)
-        return index.group(2)
+        for prefix, category, key_prefix, default_key in TOPIC_OBJECTS:
+            if topic.startswith(prefix):
+                segment = topic[len(prefix):].split("/", 1)[0]
+                if key_prefix is not None and segment.isdigit():
+                    self.versions.mark_changed(category, key_prefix+segment)
+                elif default_key is not None:
+                    self.versions.mark_changed(category, default_key)
+                else:
+                    self.versions.mark_changed(category)
+                break
 
     def set_json_payload(self, dict, msg):
         """ dekodiert das JSON-Objekt und setzt diesen für den Value in das übergebene Dictionary, als Key wird der
@@ -170,7 +161,7 @@ class SubData:
             enthält den Payload als json-Objekt
         """
         try:
-            key = re.search("/([a-z,A-Z,0-9,_]+)(?!.*/)", msg.topic).group(1)
+            key = topic_router.get_key(msg.topic)
             if msg.payload:
                 dict[key] = json.loads(str(msg.payload.decode("utf-8")))
             else:
@@ -179,25 +170,25 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_vehicle_topic(self, var, msg):
+    def process_vehicle_topic(self, var, msg, index: str):
         """ Handler für die EV-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der EVs
         msg:
             enthält Topic und Payload
+        index : str
+            Index des EVs aus dem Topic
         """
         try:
-            index = self.get_index(msg.topic)
-            if re.search("^.+/vehicle/[0-9]+/.+$", msg.topic) is not None:
+            subtopic = msg.topic[len("openWB/vehicle/"+index+"/"):]
+            if subtopic:
                 if str(msg.payload.decode("utf-8")) == "":
-                    if re.search("^.+/vehicle/[0-9]+/soc_module/config$", msg.topic) is not None:
+                    if subtopic == "soc_module/config":
                         var["ev"+index].soc_module = None
-                    elif re.search("^.+/vehicle/[0-9]+/get.+$", msg.topic) is not None:
+                    elif subtopic.startswith("get/"):
                         self.set_json_payload(var["ev"+index].data["get"], msg)
                     else:
                         if "ev"+index in var:
@@ -206,22 +197,22 @@ class SubData:
                     if "ev"+index not in var:
                         var["ev"+index] = ev.Ev(int(index))
 
-                    if re.search("^.+/vehicle/[0-9]+/get.+$", msg.topic) is not None:
+                    if subtopic.startswith("get/"):
                         if "get" not in var["ev"+index].data:
                             var["ev"+index].data["get"] = {}
                         self.set_json_payload(var["ev"+index].data["get"], msg)
-                    elif re.search("^.+/vehicle/[0-9]+/set.+$", msg.topic) is not None:
+                    elif subtopic.startswith("set/"):
                         if "set" not in var["ev"+index].data:
                             var["ev"+index].data["set"] = {}
                         self.set_json_payload(var["ev"+index].data["set"], msg)
-                    elif re.search("^.+/vehicle/[0-9]+/soc_module/config$", msg.topic) is not None:
+                    elif subtopic == "soc_module/config":
                         config = json.loads(str(msg.payload.decode("utf-8")))
                         if config["type"] is None:
                             var["ev"+index].soc_module = None
                         else:
                             mod = importlib.import_module("."+config["type"]+".soc", "modules")
                             var["ev"+index].soc_module = mod.Soc(config)
-                    elif re.search("^.+/vehicle/[0-9]+/control_parameter/.+$", msg.topic) is not None:
+                    elif subtopic.startswith("control_parameter/"):
                         if "control_parameter" not in var["ev"+index].data:
                             var["ev"+index].data["control_parameter"] = {}
                         self.set_json_payload(
@@ -231,30 +222,28 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_vehicle_charge_template_topic(self, var, msg):
-        """ Handler für die EV-Topics
+    def process_vehicle_charge_template_topic(self, var, msg, index: str, index_second: Optional[str] = None):
+        """ Handler für die Ladevorlagen-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der Ladevorlagen
         msg:
             enthält Topic und Payload
+        index : str
+            Index der Ladevorlage aus dem Topic
+        index_second : str
+            Index des Plans aus dem Topic, None für die Ladevorlage selbst
         """
         try:
-            index = self.get_index(msg.topic)
-            if str(msg.payload.decode("utf-8")) == "" and re.search("^.+/vehicle/template/charge_template/[0-9]+$",
-                                                                    msg.topic) is not None:
+            if str(msg.payload.decode("utf-8")) == "" and msg.topic.endswith("/charge_template/"+index):
                 if "ct"+index in var:
                     var.pop("ct"+index)
             else:
                 if "ct"+index not in var:
                     var["ct"+index] = ev.ChargeTemplate(int(index))
-                if re.search("^.+/vehicle/template/charge_template/[0-9]+/chargemode/scheduled_charging/plans/[0-9]+$",
-                             msg.topic) is not None:
-                    index_second = self.get_second_index(msg.topic)
+                if index_second is not None and "/scheduled_charging/plans/" in msg.topic:
                     if str(msg.payload.decode("utf-8")) == "":
                         try:
                             var["ct"+index].data["chargemode"]["scheduled_charging"]["plans"].pop(index_second)
@@ -264,9 +253,7 @@ class SubData:
                     else:
                         var["ct"+index].data["chargemode"]["scheduled_charging"]["plans"][str(
                             index_second)] = json.loads(str(msg.payload.decode("utf-8")))
-                elif re.search("^.+/vehicle/template/charge_template/[0-9]+/time_charging/plans/[0-9]+$",
-                               msg.topic) is not None:
-                    index_second = self.get_second_index(msg.topic)
+                elif index_second is not None:
                     if str(msg.payload.decode("utf-8")) == "":
                         try:
                             var["ct"+index].data["time_charging"]["plans"].pop(index_second)
@@ -287,21 +274,20 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_vehicle_ev_template_topic(self, var, msg):
-        """ Handler für die EV-Topics
+    def process_vehicle_ev_template_topic(self, var, msg, index: str):
+        """ Handler für die Fahrzeug-Vorlagen-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der Fahrzeug-Vorlagen
         msg:
             enthält Topic und Payload
+        index : str
+            Index der Fahrzeug-Vorlage aus dem Topic
         """
         try:
-            index = self.get_index(msg.topic)
-            if re.search("^.+/vehicle/template/ev_template/[0-9]+$", msg.topic) is not None:
+            if msg.topic.endswith("/ev_template/"+index):
                 if str(msg.payload.decode("utf-8")) == "":
                     if "et"+index in var:
                         var.pop("et"+index)
@@ -313,48 +299,48 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_chargepoint_topic(self, var, msg):
+    def process_chargepoint_topic(self, var, msg, index: Optional[str] = None):
         """ Handler für die Ladepunkt-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der Ladepunkte
         msg:
             enthält Topic und Payload
+        index : str
+            Index des Ladepunkts aus dem Topic, None für die Topics aller Ladepunkte
         """
         try:
-            if re.search("^.+/chargepoint/[0-9]+/.+$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
+            subtopic = msg.topic[len("openWB/chargepoint/"+index+"/"):] if index is not None else ""
+            if subtopic:
                 if str(msg.payload.decode("utf-8")) == "":
                     if "cp"+index in var:
                         var.pop("cp"+index)
                 else:
                     if "cp"+index not in var:
                         var["cp"+index] = chargepoint.Chargepoint(int(index))
-                    if re.search("^.+/chargepoint/[0-9]+/set/.+$", msg.topic) is not None:
+                    if subtopic.startswith("set/"):
                         if "set" not in var["cp"+index].data:
                             var["cp"+index].data["set"] = {}
-                        if re.search("^.+/chargepoint/[0-9]+/set/log/.+$", msg.topic) is not None:
+                        if subtopic.startswith("set/log/"):
                             if "log" not in var["cp"+index].data["set"]:
                                 var["cp"+index].data["set"]["log"] = {}
                             self.set_json_payload(
                                 var["cp"+index].data["set"]["log"], msg)
                         else:
                             self.set_json_payload(var["cp"+index].data["set"], msg)
-                    elif re.search("^.+/chargepoint/[0-9]+/get/.+$", msg.topic) is not None:
+                    elif subtopic.startswith("get/"):
                         if "get" not in var["cp"+index].data:
                             var["cp"+index].data["get"] = {}
-                        if re.search("^.+/chargepoint/[0-9]+/get/connected_vehicle/.+$", msg.topic) is not None:
+                        if subtopic.startswith("get/connected_vehicle/"):
                             if "connected_vehicle" not in var["cp"+index].data["get"]:
                                 var["cp"+index].data["get"]["connected_vehicle"] = {}
                             self.set_json_payload(
                                 var["cp"+index].data["get"]["connected_vehicle"], msg)
-                        elif re.search("^.+/chargepoint/[0-9]+/get/.+$", msg.topic) is not None:
+                        else:
                             self.set_json_payload(var["cp"+index].data["get"], msg)
-                    elif re.search("^.+/chargepoint/[0-9]+/config$", msg.topic) is not None:
+                    elif subtopic == "config":
                         config = json.loads(
                             str(msg.payload.decode("utf-8")))
                         if (var["cp"+index].chargepoint_module is None or
@@ -366,35 +352,35 @@ class SubData:
                                 config["id"], config["connection_module"], config["power_module"])
                         self.set_json_payload(var["cp"+index].data, msg)
                         self.event_cp_config.set()
-            elif re.search("^.+/chargepoint/get/.+$", msg.topic) is not None:
+            elif msg.topic.startswith("openWB/chargepoint/get/"):
                 self.set_json_payload(var["all"].data["get"], msg)
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_chargepoint_template_topic(self, var, msg):
-        """ Handler für die Ladepunkt-Topics
+    def process_chargepoint_template_topic(self, var, msg, index: str, index_second: Optional[str] = None):
+        """ Handler für die Ladepunkt-Vorlagen-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der Ladepunkt-Vorlagen
         msg:
             enthält Topic und Payload
+        index : str
+            Index der Ladepunkt-Vorlage aus dem Topic
+        index_second : str
+            Index des Sperr-Plans aus dem Topic, None für die Ladepunkt-Vorlage selbst
         """
         try:
-            index = self.get_index(msg.topic)
             if json.loads(str(msg.payload.decode("utf-8"))):
                 if "cpt"+index not in var:
                     var["cpt"+index] = chargepoint.CpTemplate()
             else:
                 if "cpt"+index in var:
                     var.pop("cpt"+index)
-            if re.search("^.+/chargepoint/template/[0-9]+/autolock/.+$", msg.topic) is not None:
+            if index_second is not None:
                 if "autolock" not in var["cpt"+index].data:
                     var["cpt"+index].data["autolock"] = {}
-                index_second = self.get_second_index(msg.topic)
                 if "plan"+index_second not in var["cpt"+index].data["autolock"]:
                     if "plans" not in var["cpt"+index].data["autolock"]:
                         var["cpt"+index].data["autolock"]["plans"] = {}
@@ -408,30 +394,30 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_pv_topic(self, var, msg):
+    def process_pv_topic(self, var, msg, index: Optional[str] = None):
         """ Handler für die PV-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der Wechselrichter
         msg:
             enthält Topic und Payload
+        index : str
+            Index des Wechselrichters aus dem Topic, None für die Topics aller Wechselrichter
         """
         try:
-            if re.search("^.+/pv/[0-9]+/.+$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
+            subtopic = msg.topic[len("openWB/pv/"+index+"/"):] if index is not None else ""
+            if subtopic:
                 if str(msg.payload.decode("utf-8")) == "":
                     if "pv"+index in var:
                         var.pop("pv"+index)
                 else:
                     if "pv"+index not in var:
                         var["pv"+index] = pv.Pv(int(index))
-                    if re.search("^.+/pv/[0-9]+/config/.+$", msg.topic) is not None:
+                    if subtopic.startswith("config/"):
                         self.set_json_payload(var["pv"+index].data["config"], msg)
-                    elif re.search("^.+/pv/[0-9]+/get/.+$", msg.topic) is not None:
+                    elif subtopic.startswith("get/"):
                         self.set_json_payload(var["pv"+index].data["get"], msg)
             elif re.search("^.+/pv/.+$", msg.topic) is not None:
                 if re.search("^.+/pv/config/.+$", msg.topic) is not None:
@@ -449,34 +435,34 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_bat_topic(self, var, msg):
+    def process_bat_topic(self, var, msg, index: Optional[str] = None):
         """ Handler für die Hausspeicher-Hardware_Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der Speicher
         msg:
             enthält Topic und Payload
+        index : str
+            Index des Speichers aus dem Topic, None für die Topics aller Speicher
         """
         try:
-            if re.search("^.+/bat/[0-9]+/.+$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
+            subtopic = msg.topic[len("openWB/bat/"+index+"/"):] if index is not None else ""
+            if subtopic:
                 if str(msg.payload.decode("utf-8")) == "":
                     if "bat"+index in var:
                         var.pop("bat"+index)
                 else:
                     if "bat"+index not in var:
                         var["bat"+index] = bat.Bat(int(index))
-                    if re.search("^.+/bat/[0-9]+/config$", msg.topic) is not None:
+                    if subtopic == "config":
                         self.set_json_payload(var["bat"+index].data, msg)
-                    elif re.search("^.+/bat/[0-9]+/get/.+$", msg.topic) is not None:
+                    elif subtopic.startswith("get/"):
                         if "get" not in var["bat"+index].data:
                             var["bat"+index].data["get"] = {}
                         self.set_json_payload(var["bat"+index].data["get"], msg)
-                    elif re.search("^.+/bat/[0-9]+/set/.+$", msg.topic) is not None:
+                    elif subtopic.startswith("set/"):
                         if "set" not in var["bat"+index].data:
                             var["bat"+index].data["set"] = {}
                         self.set_json_payload(var["bat"+index].data["set"], msg)
@@ -607,38 +593,38 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_counter_topic(self, var, msg):
+    def process_counter_topic(self, var, msg, index: Optional[str] = None):
         """ Handler für die Zähler-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        var : dictionary
+            Dictionary der Zähler
         msg:
             enthält Topic und Payload
+        index : str
+            Index des Zählers aus dem Topic, None für die Topics aller Zähler
         """
         try:
-            if re.search("^.+/counter/[0-9]+/.+$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
+            subtopic = msg.topic[len("openWB/counter/"+index+"/"):] if index is not None else ""
+            if subtopic:
                 if str(msg.payload.decode("utf-8")) == "":
                     if "counter"+index in var:
                         var.pop("counter"+index)
                 else:
                     if "counter"+index not in var:
                         var["counter"+index] = counter.Counter(int(index))
-                    if re.search("^.+/counter/[0-9]+/get.+$", msg.topic) is not None:
+                    if subtopic.startswith("get/"):
                         if "get" not in var["counter"+index].data:
                             var["counter"+index].data["get"] = {}
                         self.set_json_payload(
                             var["counter"+index].data["get"], msg)
-                    elif re.search("^.+/counter/[0-9]+/set.+$", msg.topic) is not None:
+                    elif subtopic.startswith("set/"):
                         if "set" not in var["counter"+index].data:
                             var["counter"+index].data["set"] = {}
                         self.set_json_payload(
                             var["counter"+index].data["set"], msg)
-                    elif re.search("^.+/counter/[0-9]+/config/.+$", msg.topic) is not None:
+                    elif subtopic.startswith("config/"):
                         if "config" not in var["counter"+index].data:
                             var["counter"+index].data["config"] = {}
                         self.set_json_payload(
@@ -648,6 +634,9 @@ class SubData:
                     if "get" not in var["all"].data:
                         var["all"].data["get"] = {}
                     self.set_json_payload(var["all"].data["get"], msg)
+                    if msg.topic.endswith("/hierarchy") and "hierarchy" in var["all"].data["get"]:
+                        # Index bereits hier aufbauen, damit er mit der Kopie für den Regelzyklus übernommen wird.
+                        var["all"].get_hierarchy_index()
                 elif re.search("^.+/counter/set.+$", msg.topic) is not None:
                     if "set" not in var["all"].data:
                         var["all"].data["set"] = {}
@@ -655,17 +644,22 @@ class SubData:
         except Exception:
             log.exception("Fehler im subdata-Modul")
 
-    def process_system_topic(self, client, var, msg):
+    def process_system_topic(self, client, var, msg, index: Optional[str] = None,
+                             index_second: Optional[str] = None):
         """Handler für die System-Topics
 
          Parameters
         ----------
-        client : (unused)
-            vorgegebener Parameter
-        userdata : (unused)
-            vorgegebener Parameter
+        client :
+            Client, mit dem die Komponenten eines Devices abonniert werden
+        var : dictionary
+            Dictionary mit System und Devices
         msg:
             enthält Topic und Payload
+        index : str
+            Index des Devices bzw. der MQTT-Brücke aus dem Topic
+        index_second : str
+            Index der Komponente aus dem Topic
         """
         try:
             if "system" not in var:
@@ -674,8 +668,8 @@ class SubData:
                         var.pop("system")
                 else:
                     var["system"] = system.System()
-            if re.search("^.+/device/[0-9]+/config$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
+            device = f"openWB/system/device/{index}/"
+            if index is not None and msg.topic == device+"config":
                 if str(msg.payload.decode("utf-8")) == "":
                     if "device"+index in var:
                         var.pop("device"+index)
@@ -691,19 +685,14 @@ class SubData:
                     # Durch das erneute Subscribe werden die Komponenten mit dem aktualisierten TCP-Client angelegt.
                     client.subscribe("openWB/system/device/" +
                                      index+"/component/#", 2)
-            elif re.search("^.+/device/[0-9]+/get$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
+            elif index is not None and msg.topic == device+"get":
                 if "get" not in var["device"+index].data:
                     var["device"+index].data["get"] = {}
                 self.set_json_payload(var["device"+index].data["get"], msg)
-            elif re.search("^.+/device/[0-9]+/component/[0-9]+/simulation/.+$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
-                index_second = self.get_second_index(msg.topic)
+            elif index_second is not None and msg.topic.startswith(f"{device}component/{index_second}/simulation/"):
                 self.set_json_payload(
                     var["device"+index].components["component"+index_second].simulation, msg)
-            elif re.search("^.+/device/[0-9]+/component/[0-9]+/config$", msg.topic) is not None:
-                index = self.get_index(msg.topic)
-                index_second = self.get_second_index(msg.topic)
+            elif index_second is not None and msg.topic == f"{device}component/{index_second}/config":
                 if str(msg.payload.decode("utf-8")) == "":
                     if "device"+index in var:
                         if "component"+str(index_second) in var["device"+index].components:
@@ -729,7 +718,6 @@ class SubData:
                     if sim_data:
                         var["device"+index].components["component" + index_second].simulation = sim_data
             elif "mqtt" and "bridge" in msg.topic:
-                index = self.get_index(msg.topic)
                 parent_file = Path(__file__).resolve().parents[2]
                 subprocess.call(["php", "-f", str(parent_file / "runs" / "savemqtt.php"), index, msg.payload])
             elif "GetRemoteSupport" in msg.topic:
@@ -745,7 +733,7 @@ class SubData:
                                 token, port, user])
             else:
                 if "module_update_completed" in msg.topic:
-                    self.event_module_update_completed.set()
+                    self.sync_barrier.acknowledge(json.loads(str(msg.payload.decode("utf-8"))))
                 self.set_json_payload(var["system"].data, msg)
         except Exception:
             log.exception("Fehler im subdata-Modul")
@@ -770,3 +758,44 @@ class SubData:
                     self.set_json_payload(var["graph"].data["config"], msg)
         except Exception:
             log.exception("Fehler im subdata-Modul")
+
+
+def _charge_template(sub: SubData, client, msg, indices) -> None:
+    sub.process_vehicle_charge_template_topic(sub.ev_charge_template_data, msg, *indices)
+
+
+def _chargepoint_template(sub: SubData, client, msg, indices) -> None:
+    sub.process_chargepoint_template_topic(sub.cp_template_data, msg, *indices)
+
+
+def _system(sub: SubData, client, msg, indices) -> None:
+    sub.process_system_topic(client, sub.system_data, msg, *indices)
+
+
+# Die Handler erhalten die Indizes aus den INDEX-Segmenten der Route.
+ROUTER = topic_router.TopicRouter((
+    ("openWB/vehicle/template/charge_template/+/#", _charge_template),
+    ("openWB/vehicle/template/charge_template/+/chargemode/scheduled_charging/plans/+", _charge_template),
+    ("openWB/vehicle/template/charge_template/+/time_charging/plans/+", _charge_template),
+    ("openWB/vehicle/template/ev_template/+/#",
+     lambda sub, client, msg, indices: sub.process_vehicle_ev_template_topic(sub.ev_template_data, msg, *indices)),
+    ("openWB/vehicle/+/#", lambda sub, client, msg, indices: sub.process_vehicle_topic(sub.ev_data, msg, *indices)),
+    ("openWB/chargepoint/template/+/#", _chargepoint_template),
+    ("openWB/chargepoint/template/+/autolock/+", _chargepoint_template),
+    ("openWB/chargepoint/+/#",
+     lambda sub, client, msg, indices: sub.process_chargepoint_topic(sub.cp_data, msg, *indices)),
+    ("openWB/chargepoint/#", lambda sub, client, msg, indices: sub.process_chargepoint_topic(sub.cp_data, msg)),
+    ("openWB/pv/+/#", lambda sub, client, msg, indices: sub.process_pv_topic(sub.pv_data, msg, *indices)),
+    ("openWB/pv/#", lambda sub, client, msg, indices: sub.process_pv_topic(sub.pv_data, msg)),
+    ("openWB/bat/+/#", lambda sub, client, msg, indices: sub.process_bat_topic(sub.bat_data, msg, *indices)),
+    ("openWB/bat/#", lambda sub, client, msg, indices: sub.process_bat_topic(sub.bat_data, msg)),
+    ("openWB/general/#", lambda sub, client, msg, indices: sub.process_general_topic(sub.general_data, msg)),
+    ("openWB/graph/#", lambda sub, client, msg, indices: sub.process_graph_topic(sub.graph_data, msg)),
+    ("openWB/optional/#", lambda sub, client, msg, indices: sub.process_optional_topic(sub.optional_data, msg)),
+    ("openWB/counter/+/#",
+     lambda sub, client, msg, indices: sub.process_counter_topic(sub.counter_data, msg, *indices)),
+    ("openWB/counter/#", lambda sub, client, msg, indices: sub.process_counter_topic(sub.counter_data, msg)),
+    ("openWB/system/device/+/#", _system),
+    ("openWB/system/device/+/component/+/#", _system),
+    ("openWB/system/mqtt/bridge/+", _system),
+    ("openWB/system/#", _system)))
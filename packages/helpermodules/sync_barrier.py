@@ -0,0 +1,57 @@
+""" Barriere zwischen der Regelung und subdata über Sequenznummern.
+
+Die Regelung setzt mit mark() eine Marke, indem sie die nächste Sequenznummer an
+openWB/set/system/device/module_update_completed sendet. setdata leitet die Marke in der Reihenfolge des Empfangs
+weiter, sodass subdata die Marke erst erhält, wenn alle zuvor gesendeten Topics verarbeitet wurden, und mit
+acknowledge() quittiert. wait() kehrt zurück, sobald die zuletzt gesetzte Marke quittiert wurde, anstatt eine feste
+Zeit zu warten.
+"""
+import threading
+import time
+from typing import Any
+
+from helpermodules.pub import Pub
+
+TOPIC = "openWB/set/system/device/module_update_completed"
+
+
+class SyncBarrier:
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._acknowledged = 0
+
+    def mark(self) -> int:
+        with self._condition:
+            self._sequence += 1
+            sequence = self._sequence
+        Pub().pub(TOPIC, sequence)
+        return sequence
+
+    def acknowledge(self, sequence: Any) -> None:
+        with self._condition:
+            # Marken, die noch nicht gesetzt wurden, und boolsche Werte stammen aus einem vorherigen Start.
+            if isinstance(sequence, bool) or not isinstance(sequence, int) or sequence > self._sequence:
+                return
+            if sequence > self._acknowledged:
+                self._acknowledged = sequence
+                self._condition.notify_all()
+
+    def wait(self, timeout: float) -> bool:
+        """ wartet höchstens timeout Sekunden, bis die zuletzt gesetzte Marke quittiert wurde.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._acknowledged >= self._sequence, timeout)
+
+    def sync(self, timeout: float, interval: float = 0.5) -> bool:
+        """ setzt eine Marke und wartet darauf. Beim Start sind setdata und subdata eventuell noch nicht verbunden,
+        daher wird die Marke alle interval Sekunden erneut gesetzt.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.mark()
+            remaining = deadline - time.monotonic()
+            if self.wait(max(0, min(interval, remaining))):
+                return True
+            if remaining <= interval:
+                return False
@@ -0,0 +1,67 @@
+import threading
+
+from helpermodules.sync_barrier import SyncBarrier
+
+
+def test_wait_returns_when_mark_is_acknowledged():
+    # setup
+    barrier = SyncBarrier()
+    sequence = barrier.mark()
+    threading.Timer(0.05, barrier.acknowledge, args=(sequence,)).start()
+
+    # execution
+    reached = barrier.wait(timeout=5)
+
+    # evaluation
+    assert reached is True
+
+
+def test_wait_times_out_on_older_mark():
+    # setup
+    barrier = SyncBarrier()
+    barrier.acknowledge(barrier.mark())
+    barrier.mark()
+    barrier.acknowledge(1)
+
+    # execution
+    reached = barrier.wait(timeout=0.01)
+
+    # evaluation
+    assert reached is False
+
+
+def test_marks_of_previous_start_are_ignored():
+    # setup
+    barrier = SyncBarrier()
+    barrier.acknowledge(5000)
+    barrier.acknowledge(True)
+    barrier.mark()
+
+    # execution
+    reached = barrier.wait(timeout=0.01)
+
+    # evaluation
+    assert reached is False
+
+
+def test_sync_repeats_mark_until_acknowledged(monkeypatch):
+    # setup
+    barrier = SyncBarrier()
+    marks = []
+
+    def mark():
+        sequence = original_mark()
+        marks.append(sequence)
+        # erst die zweite Marke erreicht subdata
+        if len(marks) == 2:
+            barrier.acknowledge(sequence)
+        return sequence
+    original_mark = barrier.mark
+    monkeypatch.setattr(barrier, "mark", mark)
+
+    # execution
+    reached = barrier.sync(timeout=5, interval=0.01)
+
+    # evaluation
+    assert reached is True
+    assert marks == [1, 2]
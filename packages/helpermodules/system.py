@@ -2,14 +2,19 @@
 
 from pathlib import Path
 import logging
+import os
+import signal
 import subprocess
 import time
 import _thread as thread
 import threading
 import sys
 
+from helpermodules import logger
+from helpermodules import mqtt_pool
 from helpermodules import pub
 from control import data
+from modules.common import simcount
 
 log = logging.getLogger(__name__)
 
@@ -88,3 +93,29 @@ def exit_after(s):
             return result
         return inner
     return outer
+
+
+def exit_on_sigterm() -> None:
+    """ SIGTERM (z.B. systemctl stop) beendet den Prozess ohne Handler sofort, ohne die mit atexit registrierten
+    Funktionen auszuführen. Der Handler löst stattdessen im Haupt-Thread SystemExit aus, sodass die Regelung an der
+    aktuellen Stelle abbricht und gehaltene Locks freigegeben werden. Das Beenden übernimmt shutdown().
+    """
+    signal.signal(signal.SIGTERM, _raise_system_exit)
+
+
+def _raise_system_exit(signum, frame) -> None:
+    log.info("SIGTERM empfangen, Prozess wird beendet.")
+    raise SystemExit(0)
+
+
+def shutdown() -> None:
+    """ sichert die Zählerstände von simcount, sendet die gesammelten MQTT-Nachrichten und schreibt die
+    Log-Warteschlange aus. Anschließend wird der Prozess beendet, ohne auf die Threads von subdata, setdata, etc. zu
+    warten, die nicht enden und sonst das Ausführen der atexit-Funktionen verhindern.
+    """
+    for func in (simcount.store.checkpoint, mqtt_pool.pool.flush, logger.shutdown_logging):
+        try:
+            func()
+        except Exception:
+            log.exception("Fehler beim Beenden")
+    os._exit(0)
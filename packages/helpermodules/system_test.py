@@ -0,0 +1,41 @@
+import os
+import signal
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from helpermodules import system
+
+
+@pytest.fixture
+def sigterm_handler():
+    previous = signal.getsignal(signal.SIGTERM)
+    system.exit_on_sigterm()
+    yield
+    signal.signal(signal.SIGTERM, previous)
+
+
+def test_sigterm_checkpoints_sim_counters(monkeypatch, sigterm_handler):
+    # setup
+    checkpoint = Mock()
+    monkeypatch.setattr(system.simcount.store, "checkpoint", checkpoint)
+    shutdown_logging = Mock()
+    monkeypatch.setattr(system.logger, "shutdown_logging", shutdown_logging)
+    exit_process = Mock()
+    monkeypatch.setattr(system.os, "_exit", exit_process)
+
+    # execution
+    # wie in main.py
+    with pytest.raises(SystemExit):
+        try:
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(1)
+        finally:
+            system.shutdown()
+
+    # evaluation
+    checkpoint.assert_called_once_with()
+    system.mqtt_pool.pool.flush.assert_called_once_with()
+    shutdown_logging.assert_called_once_with()
+    exit_process.assert_called_once_with(0)
@@ -0,0 +1,111 @@
+""" Segment-basierter Router für Broker-Topics, der von subdata und setdata genutzt wird.
+Die Routen werden einmalig beim Import in einem Baum (Trie) abgelegt. Da der Broker dieselben Topics immer wieder
+sendet, werden die Ergebnisse je Topic zusätzlich zwischengespeichert.
+"""
+import functools
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Platzhalter für ein Segment, das nur aus Ziffern besteht (Index)
+INDEX = "+"
+# Platzhalter für alle folgenden Segmente
+WILDCARD = "#"
+
+CACHE_SIZE = 8192
+
+_INDEX_PATTERN = re.compile('(?!/)([0-9]*)(?=/|$)')
+_KEY_PATTERN = re.compile("/([a-z,A-Z,0-9,_]+)(?!.*/)")
+
+
+class Match(NamedTuple):
+    handler: Any
+    # Indizes aus den Segmenten, die mit INDEX übereinstimmen
+    indices: Tuple[str, ...]
+
+
+class _Node:
+    __slots__ = ("children", "index_child", "wildcard", "handler")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _Node] = {}
+        self.index_child: Optional[_Node] = None
+        self.wildcard: Any = None
+        self.handler: Any = None
+
+
+class TopicRouter:
+    """ Routen bestehen aus Segmenten, die exakt übereinstimmen müssen, INDEX für ein Segment aus Ziffern und
+    WILDCARD am Ende für beliebig viele weitere Segmente. Exakte Segmente haben Vorrang vor INDEX, INDEX hat Vorrang
+    vor WILDCARD.
+    """
+
+    def __init__(self, routes: Sequence[Tuple[str, Any]] = ()) -> None:
+        self._root = _Node()
+        for pattern, handler in routes:
+            self.add(pattern, handler)
+        self.match = functools.lru_cache(maxsize=CACHE_SIZE)(self._match)
+
+    def add(self, pattern: str, handler: Any) -> None:
+        node = self._root
+        segments = pattern.split("/")
+        for position, segment in enumerate(segments):
+            if segment == WILDCARD:
+                if position != len(segments) - 1:
+                    raise ValueError(f"{WILDCARD} ist nur am Ende einer Route erlaubt: {pattern}")
+                node.wildcard = handler
+                return
+            elif segment == INDEX:
+                if node.index_child is None:
+                    node.index_child = _Node()
+                node = node.index_child
+            else:
+                node = node.children.setdefault(segment, _Node())
+        node.handler = handler
+
+    def _match(self, topic: str) -> Optional[Match]:
+        indices: List[str] = []
+        handler = self._search(self._root, topic.split("/"), 0, indices)
+        if handler is None:
+            return None
+        return Match(handler, tuple(indices))
+
+    def _search(self, node: _Node, segments: List[str], position: int, indices: List[str]) -> Any:
+        if position == len(segments):
+            if node.handler is not None:
+                return node.handler
+            return node.wildcard
+        segment = segments[position]
+        child = node.children.get(segment)
+        if child is not None:
+            handler = self._search(child, segments, position + 1, indices)
+            if handler is not None:
+                return handler
+        if node.index_child is not None and segment.isdigit():
+            indices.append(segment)
+            handler = self._search(node.index_child, segments, position + 1, indices)
+            if handler is not None:
+                return handler
+            indices.pop()
+        return node.wildcard
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _search_index(topic: str) -> Tuple[str, int]:
+    index = _INDEX_PATTERN.search(topic)
+    return index.group(), index.end()
+
+
+def get_index(topic: str) -> str:
+    """ extrahiert den Index aus einem Topic (Zahl zwischen zwei // oder am Stringende)"""
+    return _search_index(topic)[0]
+
+
+def get_index_end(topic: str) -> int:
+    """ gibt die Position im Topic hinter dem Index zurück."""
+    return _search_index(topic)[1]
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def get_key(topic: str) -> str:
+    """ gibt den Namen nach dem letzten / zurück."""
+    return _KEY_PATTERN.search(topic).group(1)
@@ -0,0 +1,53 @@
+import pytest
+
+from helpermodules import topic_router
+from helpermodules.topic_router import TopicRouter
+
+
+@pytest.fixture
+def router() -> TopicRouter:
+    return TopicRouter((
+        ("openWB/vehicle/template/charge_template/#", "charge_template"),
+        ("openWB/vehicle/#", "vehicle"),
+        ("openWB/chargepoint/+/get/power", "power"),
+        ("openWB/chargepoint/#", "chargepoint"),
+        ("openWB/system/device/+/component/+/#", "component"),
+        ("openWB/pv/#", "pv")))
+
+
+@pytest.mark.parametrize("topic, expected_handler, expected_indices", [
+    ("openWB/vehicle/template/charge_template/1/chargemode", "charge_template", ()),
+    ("openWB/vehicle/1/name", "vehicle", ()),
+    ("openWB/chargepoint/3/get/power", "power", ("3",)),
+    ("openWB/chargepoint/3/get/currents", "chargepoint", ()),
+    ("openWB/chargepoint/get/power", "chargepoint", ()),
+    ("openWB/pv", "pv", ()),
+    ("openWB/system/device/4/component/7/config", "component", ("4", "7")),
+])
+def test_match(router: TopicRouter, topic: str, expected_handler: str, expected_indices):
+    # execution
+    route = router.match(topic)
+
+    # evaluation
+    assert route.handler == expected_handler
+    assert route.indices == expected_indices
+
+
+def test_no_match(router: TopicRouter):
+    assert router.match("openWB/counter/0/get/power") is None
+    assert router.match("openWB/pvx/1") is None
+
+
+def test_wildcard_only_at_end():
+    with pytest.raises(ValueError):
+        TopicRouter((("openWB/#/get", None),))
+
+
+@pytest.mark.parametrize("topic, expected_index, expected_key", [
+    ("openWB/set/chargepoint/12/get/power", "12", "power"),
+    ("openWB/system/device/4/component/7/config", "4", "config"),
+])
+def test_index_helpers(topic: str, expected_index: str, expected_key: str):
+    assert topic_router.get_index(topic) == expected_index
+    assert topic[:topic_router.get_index_end(topic)].endswith(expected_index)
+    assert topic_router.get_key(topic) == expected_key
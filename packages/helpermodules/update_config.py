@@ -2,17 +2,47 @@ import glob
 import json
 import logging
 import re
-import time
-from typing import List
-import paho.mqtt.client as mqtt
+from typing import Dict, List, Optional, Pattern, Sequence
 
 from helpermodules.pub import Pub
-from helpermodules import measurement_log
+from helpermodules import measurement_log, retained_mirror
 from control import chargepoint
 from control import ev
 
 log = logging.getLogger(__name__)
 
+_BRANCH_PATTERN = re.compile(r"^\^openWB/([A-Za-z0-9_]+)/")
+
+
+class TopicMatcher:
+    """ prüft Topics gegen eine Liste regulärer Ausdrücke wie re.search. Die Ausdrücke werden nach dem Zweig nach
+    "openWB/" gruppiert und je Zweig zu einer Alternation zusammengefasst, sodass je Topic nur ein Ausdruck geprüft
+    wird. Ausdrücke, die nicht mit ^openWB/<Zweig>/ beginnen, werden für jedes Topic geprüft.
+    """
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        branches: Dict[str, List[str]] = {}
+        others: List[str] = []
+        for pattern in patterns:
+            result = _BRANCH_PATTERN.match(pattern)
+            if result is None:
+                others.append(pattern)
+            else:
+                branches.setdefault(result.group(1), []).append(pattern)
+        self._branches = {branch: self._compile(group) for branch, group in branches.items()}
+        self._others = self._compile(others) if others else None
+
+    @staticmethod
+    def _compile(patterns: List[str]) -> Pattern:
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+    def search(self, topic: str) -> bool:
+        segments = topic.split("/", 2)
+        branch: Optional[Pattern] = self._branches.get(segments[1]) if len(segments) > 2 else None
+        if branch is not None and branch.search(topic) is not None:
+            return True
+        return self._others is not None and self._others.search(topic) is not None
+
 
 class UpdateConfig:
     valid_topic = ["^openWB/bat/config/configured$",
@@ -246,7 +276,17 @@ class UpdateConfig:
                    "^openWB/system/configurable/soc_modules$",
                    "^openWB/system/configurable/devices_components$",
                    "^openWB/system/configurable/chargepoints$",
-                   "^openWB/system/mqtt/bridge/[0-9]+$"
+                   "^openWB/system/mqtt/bridge/[0-9]+$",
+                   "^openWB/system/perf/snapshot$",
+                   "^openWB/system/perf/data_contention$",
+                   "^openWB/system/perf/workers/[a-z_]+$",
+                   "^openWB/system/perf/pub$",
+                   "^openWB/system/perf/modbus$",
+                   "^openWB/system/perf/http$",
+                   "^openWB/system/perf/mqtt$",
+                   "^openWB/system/perf/mirror$",
+                   "^openWB/system/perf/cycle$",
+                   "^openWB/system/perf/cycle_timelines$"
                    ]
     default_topic = (
         ("openWB/chargepoint/template/0", chargepoint.get_chargepoint_template_default()),
@@ -311,23 +351,19 @@ class UpdateConfig:
         ("openWB/optional/rfid/active", False),
         ("openWB/system/dataprotection_acknowledged", False),
         ("openWB/system/debug_level", 30),
-        ("openWB/system/device/module_update_completed", True),
+        ("openWB/system/device/module_update_completed", 0),
         ("openWB/system/ip_address", "unknown"),
         ("openWB/system/release_train", "master"))
+    default_topics = dict(default_topic)
 
     def __init__(self) -> None:
         self.all_received_topics = {}
+        self.valid_topic_matcher = TopicMatcher(self.valid_topic)
 
     def update(self):
         log.debug("Broker-Konfiguration aktualisieren")
-        mqtt_broker_ip = "localhost"
-        client = mqtt.Client("openWB-updateconfig-" + self.getserial())
-        client.on_connect = self.on_connect
-        client.on_message = self.on_message
-        client.connect(mqtt_broker_ip, 1886)
-        client.loop_start()
-        time.sleep(2)
-        client.loop_stop()
+        retained_mirror.mirror.wait_synced()
+        self.all_received_topics = retained_mirror.mirror.branch("openWB/")
 
         try:
             self.__remove_outdated_topics()
@@ -337,40 +373,20 @@ class UpdateConfig:
         except Exception:
             log.exception("Fehler beim Prüfen des Brokers.")
 
-    def getserial(self):
-        """ Extract serial from cpuinfo file
-        """
-        with open('/proc/cpuinfo', 'r') as f:
-            for line in f:
-                if line[0:6] == 'Serial':
-                    return line[10:26]
-            return "0000000000000000"
-
-    def on_connect(self, client, userdata, flags, rc):
-        """ connect to broker and subscribe to set topics
-        """
-        client.subscribe("openWB/#", 2)
-
-    def on_message(self, client, userdata, msg):
-        self.all_received_topics.update({msg.topic: msg.payload})
-
     def __remove_outdated_topics(self):
         # ungültige Topics entfernen
         # aufpassen mit dynamischen Zweigen! z.B. vehicle/x/...
         for topic in self.all_received_topics.keys():
-            for valid_topic in self.valid_topic:
-                if re.search(valid_topic, topic) is not None:
-                    break
-            else:
+            if not self.valid_topic_matcher.search(topic):
                 Pub().pub(topic, "")
                 log.debug("Ungültiges Topic zum Startzeitpunkt: "+str(topic))
 
     def __pub_missing_defaults(self):
         # zwingend erforderliche Standardwerte setzen
-        for topic in self.default_topic:
-            if topic[0] not in self.all_received_topics.keys():
-                log.debug("Setzte Topic '%s' auf Standardwert '%s'" % (topic[0], str(topic[1])))
-                Pub().pub(topic[0].replace("openWB/", "openWB/set/"), topic[1])
+        for topic, default in self.default_topics.items():
+            if topic not in self.all_received_topics:
+                log.debug("Setzte Topic '%s' auf Standardwert '%s'" % (topic, str(default)))
+                Pub().pub(topic.replace("openWB/", "openWB/set/"), default)
 
     def __update_version(self):
         with open("/var/www/html/openWB/web/version", "r") as f:
@@ -398,8 +414,8 @@ class UpdateConfig:
                         f'{module.replace("openWB/", "openWB/set/")}/config/max_ac_out', 0)
 
         # Summen in Tages- und Monatslog hinzufügen
-        files = glob.glob("/var/www/html/openWB/data/daily_log/*")
-        files.extend(glob.glob("/var/www/html/openWB/data/monthly_log/*"))
+        files = glob.glob("/var/www/html/openWB/data/daily_log/*.json")
+        files.extend(glob.glob("/var/www/html/openWB/data/monthly_log/*.json"))
         for file in files:
             with open(file, "r+") as jsonFile:
                 try:
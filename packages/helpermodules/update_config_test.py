@@ -0,0 +1,32 @@
+import re
+
+import pytest
+
+from helpermodules.update_config import TopicMatcher, UpdateConfig
+
+TOPICS = ["openWB/vehicle/1/name", "openWB/vehicle/1/name/extra", "openWB/vehicle/template/charge_template/3/x",
+          "openWB/graph/alllivevaluesJson12", "openWB/system/perf/workers/loadvars", "openWB/system/perf/Workers/x",
+          "openWB/set/log/request/1", "openWB/set/vehicle/1/name", "openWB/unknown/1", "openWB/counter", "openWB",
+          "other/vehicle/1/name"]
+
+
+@pytest.mark.parametrize("topic", TOPICS)
+def test_matcher_equals_search_over_all_patterns(topic: str):
+    # setup
+    matcher = TopicMatcher(UpdateConfig.valid_topic)
+
+    # execution
+    valid = matcher.search(topic)
+
+    # evaluation
+    assert valid == any(re.search(pattern, topic) is not None for pattern in UpdateConfig.valid_topic)
+
+
+def test_matcher_checks_patterns_without_branch_for_every_topic():
+    # setup
+    matcher = TopicMatcher(["^openWB/vehicle/[0-9]+/name$", "/get/fault_state$"])
+
+    # execution and evaluation
+    assert matcher.search("openWB/vehicle/1/name")
+    assert matcher.search("openWB/pv/1/get/fault_state")
+    assert not matcher.search("openWB/pv/1/get/power")
@@ -0,0 +1,122 @@
+""" Langlebiger, begrenzter Thread-Pool für die Abfrage der Module und das Setzen der Ladeströme.
+Jedem Gerät ist ein Key zugeordnet. Solange eine Aufgabe für einen Key noch läuft, wird für diesen Key keine neue
+Aufgabe gestartet, sodass ein hängendes Gerät höchstens einen Worker belegt.
+"""
+import bisect
+import logging
+import threading
+import time
+from concurrent import futures
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from helpermodules.pub import Pub
+
+log = logging.getLogger(__name__)
+
+MAX_WORKERS = 32
+# Obergrenzen der Histogramm-Klassen in Sekunden, die letzte Klasse ist nach oben offen.
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Job(NamedTuple):
+    key: str
+    target: Callable
+    args: Tuple = ()
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.timeouts = 0
+        self.skipped = 0
+
+    def add(self, duration: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+    def to_dict(self) -> Dict:
+        return {"buckets": list(LATENCY_BUCKETS), "counts": self.counts, "timeouts": self.timeouts,
+                "skipped": self.skipped}
+
+
+class WorkerPool:
+    def __init__(self, name: str, max_workers: int = MAX_WORKERS) -> None:
+        self.name = name
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        # Key -> Future der Aufgabe, die noch nicht abgeschlossen ist
+        self._busy: Dict[str, futures.Future] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        # Dauer der seit dem letzten Aufruf von take_durations abgeschlossenen Aufgaben je Key
+        self._durations: Dict[str, float] = {}
+
+    def run(self, jobs: List[Job], timeout: float) -> List[str]:
+        """ führt die Aufgaben parallel aus und wartet höchstens timeout Sekunden. Aufgaben, die bis dahin noch
+        nicht gestartet wurden, werden abgebrochen. Laufende Aufgaben können nicht abgebrochen werden, belegen aber
+        ihren Key, bis sie beendet sind.
+
+        Return
+        ------
+        Keys der Aufgaben, die nicht innerhalb des Timeouts abgeschlossen wurden.
+        """
+        submitted: Dict[futures.Future, str] = {}
+        for job in jobs:
+            future = self._submit(job)
+            if future is not None:
+                submitted[future] = job.key
+        if not submitted:
+            return []
+        _, not_done = futures.wait(submitted, timeout=timeout)
+        stragglers = []
+        for future in not_done:
+            key = submitted[future]
+            stragglers.append(key)
+            with self._lock:
+                self._histogram(key).timeouts += 1
+            # gibt bei noch nicht gestarteten Aufgaben über den Callback auch den Key frei
+            future.cancel()
+        return stragglers
+
+    def _submit(self, job: Job) -> Optional[futures.Future]:
+        with self._lock:
+            if job.key in self._busy:
+                self._histogram(job.key).skipped += 1
+                log.error(f"{self.name}: {job.key} ist noch mit der vorherigen Aufgabe beschäftigt.")
+                return None
+            future = self._executor.submit(self._execute, job)
+            self._busy[job.key] = future
+        future.add_done_callback(lambda f: self._release(job.key, f))
+        return future
+
+    def _execute(self, job: Job) -> Any:
+        start = time.monotonic()
+        try:
+            return job.target(*job.args)
+        except Exception:
+            log.exception(f"{self.name}: Fehler in {job.key}")
+        finally:
+            duration = time.monotonic() - start
+            with self._lock:
+                self._histogram(job.key).add(duration)
+                self._durations[job.key] = duration
+
+    def _release(self, key: str, future: futures.Future) -> None:
+        with self._lock:
+            if self._busy.get(key) is future:
+                self._busy.pop(key)
+
+    def _histogram(self, key: str) -> LatencyHistogram:
+        try:
+            return self.histograms[key]
+        except KeyError:
+            histogram = self.histograms[key] = LatencyHistogram()
+            return histogram
+
+    def take_durations(self) -> Dict[str, float]:
+        with self._lock:
+            durations, self._durations = self._durations, {}
+        return durations
+
+    def pub_stats(self) -> None:
+        with self._lock:
+            stats = {key: histogram.to_dict() for key, histogram in self.histograms.items()}
+        Pub().pub(f"openWB/system/perf/workers/{self.name}", stats)
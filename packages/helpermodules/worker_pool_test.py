@@ -0,0 +1,70 @@
+import threading
+
+from helpermodules.worker_pool import Job, WorkerPool
+
+
+def test_run_collects_latency():
+    # setup
+    pool = WorkerPool("test")
+    results = []
+
+    # execution
+    stragglers = pool.run([Job("device0", results.append, (0,)), Job("device1", results.append, (1,))], timeout=1)
+
+    # evaluation
+    assert stragglers == []
+    assert sorted(results) == [0, 1]
+    assert sum(pool.histograms["device0"].counts) == 1
+    assert pool.histograms["device0"].to_dict()["counts"][0] == 1
+
+
+def test_slow_device_occupies_one_worker():
+    # setup
+    pool = WorkerPool("test", max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def hanging():
+        calls.append(1)
+        release.wait(5)
+
+    # execution
+    first = pool.run([Job("device0", hanging)], timeout=0.05)
+    second = pool.run([Job("device0", hanging), Job("device1", calls.append, (2,))], timeout=1)
+    release.set()
+
+    # evaluation
+    assert first == ["device0"]
+    assert second == []
+    assert calls == [1, 2]
+    assert pool.histograms["device0"].timeouts == 1
+    assert pool.histograms["device0"].skipped == 1
+
+
+def test_queued_jobs_are_cancelled():
+    # setup
+    pool = WorkerPool("test", max_workers=1)
+    release = threading.Event()
+    calls = []
+
+    # execution
+    stragglers = pool.run([Job("device0", release.wait, (5,)), Job("device1", calls.append, (1,))], timeout=0.05)
+    release.set()
+    pool.run([Job("device1", calls.append, (2,))], timeout=1)
+
+    # evaluation
+    assert sorted(stragglers) == ["device0", "device1"]
+    assert calls == [2]
+
+
+def test_take_durations_returns_each_duration_once():
+    # setup
+    pool = WorkerPool("test")
+    pool.run([Job("device0", lambda: None)], timeout=1)
+
+    # execution
+    durations = pool.take_durations()
+
+    # evaluation
+    assert list(durations) == ["device0"]
+    assert pool.take_durations() == {}
@@ -18,10 +18,14 @@ from helpermodules import measurement_log
 from helpermodules import logger
 from helpermodules.logger import cleanup_logfiles
 from helpermodules import command
+from helpermodules import cycle_timer
+from helpermodules import retained_mirror
+from helpermodules.pub import Pub
 from control import prepare
 from control import data
 from control import process
 from control import algorithm
+from helpermodules import system
 from helpermodules.system import exit_after
 from control import update_soc
 
@@ -49,34 +53,8 @@ class HandlerAlgorithm:
                 def handler_with_control_interval():
                     if (data.data.general_data["general"].data["control_interval"]
                             / 10) == self.interval_counter:
-                        # Mit aktuellen Einstellungen arbeiten.
-                        prep.copy_system_data()
-                        log.setLevel(data.data.system_data["system"].data["debug_level"])
-                        loadvars_.get_hardware_values()
-                        # Virtuelle Module ermitteln die Werte rechnerisch auf Basis der Messwerte anderer Module.
-                        # Daher können sie erst die Werte ermitteln, wenn die physischen Module ihre Werte ermittelt
-                        # haben. Würde man alle Module parallel abfragen, wären die virtuellen Module immer einen
-                        # Zyklus hinterher.
-                        prep.copy_module_data()
-                        loadvars_.get_virtual_values()
-                        # Kurz warten, damit alle Topics von setdata und subdata verarbeitet werden können.
-                        time.sleep(0.5)
-                        prep.copy_module_data()
-                        prep.copy_data()
-                        self.heartbeat = True
-                        if data.data.system_data["system"].data["perform_update"]:
-                            data.data.system_data["system"].perform_update()
-                            return
-                        elif data.data.system_data["system"].data[
-                                "update_in_progress"]:
-                            log.info(
-                                "Regelung pausiert, da ein Update durchgeführt wird."
-                            )
-                            return
-                        prep.setup_algorithm()
-                        control.calc_current()
-                        proc.process_algorithm_results()
-                        data.data.graph_data["graph"].pub_graph_data()
+                        with cycle_timer.timer.cycle(loadvars_.pool.take_durations):
+                            self.control_cycle()
                         self.interval_counter = 1
                     else:
                         self.interval_counter = self.interval_counter + 1
@@ -90,18 +68,62 @@ class HandlerAlgorithm:
                     prep.copy_module_data()
                     loadvars_.get_virtual_values()
                     self.heartbeat = True
-                    # Kurz warten, damit alle Topics von setdata und subdata verarbeitet werden können.
-                    time.sleep(0.3)
                     prep.copy_module_data()
                     prep.copy_data()
-                    prep.setup_algorithm()
-                    control.calc_current()
-                    proc.process_algorithm_results()
-                    data.data.graph_data["graph"].pub_graph_data()
+                    with Pub().batch():
+                        prep.setup_algorithm()
+                        control.calc_current()
+                        proc.process_algorithm_results()
+                        data.data.graph_data["graph"].pub_graph_data()
                 handler_without_control_interval()
         except Exception:
             log.exception("Fehler im Main-Modul")
 
+    def control_cycle(self) -> None:
+        """ Regelzyklus, dessen Abschnitte von cycle_timer gemessen werden.
+        """
+        timer = cycle_timer.timer
+        # Mit aktuellen Einstellungen arbeiten.
+        prep.copy_system_data()
+        logger.set_level(data.data.system_data["system"].data["debug_level"])
+        logger.new_cycle()
+        timer.lap("copy_system_data")
+        loadvars_.get_hardware_values()
+        timer.lap("get_hardware_values")
+        # Virtuelle Module ermitteln die Werte rechnerisch auf Basis der Messwerte anderer Module.
+        # Daher können sie erst die Werte ermitteln, wenn die physischen Module ihre Werte ermittelt
+        # haben. Würde man alle Module parallel abfragen, wären die virtuellen Module immer einen
+        # Zyklus hinterher.
+        prep.copy_module_data()
+        timer.lap("copy_module_data")
+        loadvars_.get_virtual_values()
+        timer.lap("get_virtual_values")
+        # copy_module_data wartet, bis subdata alle Topics bis zur Marke von get_virtual_values verarbeitet hat.
+        prep.copy_module_data()
+        prep.copy_data()
+        timer.lap("copy_data")
+        self.heartbeat = True
+        if data.data.system_data["system"].data["perform_update"]:
+            data.data.system_data["system"].perform_update()
+            return
+        elif data.data.system_data["system"].data[
+                "update_in_progress"]:
+            log.info(
+                "Regelung pausiert, da ein Update durchgeführt wird."
+            )
+            return
+        # Die Ergebnisse des Algorithmus werden erst am Ende des Zyklus gesendet.
+        with Pub().batch():
+            prep.setup_algorithm()
+            timer.lap("setup_algorithm")
+            control.calc_current()
+            timer.lap("calc_current")
+            proc.process_algorithm_results()
+            timer.lap("process_algorithm_results")
+            data.data.graph_data["graph"].pub_graph_data()
+            timer.lap("pub_graph_data")
+        timer.lap("pub")
+
     @exit_after(10)
     def handler5Min(self):
         """ Handler, der alle 5 Minuten aufgerufen wird und die Heartbeats der Threads überprüft und die Aufgaben
@@ -129,6 +151,7 @@ class HandlerAlgorithm:
                 soc.heartbeat = False
 
             cleanup_logfiles()
+            retained_mirror.mirror.pub_stats()
             measurement_log.measurement_log_daily()
             # Wenn ein neuer Tag ist, Monatswerte schreiben.
             day = timecheck.create_timestamp_YYYYMMDD()[-2:]
@@ -171,6 +194,7 @@ try:
     while os.path.isfile(os.path.dirname(os.path.abspath(__file__)) + "/../ramdisk/bootdone") is False:
         time.sleep(1)
     log.debug("Boot-Prozess abgeschlossen")
+    retained_mirror.mirror.start()
 
     data.data_init()
     update_config.UpdateConfig().update()
@@ -179,7 +203,7 @@ try:
     control = algorithm.Algorithm()
     handler = HandlerAlgorithm()
     loadvars_ = loadvars.Loadvars()
-    prep = prepare.Prepare(loadvars_.event_module_update_completed)
+    prep = prepare.Prepare(loadvars_.sync_barrier)
     event_ev_template = threading.Event()
     event_ev_template.set()
     event_charge_template = threading.Event()
@@ -189,7 +213,7 @@ try:
     set = setdata.SetData(event_ev_template, event_charge_template,
                           event_cp_config)
     sub = subdata.SubData(event_ev_template, event_charge_template,
-                          event_cp_config, loadvars_.event_module_update_completed)
+                          event_cp_config, loadvars_.sync_barrier)
     comm = command.Command()
     soc = update_soc.UpdateSoc()
     t_sub = Thread(target=sub.sub_topics, args=())
@@ -203,7 +227,12 @@ try:
     t_soc.start()
 except Exception:
     log.exception("Fehler im Main-Modul")
-# Warten, damit subdata Zeit hat, alle Topics auf dem Broker zu empfangen.
-time.sleep(5)
-# blocking
-repeated_handler_call()
+# Warten, bis subdata alle Topics auf dem Broker empfangen hat.
+if loadvars_.sync_barrier.sync(timeout=5) is False:
+    log.error("Daten vom Broker wurden noch nicht vollständig empfangen. Timeout abgelaufen, Start der Regelung.")
+system.exit_on_sigterm()
+try:
+    # blocking
+    repeated_handler_call()
+finally:
+    system.shutdown()
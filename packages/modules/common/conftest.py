@@ -0,0 +1,6 @@
+import importlib.util
+
+# Die Tests, die pymodbus direkt verwenden, nur ausführen, wenn pymodbus installiert ist.
+collect_ignore = []
+if importlib.util.find_spec("pymodbus") is None:
+    collect_ignore += ["modbus_pool_test.py", "register_map_test.py", "modbus_test.py"]
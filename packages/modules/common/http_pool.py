@@ -0,0 +1,120 @@
+"""Prozessweiter Pool für HTTP-Verbindungen.
+
+Die Sessions aus req.get_http_session enthalten weiterhin den Zustand des Moduls (Authentifizierung, Cookies, Hooks),
+die TCP- bzw. TLS-Verbindungen werden aber je Host in einem gemeinsamen Pool offen gehalten und von allen Sessions
+wiederverwendet. Je Host kann ein Standard-Timeout und die Anzahl der Wiederholungen bei Verbindungsfehlern festgelegt
+werden.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from requests import PreparedRequest
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.util import Retry, parse_url
+
+from helpermodules.pub import Pub
+
+# Anzahl Hosts, deren Verbindungen offen gehalten werden
+MAX_HOSTS = 64
+# gleichzeitig offene Verbindungen je Host
+MAX_CONNECTIONS_PER_HOST = 4
+
+
+class HostPolicy(NamedTuple):
+    # Timeout, falls das Modul keinen angibt (connect, read)
+    timeout: float = 10
+    # Wiederholungen bei Verbindungsfehlern
+    retries: int = 1
+
+
+class HostAdapter(HTTPAdapter):
+    def __init__(self, policy: HostPolicy) -> None:
+        super().__init__(pool_connections=2, pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                         max_retries=Retry(total=policy.retries, read=False, redirect=False, backoff_factor=0.1))
+        self.policy = policy
+        self.requests = 0
+        self.failures = 0
+
+    def close(self) -> None:
+        # Die Verbindungen gehören dem Pool, nicht der Session, die den Adapter verwendet.
+        pass
+
+    def close_connections(self) -> None:
+        super().close()
+
+    def connections(self) -> int:
+        pools = self.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def to_dict(self) -> Dict:
+        connections = self.connections()
+        return {"requests": self.requests,
+                "failures": self.failures,
+                "connections": connections,
+                "reused": max(self.requests - connections, 0)}
+
+
+class HttpConnectionPool:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._adapters = OrderedDict()  # type: OrderedDict[str, HostAdapter]
+        self._policies: Dict[str, HostPolicy] = {}
+
+    def configure(self, host: str, timeout: Optional[float] = None, retries: Optional[int] = None) -> None:
+        """ legt Timeout und Wiederholungen für einen Host fest. Bestehende Verbindungen zum Host werden geschlossen.
+        """
+        with self._lock:
+            policy = self._policies.get(host, HostPolicy())
+            if timeout is not None:
+                policy = policy._replace(timeout=timeout)
+            if retries is not None:
+                policy = policy._replace(retries=retries)
+            self._policies[host] = policy
+            adapter = self._adapters.pop(host, None)
+        if adapter is not None:
+            adapter.close_connections()
+
+    def get(self, host: str) -> HostAdapter:
+        evicted = None
+        with self._lock:
+            try:
+                self._adapters.move_to_end(host)
+                return self._adapters[host]
+            except KeyError:
+                adapter = self._adapters[host] = HostAdapter(self._policies.get(host, HostPolicy()))
+                if len(self._adapters) > MAX_HOSTS:
+                    _, evicted = self._adapters.popitem(last=False)
+        if evicted is not None:
+            evicted.close_connections()
+        return adapter
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {host: adapter.to_dict() for host, adapter in self._adapters.items()}
+
+    def pub_stats(self) -> None:
+        Pub().pub("openWB/system/perf/http", self.stats())
+
+
+class PooledAdapter(BaseAdapter):
+    """ Adapter, den jede Session einbindet. Er leitet die Anfragen an den Adapter des Hosts im Pool weiter.
+    """
+
+    def send(self, request: PreparedRequest, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        adapter = pool.get(parse_url(request.url).host)
+        if timeout is None:
+            timeout = adapter.policy.timeout
+        adapter.requests += 1
+        try:
+            return adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        except Exception:
+            adapter.failures += 1
+            raise
+
+    def close(self) -> None:
+        pass
+
+
+pool = HttpConnectionPool()
+adapter = PooledAdapter()
@@ -0,0 +1,82 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.common import http_pool, req
+from modules.common.http_pool import HttpConnectionPool
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self) -> None:
+        super().setup()
+        Handler.connections += 1
+
+    def do_GET(self) -> None:
+        body = b'{"power": 42}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(http_pool, "pool", HttpConnectionPool())
+    Handler.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sessions_share_connection(server: str):
+    # execution
+    responses = [req.get_http_session().get(server + "/status", timeout=5).json() for _ in range(5)]
+
+    # evaluation
+    assert responses == [{"power": 42}] * 5
+    assert Handler.connections == 1
+    assert http_pool.pool.stats() == {"127.0.0.1": {"requests": 5, "failures": 0, "connections": 1, "reused": 4}}
+
+
+def test_session_close_keeps_pool(server: str):
+    # setup
+    session = req.get_http_session()
+    session.get(server)
+
+    # execution
+    session.close()
+    req.get_http_session().get(server)
+
+    # evaluation
+    assert Handler.connections == 1
+
+
+def test_host_policy(server: str, monkeypatch):
+    # setup
+    http_pool.pool.configure("127.0.0.1", timeout=3)
+    sent = []
+    original = http_pool.HostAdapter.send
+
+    def send(self, request, **kwargs):
+        sent.append(kwargs["timeout"])
+        return original(self, request, **kwargs)
+    monkeypatch.setattr(http_pool.HostAdapter, "send", send)
+
+    # execution
+    req.get_http_session().get(server)
+    req.get_http_session().get(server, timeout=1)
+
+    # evaluation
+    assert sent == [3, 1]
+    assert http_pool.pool.get("127.0.0.1").policy.retries == 1
@@ -4,12 +4,20 @@ from modules.common.fault_state import FaultState
 from modules.common import modbus
 from typing import List, Tuple
 from modules.common.modbus import ModbusDataType
+from modules.common.register_map import Register, RegisterMap, RegisterMeter
 
 
-class Lovato:
+class Lovato(RegisterMeter):
+    REGISTERS = RegisterMap(
+        Register("voltages", 0x0001, [ModbusDataType.INT_32]*3, divisor=100),
+        Register("currents", 0x0007, [ModbusDataType.INT_32]*3, divisor=10000),
+        Register("powers", 0x0013, [ModbusDataType.INT_32]*3, divisor=100),
+        Register("power_factors", 0x0025, [ModbusDataType.INT_32]*3, divisor=10000),
+        Register("frequency", 0x0031, ModbusDataType.INT_32, divisor=100),
+        max_gap=12)
+
     def __init__(self, modbus_id: int, client: modbus.ModbusClient) -> None:
-        self.client = client
-        self.id = modbus_id
+        super().__init__(modbus_id, client)
 
     def __process_error(self, e):
         if isinstance(e, FaultState):
@@ -19,16 +27,13 @@ class Lovato:
 
     def get_voltages(self) -> List[float]:
         try:
-            return [val / 100 for val in self.client.read_input_registers(
-                0x0001, [ModbusDataType.INT_32]*3, unit=self.id)]
+            return self._get("voltages")
         except Exception as e:
             self.__process_error(e)
 
     def get_power(self) -> Tuple[List[float], float]:
         try:
-            powers = [val / 100 for val in self.client.read_input_registers(
-                0x0013, [ModbusDataType.INT_32]*3, unit=self.id
-            )]
+            powers = self._get("powers")
             power = sum(powers)
             return powers, power
         except Exception as e:
@@ -36,14 +41,13 @@ class Lovato:
 
     def get_power_factors(self) -> List[float]:
         try:
-            return [val / 10000 for val in self.client.read_input_registers(
-                0x0025, [ModbusDataType.INT_32]*3, unit=self.id)]
+            return self._get("power_factors")
         except Exception as e:
             self.__process_error(e)
 
     def get_frequency(self) -> float:
         try:
-            frequency = self.client.read_input_registers(0x0031, ModbusDataType.INT_32, unit=self.id) / 100
+            frequency = self._get("frequency")
             if frequency > 100:
                 # needed if external measurement clamps connected
                 frequency = frequency / 10
@@ -53,7 +57,6 @@ class Lovato:
 
     def get_currents(self) -> List[float]:
         try:
-            return [val / 10000 for val in self.client.read_input_registers(
-                0x0007, [ModbusDataType.INT_32]*3, unit=self.id)]
+            return self._get("currents")
         except Exception as e:
             self.__process_error(e)
@@ -4,10 +4,12 @@
 Das Modul baut eine Modbus-TCP-Verbindung auf. Es gibt verschiedene Funktionen, um die gelesenen Register zu
 formatieren.
 """
+import functools
 import logging
+import operator
 import struct
 from enum import Enum
-from typing import Callable, Iterable, Union, overload, List
+from typing import Callable, Iterable, Optional, Tuple, Union, overload, List
 
 import pymodbus
 from pymodbus.client.sync import ModbusTcpClient
@@ -16,81 +18,129 @@ from pymodbus.payload import BinaryPayloadDecoder
 from urllib3.util import parse_url
 
 from modules.common.fault_state import FaultState
+from modules.common import modbus_pool
 
 log = logging.getLogger(__name__)
 
 
 class ModbusDataType(Enum):
-    UINT_8 = 8, "decode_8bit_uint"
-    UINT_16 = 16, "decode_16bit_uint"
-    UINT_32 = 32, "decode_32bit_uint"
-    UINT_64 = 64, "decode_64bit_uint"
-    INT_8 = 8, "decode_8bit_int"
-    INT_16 = 16, "decode_16bit_int"
-    INT_32 = 32, "decode_32bit_int"
-    INT_64 = 64, "decode_64bit_int"
-    FLOAT_16 = 16, "decode_16bit_float"
-    FLOAT_32 = 32, "decode_32bit_float"
-    FLOAT_64 = 64, "decode_64bit_float"
-
-    def __init__(self, bits: int, decoding_method: str):
+    UINT_8 = 8, "decode_8bit_uint", "B"
+    UINT_16 = 16, "decode_16bit_uint", "H"
+    UINT_32 = 32, "decode_32bit_uint", "I"
+    UINT_64 = 64, "decode_64bit_uint", "Q"
+    INT_8 = 8, "decode_8bit_int", "b"
+    INT_16 = 16, "decode_16bit_int", "h"
+    INT_32 = 32, "decode_32bit_int", "i"
+    INT_64 = 64, "decode_64bit_int", "q"
+    FLOAT_16 = 16, "decode_16bit_float", "e"
+    FLOAT_32 = 32, "decode_32bit_float", "f"
+    FLOAT_64 = 64, "decode_64bit_float", "d"
+
+    def __init__(self, bits: int, decoding_method: str, struct_format: str):
         self.bits = bits
         self.decoding_method = decoding_method
+        self.struct_format = struct_format
 
 
 _MODBUS_HOLDING_REGISTER_SIZE = 16
 Number = Union[int, float]
 
 
+def number_of_registers(types: Iterable[ModbusDataType]) -> int:
+    return sum(-(-t.bits // _MODBUS_HOLDING_REGISTER_SIZE) for t in types)
+
+
+class _StructDecoder:
+    """ Vorkompilierter Decoder für eine Signatur (Datentypen, Byte- und Wortreihenfolge). Die Register werden mit
+    einem pack-Aufruf in einen Puffer geschrieben und mit einem unpack_from-Aufruf dekodiert. Bei umgekehrter
+    Wortreihenfolge werden die Register vorher über einen vorberechneten itemgetter umsortiert.
+    """
+
+    def __init__(self, types: Tuple[ModbusDataType, ...], byteorder: Endian, wordorder: Endian) -> None:
+        self.count = number_of_registers(types)
+        # Bei Little-Endian-Bytereihenfolge werden die Bytes jedes Registers getauscht, wie im BinaryPayloadDecoder.
+        self.words = struct.Struct(("<" if byteorder == Endian.Little else ">") + str(self.count) + "H")
+        self.values = struct.Struct(">" + "".join(t.struct_format for t in types))
+        self.order = None  # type: Optional[Callable]
+        if wordorder == Endian.Little:
+            order = []  # type: List[int]
+            for t in types:
+                start, words = len(order), number_of_registers((t,))
+                order.extend(range(start + words - 1, start - 1, -1))
+            if order != list(range(len(order))):
+                self.order = operator.itemgetter(*order)
+
+    def decode(self, registers: List[int]) -> List[Number]:
+        if self.order is not None:
+            registers = self.order(registers)
+        elif len(registers) != self.count:
+            registers = registers[:self.count]
+        return list(self.values.unpack_from(self.words.pack(*registers)))
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(types: Tuple[ModbusDataType, ...], byteorder: Endian, wordorder: Endian) -> Optional[_StructDecoder]:
+    if (byteorder == Endian.Little or wordorder == Endian.Little) and any(t.bits == 8 for t in types):
+        # 8-Bit-Werte belegen im BinaryPayloadDecoder nur ein Byte und verschieben damit die Registergrenzen.
+        return None
+    return _StructDecoder(types, byteorder, wordorder)
+
+
+def decode_registers(registers: List[int], types: Iterable[ModbusDataType], byteorder: Endian = Endian.Big,
+                     wordorder: Endian = Endian.Big) -> List[Number]:
+    decoder = _compile(tuple(types), byteorder, wordorder)
+    if decoder is not None:
+        return decoder.decode(registers)
+    payload_decoder = BinaryPayloadDecoder.fromRegisters(registers, byteorder, wordorder)
+    return [getattr(payload_decoder, t.decoding_method)() for t in types]
+
+
 class ModbusClient:
-    def __init__(self, address: str, port: int = 502):
+    """ Die TCP-Verbindung wird über den Pool mit allen anderen Clients für dasselbe Gateway geteilt und bleibt nach
+    dem with-Block geöffnet.
+    """
+
+    def __init__(self, address: str, port: int = 502, connect_delay: float = 0):
         parsed_url = parse_url(address)
         host = parsed_url.host
         if parsed_url.port is not None:
             port = parsed_url.port
-        self.delegate = ModbusTcpClient(host, port)
+        self.__connection = modbus_pool.pool.get(host, port, self)
+        self.__connection.connect_delay = max(self.__connection.connect_delay, connect_delay)
+        self.delegate: ModbusTcpClient = self.__connection.client
         self.address = host
         self.port = port
+        self.__context = []  # type: List
 
     def __enter__(self):
-        self.delegate.__enter__()
+        context = self.__connection.use()
+        context.__enter__()
+        self.__context.append(context)
         return self
 
     def __exit__(self, klass, value, traceback):
-        self.delegate.__exit__(klass, value, traceback)
+        self.__context.pop().__exit__(klass, value, traceback)
+
+    def connect(self) -> None:
+        """ baut die Verbindung auf, falls sie noch nicht besteht."""
+        with self.__connection.use():
+            pass
 
     def close_connection(self) -> None:
         try:
             log.debug("Close Modbus TCP connection")
-            self.delegate.close()
+            self.__connection.close()
         except Exception as e:
             raise FaultState.error(__name__+" "+str(type(e))+" " +
                                    str(e)) from e
 
-    def __read_registers(self, read_register_method: Callable,
-                         address: int,
-                         types: Union[Iterable[ModbusDataType], ModbusDataType],
-                         byteorder: Endian = Endian.Big,
-                         wordorder: Endian = Endian.Big,
-                         **kwargs):
+    def __read_block(self, read_register_method: Callable, address: int, count: int, **kwargs) -> List[int]:
         try:
-            multi_request = isinstance(types, Iterable)
-            if not multi_request:
-                types = [types]
-
-            def divide_rounding_up(numerator: int, denominator: int):
-                return -(-numerator // denominator)
-
-            number_of_addresses = sum(divide_rounding_up(
-                t.bits, _MODBUS_HOLDING_REGISTER_SIZE) for t in types)
-            response = read_register_method(
-                address, number_of_addresses, **kwargs)
+            with self.__connection.use():
+                response = read_register_method(address, count, **kwargs)
             if response.isError():
                 raise FaultState.error(__name__+" "+str(response))
-            decoder = BinaryPayloadDecoder.fromRegisters(response.registers, byteorder, wordorder)
-            result = [struct.unpack(">e", struct.pack(">H", decoder.decode_16bit_uint())) if t ==
-                      ModbusDataType.FLOAT_16 else getattr(decoder, t.decoding_method)() for t in types]
-            return result if multi_request else result[0]
+            return response.registers
         except pymodbus.exceptions.ConnectionException as e:
             raise FaultState.error(
                 "TCP-Client konnte keine Verbindung zu " + str(self.address) + ":" + str(self.port) +
@@ -100,9 +150,36 @@ class ModbusClient:
                 "TCP-Client " + str(self.address) + ":" + str(self.port) +
                 " konnte keinen Wert abfragen. Falls vorhanden, parallele Verbindungen, zB. node red," +
                 "beenden und bei anhaltender Fehlermeldung Zähler neustarten.") from e
+        except FaultState:
+            raise
+        except Exception as e:
+            raise FaultState.error(__name__+" "+str(type(e))+" " +
+                                   str(e)) from e
+
+    def __read_registers(self, read_register_method: Callable,
+                         address: int,
+                         types: Union[Iterable[ModbusDataType], ModbusDataType],
+                         byteorder: Endian = Endian.Big,
+                         wordorder: Endian = Endian.Big,
+                         **kwargs):
+        multi_request = isinstance(types, Iterable)
+        if not multi_request:
+            types = [types]
+        registers = self.__read_block(read_register_method, address, number_of_registers(types), **kwargs)
+        try:
+            result = decode_registers(registers, types, byteorder, wordorder)
         except Exception as e:
             raise FaultState.error(__name__+" "+str(type(e))+" " +
                                    str(e)) from e
+        return result if multi_request else result[0]
+
+    def read_input_register_block(self, address: int, count: int, **kwargs) -> List[int]:
+        """ liest count Register ab address ohne Dekodierung."""
+        return self.__read_block(self.delegate.read_input_registers, address, count, **kwargs)
+
+    def read_holding_register_block(self, address: int, count: int, **kwargs) -> List[int]:
+        """ liest count Register ab address ohne Dekodierung."""
+        return self.__read_block(self.delegate.read_holding_registers, address, count, **kwargs)
 
     @overload
     def read_holding_registers(self, address: int, types: Iterable[ModbusDataType], byteorder: Endian = Endian.Big,
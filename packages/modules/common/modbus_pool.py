@@ -0,0 +1,151 @@
+"""Prozessweiter Pool für Modbus-TCP-Verbindungen.
+
+Alle Komponenten, die dasselbe Gateway (host:port) abfragen, teilen sich eine Verbindung. Die Verbindung bleibt
+zwischen den Abfragen offen, Zugriffe werden über ein Lock serialisiert. Schlägt der Verbindungsaufbau fehl, wird
+erst nach einer Wartezeit (Backoff) erneut versucht, eine Verbindung aufzubauen. close_idle() schließt Verbindungen,
+die länger nicht genutzt wurden, und entfernt die Verbindungen zu Gateways, die kein Gerät mehr verwendet.
+"""
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+import pymodbus
+from pymodbus.client.sync import ModbusTcpClient
+
+from helpermodules.pub import Pub
+
+log = logging.getLogger(__name__)
+
+IDLE_TIMEOUT = 60
+BACKOFF_MIN = 1
+BACKOFF_MAX = 60
+
+
+class ConnectionStats:
+    def __init__(self) -> None:
+        self.connects = 0
+        self.failures = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def add(self, latency: float) -> None:
+        self.connects += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def to_dict(self) -> Dict:
+        return {"connects": self.connects,
+                "failures": self.failures,
+                "latency_avg": round(self.latency_sum / self.connects * 1000, 1) if self.connects else None,
+                "latency_max": round(self.latency_max * 1000, 1)}
+
+
+class PooledConnection:
+    def __init__(self, host: str, port: int) -> None:
+        self.client = ModbusTcpClient(host, port)
+        self.lock = threading.RLock()
+        self.stats = ConnectionStats()
+        # Wartezeit nach einem neuen Verbindungsaufbau, die manche Geräte benötigen (z.B. Huawei)
+        self.connect_delay = 0.0
+        self.last_used = time.monotonic()
+        # ModbusClients, die die Verbindung verwenden. Gelöschte Geräte werden automatisch entfernt.
+        self.users: "weakref.WeakSet" = weakref.WeakSet()
+        self._depth = 0
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+
+    @contextmanager
+    def use(self):
+        """ stellt die Verbindung exklusiv für den aufrufenden Thread bereit. Verschachtelte Aufrufe im selben Thread
+        verwenden die bereits bestehende Verbindung.
+        """
+        with self.lock:
+            self._depth += 1
+            try:
+                if self._depth == 1:
+                    self._ensure_connected()
+                yield self.client
+            except (pymodbus.exceptions.ConnectionException, pymodbus.exceptions.ModbusIOException, OSError):
+                # Verbindung ist in einem unbekannten Zustand und wird beim nächsten Zugriff neu aufgebaut.
+                self.client.close()
+                raise
+            finally:
+                self._depth -= 1
+                self.last_used = time.monotonic()
+
+    def _ensure_connected(self) -> None:
+        if self.client.is_socket_open():
+            return
+        now = time.monotonic()
+        if now < self._next_attempt:
+            raise pymodbus.exceptions.ConnectionException(
+                f"{self.client.host}:{self.client.port}: nächster Verbindungsversuch in "
+                f"{round(self._next_attempt - now)}s")
+        start = time.monotonic()
+        if self.client.connect():
+            self.stats.add(time.monotonic() - start)
+            self._backoff = 0
+            self._next_attempt = 0
+            if self.connect_delay:
+                time.sleep(self.connect_delay)
+        else:
+            self.stats.failures += 1
+            self._backoff = min(max(self._backoff * 2, BACKOFF_MIN), BACKOFF_MAX)
+            self._next_attempt = time.monotonic() + self._backoff
+            raise pymodbus.exceptions.ConnectionException(f"{self.client.host}:{self.client.port}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.client.close()
+
+    def close_if_idle(self, now: float) -> None:
+        if self.lock.acquire(blocking=False):
+            try:
+                if self._depth == 0 and now - self.last_used > IDLE_TIMEOUT and self.client.is_socket_open():
+                    log.debug(f"Schließe ungenutzte Modbus-Verbindung {self.client.host}:{self.client.port}")
+                    self.client.close()
+            finally:
+                self.lock.release()
+
+
+class ModbusConnectionPool:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._connections: Dict[Tuple[str, int], PooledConnection] = {}
+
+    def get(self, host: str, port: int, user: object) -> PooledConnection:
+        with self._lock:
+            try:
+                connection = self._connections[(host, port)]
+            except KeyError:
+                connection = self._connections[(host, port)] = PooledConnection(host, port)
+            connection.users.add(user)
+            return connection
+
+    def close_idle(self) -> None:
+        """ schließt Verbindungen, die länger als IDLE_TIMEOUT nicht genutzt wurden, und entfernt Verbindungen, die
+        kein Gerät mehr verwendet.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, connection in list(self._connections.items()):
+                if len(connection.users) == 0:
+                    log.debug(f"Entferne Modbus-Verbindung {key[0]}:{key[1]}, die kein Gerät mehr verwendet.")
+                    del self._connections[key]
+                    connection.close()
+                else:
+                    connection.close_if_idle(now)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {f"{host}:{port}": connection.stats.to_dict()
+                    for (host, port), connection in self._connections.items()}
+
+    def pub_stats(self) -> None:
+        Pub().pub("openWB/system/perf/modbus", self.stats())
+
+
+pool = ModbusConnectionPool()
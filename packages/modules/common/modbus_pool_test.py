@@ -0,0 +1,108 @@
+import gc
+from unittest.mock import Mock
+
+import pymodbus
+import pytest
+
+from modules.common import modbus, modbus_pool
+from modules.common.modbus_pool import ModbusConnectionPool
+
+
+class FakeTcpClient:
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.open = False
+        self.connect_result = True
+        self.connect = Mock(side_effect=self._connect)
+        self.close = Mock(side_effect=self._close)
+
+    def _connect(self) -> bool:
+        self.open = self.connect_result
+        return self.open
+
+    def _close(self) -> None:
+        self.open = False
+
+    def is_socket_open(self) -> bool:
+        return self.open
+
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch) -> ModbusConnectionPool:
+    monkeypatch.setattr(modbus_pool, "ModbusTcpClient", FakeTcpClient)
+    pool = ModbusConnectionPool()
+    monkeypatch.setattr(modbus_pool, "pool", pool)
+    return pool
+
+
+def test_clients_share_connection(pool: ModbusConnectionPool):
+    # setup
+    first = modbus.ModbusClient("192.168.1.10", 502)
+    second = modbus.ModbusClient("192.168.1.10:502")
+
+    # execution
+    with first:
+        pass
+    with second:
+        with second:
+            pass
+
+    # evaluation
+    assert first.delegate is second.delegate
+    assert first.delegate.connect.call_count == 1
+    assert first.delegate.close.call_count == 0
+    assert pool.stats()["192.168.1.10:502"]["connects"] == 1
+
+
+def test_backoff_after_failed_connect(pool: ModbusConnectionPool):
+    # setup
+    client = modbus.ModbusClient("192.168.1.11")
+    client.delegate.connect_result = False
+
+    # execution
+    for _ in range(2):
+        with pytest.raises(pymodbus.exceptions.ConnectionException):
+            with client:
+                pass
+
+    # evaluation
+    assert client.delegate.connect.call_count == 1
+    assert pool.stats()["192.168.1.11:502"]["failures"] == 1
+
+
+def test_io_error_closes_connection():
+    # setup
+    client = modbus.ModbusClient("192.168.1.12")
+
+    # execution
+    with pytest.raises(pymodbus.exceptions.ModbusIOException):
+        with client:
+            raise pymodbus.exceptions.ModbusIOException()
+    with client:
+        pass
+
+    # evaluation
+    assert client.delegate.close.call_count == 1
+    assert client.delegate.connect.call_count == 2
+
+
+def test_close_idle(monkeypatch, pool: ModbusConnectionPool):
+    # setup
+    client = modbus.ModbusClient("192.168.1.13")
+    with client:
+        pass
+    removed = modbus.ModbusClient("192.168.1.14")
+    removed_delegate = removed.delegate
+    idle = pool.get("192.168.1.13", 502, client).last_used + modbus_pool.IDLE_TIMEOUT + 1
+    monkeypatch.setattr(modbus_pool.time, "monotonic", lambda: idle)
+
+    # execution
+    del removed
+    gc.collect()
+    pool.close_idle()
+
+    # evaluation
+    assert client.delegate.close.call_count == 1
+    assert removed_delegate.close.call_count == 1
+    assert list(pool.stats()) == ["192.168.1.13:502"]
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+from pymodbus.constants import Endian
+from pymodbus.payload import BinaryPayloadDecoder
+
+from modules.common.modbus import ModbusDataType, decode_registers, number_of_registers
+
+
+def payload_decoder(registers, types, byteorder, wordorder):
+    decoder = BinaryPayloadDecoder.fromRegisters(registers, byteorder, wordorder)
+    return [getattr(decoder, t.decoding_method)() for t in types]
+
+
+def assert_same(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert a == e or (a != a and e != e)  # NaN
+
+
+@pytest.mark.parametrize("byteorder", [Endian.Big, Endian.Little])
+@pytest.mark.parametrize("wordorder", [Endian.Big, Endian.Little])
+@pytest.mark.parametrize("data_type", list(ModbusDataType))
+def test_decode_registers_matches_payload_decoder(data_type, byteorder, wordorder):
+    # setup
+    rnd = random.Random(data_type.name)
+    types = [data_type] * 3
+    registers = [rnd.randrange(0x10000) for _ in range(number_of_registers(types))]
+
+    # execution
+    actual = decode_registers(registers, types, byteorder, wordorder)
+
+    # evaluation
+    assert_same(actual, payload_decoder(registers, types, byteorder, wordorder))
+
+
+@pytest.mark.parametrize("wordorder", [Endian.Big, Endian.Little])
+def test_decode_registers_mixed_types(wordorder):
+    # setup
+    types = [ModbusDataType.INT_16, ModbusDataType.UINT_64, ModbusDataType.FLOAT_32, ModbusDataType.INT_32]
+    registers = [0xFFFE, 1, 2, 3, 4, 0x4348, 0x0000, 0xFFFF, 0xFFFF, 0xAAAA]
+
+    # execution
+    actual = decode_registers(registers, types, Endian.Big, wordorder)
+
+    # evaluation
+    assert actual == payload_decoder(registers, types, Endian.Big, wordorder)
+    assert actual[0] == -2 and actual[3] == -1
+
+
+def test_decode_registers_float_16():
+    assert decode_registers([0x3C00], [ModbusDataType.FLOAT_16]) == [1.0]
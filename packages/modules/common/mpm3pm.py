@@ -2,13 +2,25 @@
 from modules.common.fault_state import FaultState
 from modules.common import modbus
 from modules.common.modbus import ModbusDataType
+from modules.common.register_map import Register, RegisterMap, RegisterMeter
 from typing import List, Tuple
 
 
-class Mpm3pm:
+class Mpm3pm(RegisterMeter):
+    # Faktorisierung von imported, exported und power_factors anders als in der Dokumentation angegeben
+    REGISTERS = RegisterMap(
+        Register("imported", 0x0002, ModbusDataType.UINT_32, factor=10),
+        Register("exported", 0x0004, ModbusDataType.UINT_32, factor=10),
+        Register("voltages", 0x08, [ModbusDataType.UINT_32]*3, divisor=10),
+        Register("currents", 0x0E, [ModbusDataType.UINT_32]*3, divisor=100),
+        Register("powers", 0x14, [ModbusDataType.INT_32]*3, divisor=100),
+        Register("power_factors", 0x20, [ModbusDataType.UINT_32]*3, divisor=10),
+        Register("power", 0x26, ModbusDataType.INT_32, divisor=100),
+        Register("frequency", 0x2c, ModbusDataType.UINT_32, divisor=100),
+        max_gap=6)
+
     def __init__(self, modbus_id: int, client: modbus.ModbusClient) -> None:
-        self.client = client
-        self.id = modbus_id
+        super().__init__(modbus_id, client)
 
     def __process_error(self, e):
         if isinstance(e, FaultState):
@@ -18,51 +30,42 @@ class Mpm3pm:
 
     def get_voltages(self) -> List[float]:
         try:
-            return [val / 10 for val in self.client.read_input_registers(
-                0x08, [ModbusDataType.UINT_32]*3, unit=self.id)]
+            return self._get("voltages")
         except Exception as e:
             self.__process_error(e)
 
     def get_imported(self) -> float:
         try:
-            # Faktorisierung anders als in der Dokumentation angegeben
-            return self.client.read_input_registers(0x0002, ModbusDataType.UINT_32, unit=self.id) * 10
+            return self._get("imported")
         except Exception as e:
             self.__process_error(e)
 
     def get_power(self) -> Tuple[List[float], float]:
         try:
-            powers = [val / 100 for val in self.client.read_input_registers(
-                0x14, [ModbusDataType.INT_32]*3, unit=self.id)]
-            power = self.client.read_input_registers(0x26, ModbusDataType.INT_32, unit=self.id) / 100
-            return powers, power
+            return self._get("powers"), self._get("power")
         except Exception as e:
             self.__process_error(e)
 
     def get_exported(self) -> float:
         try:
-            # Faktorisierung anders als in der Dokumentation angegeben
-            return self.client.read_input_registers(0x0004, ModbusDataType.UINT_32, unit=self.id) * 10
+            return self._get("exported")
         except Exception as e:
             self.__process_error(e)
 
     def get_power_factors(self) -> List[float]:
         try:
-            # Faktorisierung anders als in der Dokumentation angegeben
-            return [val / 10 for val in self.client.read_input_registers(
-                0x20, [ModbusDataType.UINT_32]*3, unit=self.id)]
+            return self._get("power_factors")
         except Exception as e:
             self.__process_error(e)
 
     def get_frequency(self) -> float:
         try:
-            return self.client.read_input_registers(0x2c, ModbusDataType.UINT_32, unit=self.id) / 100
+            return self._get("frequency")
         except Exception as e:
             self.__process_error(e)
 
     def get_currents(self) -> List[float]:
         try:
-            return [val / 100 for val in self.client.read_input_registers(
-                0x0E, [ModbusDataType.UINT_32]*3, unit=self.id)]
+            return self._get("currents")
         except Exception as e:
             self.__process_error(e)
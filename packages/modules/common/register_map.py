@@ -0,0 +1,118 @@
+"""Deklarative Registerbelegung für Modbus-Zähler.
+
+Die Register, die in einem Zyklus abgefragt werden, werden zu möglichst wenigen Blöcken zusammengefasst. Liegen
+zwischen zwei Registern höchstens max_gap ungenutzte Register, werden diese mitgelesen, anstatt eine weitere Anfrage
+zu stellen. Die Werte werden anschließend lokal aus dem gelesenen Block dekodiert.
+"""
+import functools
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from pymodbus.constants import Endian
+
+from modules.common import modbus
+from modules.common.modbus import ModbusDataType, Number
+
+# Maximale Anzahl Register je Anfrage laut Modbus-Spezifikation
+MAX_BLOCK_LENGTH = 125
+
+
+class Register(NamedTuple):
+    name: str
+    address: int
+    types: Union[ModbusDataType, Sequence[ModbusDataType]]
+    # Wert = Rohwert * factor / divisor
+    factor: Number = 1
+    divisor: Number = 1
+
+    @property
+    def type_list(self) -> Sequence[ModbusDataType]:
+        return self.types if isinstance(self.types, Sequence) else [self.types]
+
+    @property
+    def length(self) -> int:
+        return modbus.number_of_registers(self.type_list)
+
+    def decode(self, registers: List[int], byteorder: Endian, wordorder: Endian):
+        values = modbus.decode_registers(registers, self.type_list, byteorder, wordorder)
+        if self.factor != 1:
+            values = [value * self.factor for value in values]
+        if self.divisor != 1:
+            values = [value / self.divisor for value in values]
+        return values if isinstance(self.types, Sequence) else values[0]
+
+
+class Block(NamedTuple):
+    address: int
+    length: int
+    registers: Tuple[Register, ...]
+
+
+def plan(registers: Iterable[Register], max_gap: int = 0, max_length: int = MAX_BLOCK_LENGTH) -> List[Block]:
+    """ fasst die Register zu möglichst wenigen Blöcken zusammen.
+    """
+    blocks: List[Block] = []
+    for register in sorted(registers, key=lambda r: r.address):
+        if blocks:
+            last = blocks[-1]
+            gap = register.address - (last.address + last.length)
+            end = max(last.address + last.length, register.address + register.length)
+            if gap <= max_gap and end - last.address <= max_length:
+                blocks[-1] = Block(last.address, end - last.address, last.registers + (register,))
+                continue
+        blocks.append(Block(register.address, register.length, (register,)))
+    return blocks
+
+
+class RegisterMap:
+    def __init__(self, *registers: Register, max_gap: int = 0, byteorder: Endian = Endian.Big,
+                 wordorder: Endian = Endian.Big) -> None:
+        self.registers = {register.name: register for register in registers}
+        self.max_gap = max_gap
+        self.byteorder = byteorder
+        self.wordorder = wordorder
+
+    @functools.lru_cache(maxsize=None)
+    def plan(self, names: Tuple[str, ...]) -> List[Block]:
+        return plan([self.registers[name] for name in names], self.max_gap)
+
+    def read(self, client: modbus.ModbusClient, names: Optional[Iterable[str]] = None, **kwargs) -> Dict:
+        """ liest die Register (standardmäßig alle) als Input-Register und gibt die dekodierten Werte zurück.
+        """
+        names = tuple(sorted(self.registers if names is None else names))
+        values = {}
+        for block in self.plan(names):
+            registers = client.read_input_register_block(block.address, block.length, **kwargs)
+            for register in block.registers:
+                offset = register.address - block.address
+                values[register.name] = register.decode(
+                    registers[offset:offset + register.length], self.byteorder, self.wordorder)
+        return values
+
+
+class RegisterMeter:
+    """ Basisklasse für Zähler mit Registerbelegung. Die Getter lesen ihre Werte aus einem vorher mit prefetch
+    gelesenen Satz oder, falls dieser fehlt, direkt vom Zähler.
+    """
+    REGISTERS = RegisterMap()
+
+    def __init__(self, modbus_id: int, client: modbus.ModbusClient) -> None:
+        self.client = client
+        self.id = modbus_id
+        self._values: Dict = {}
+
+    @contextmanager
+    def prefetch(self, *names: str):
+        """ liest die angegebenen (standardmäßig alle) Werte mit möglichst wenigen Anfragen.
+        """
+        self._values = self.REGISTERS.read(self.client, names or None, unit=self.id)
+        try:
+            yield
+        finally:
+            self._values = {}
+
+    def _get(self, name: str):
+        try:
+            return self._values[name]
+        except KeyError:
+            return self.REGISTERS.read(self.client, (name,), unit=self.id)[name]
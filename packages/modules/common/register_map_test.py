@@ -0,0 +1,156 @@
+import threading
+from typing import List
+
+import pytest
+from pymodbus.constants import Endian
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+from pymodbus.payload import BinaryPayloadBuilder
+from pymodbus.server.sync import ModbusTcpServer
+
+from modules.common import modbus
+from modules.common.lovato import Lovato
+from modules.common.modbus import ModbusDataType
+from modules.common.mpm3pm import Mpm3pm
+from modules.common.register_map import Register, plan
+from modules.common.sdm import Sdm120, Sdm630
+
+
+class CountingDataBlock(ModbusSequentialDataBlock):
+    def __init__(self) -> None:
+        super().__init__(0, [0] * 200)
+        self.transactions = 0
+
+    def getValues(self, address, count=1):
+        self.transactions += 1
+        return super().getValues(address, count)
+
+
+def encode(address: int, values: List, data_type: ModbusDataType, block: CountingDataBlock) -> None:
+    builder = BinaryPayloadBuilder(byteorder=Endian.Big, wordorder=Endian.Big)
+    for value in values:
+        {ModbusDataType.FLOAT_32: builder.add_32bit_float,
+         ModbusDataType.INT_32: builder.add_32bit_int,
+         ModbusDataType.UINT_32: builder.add_32bit_uint}[data_type](value)
+    block.setValues(address, builder.to_registers())
+
+
+@pytest.fixture
+def simulator():
+    block = CountingDataBlock()
+    context = ModbusServerContext(slaves=ModbusSlaveContext(ir=block, zero_mode=True), single=True)
+    server = ModbusTcpServer(context, address=("127.0.0.1", 0))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield block, modbus.ModbusClient("127.0.0.1", server.socket.getsockname()[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_plan_merges_near_adjacent_registers():
+    # setup
+    registers = [Register("a", 0, ModbusDataType.INT_32), Register("b", 4, ModbusDataType.INT_32),
+                 Register("c", 30, ModbusDataType.INT_16), Register("d", 2, ModbusDataType.UINT_16)]
+
+    # execution
+    blocks = plan(registers, max_gap=1)
+
+    # evaluation
+    assert [(b.address, b.length, [r.name for r in b.registers]) for b in blocks] == [
+        (0, 6, ["a", "d", "b"]), (30, 1, ["c"])]
+
+
+def test_plan_respects_max_length():
+    blocks = plan([Register(str(i), i * 2, ModbusDataType.INT_32) for i in range(100)], max_gap=0)
+    assert [(b.address, b.length) for b in blocks] == [(0, 124), (124, 76)]
+
+
+def test_sdm630(simulator):
+    # setup
+    block, client = simulator
+    encode(0x00, [230.1, 231.2, 229.8], ModbusDataType.FLOAT_32, block)
+    encode(0x06, [1.5, 2.5, 3.5], ModbusDataType.FLOAT_32, block)
+    encode(0x0C, [345.0, 578.0, 804.0], ModbusDataType.FLOAT_32, block)
+    encode(0x1E, [0.5, 0.75, 1.0], ModbusDataType.FLOAT_32, block)
+    encode(0x46, [50.0, 1.25, 0.5], ModbusDataType.FLOAT_32, block)
+    meter = Sdm630(1, client)
+
+    # execution
+    with client, meter.prefetch():
+        voltages = meter.get_voltages()
+        currents = meter.get_currents()
+        powers, power = meter.get_power()
+        power_factors = meter.get_power_factors()
+        frequency = meter.get_frequency()
+        imported = meter.get_imported()
+        exported = meter.get_exported()
+
+    # evaluation
+    assert block.transactions == 1
+    assert voltages == pytest.approx([230.1, 231.2, 229.8])
+    assert currents == [1.5, 2.5, 3.5]
+    assert powers == [345.0, 578.0, 804.0] and power == 1727.0
+    assert power_factors == [0.5, 0.75, 1.0]
+    assert (frequency, imported, exported) == (50.0, 1250.0, 500.0)
+    assert meter.get_imported() == 1250.0
+    assert block.transactions == 2
+
+
+def test_sdm120(simulator):
+    # setup
+    block, client = simulator
+    encode(0x0C, [345.0], ModbusDataType.FLOAT_32, block)
+    encode(0x46, [500.0, 1.25, 0.5], ModbusDataType.FLOAT_32, block)
+    meter = Sdm120(1, client)
+
+    # execution
+    with client, meter.prefetch():
+        values = meter.get_power(), meter.get_frequency(), meter.get_imported(), meter.get_exported()
+
+    # evaluation
+    assert block.transactions == 2
+    assert values == (([345.0, 0, 0], 345.0), 50.0, 1250.0, 500.0)
+
+
+def test_lovato(simulator):
+    # setup
+    block, client = simulator
+    encode(0x01, [23010, 23120, 22980], ModbusDataType.INT_32, block)
+    encode(0x07, [15000, 25000, 35000], ModbusDataType.INT_32, block)
+    encode(0x13, [34500, 57800, -80400], ModbusDataType.INT_32, block)
+    encode(0x25, [5000, 7500, 10000], ModbusDataType.INT_32, block)
+    encode(0x31, [5000], ModbusDataType.INT_32, block)
+    meter = Lovato(1, client)
+
+    # execution
+    with client, meter.prefetch():
+        values = (meter.get_voltages(), meter.get_currents(), meter.get_power(), meter.get_power_factors(),
+                  meter.get_frequency())
+
+    # evaluation
+    assert block.transactions == 1
+    assert values == ([230.1, 231.2, 229.8], [1.5, 2.5, 3.5], ([345.0, 578.0, -804.0], 119.0), [0.5, 0.75, 1.0],
+                      50.0)
+
+
+def test_mpm3pm(simulator):
+    # setup
+    block, client = simulator
+    encode(0x02, [125, 50], ModbusDataType.UINT_32, block)
+    encode(0x08, [2301, 2312, 2298], ModbusDataType.UINT_32, block)
+    encode(0x0E, [150, 250, 350], ModbusDataType.UINT_32, block)
+    encode(0x14, [34500, 57800, -80400], ModbusDataType.INT_32, block)
+    encode(0x20, [5, 7, 10], ModbusDataType.UINT_32, block)
+    encode(0x26, [11900], ModbusDataType.INT_32, block)
+    encode(0x2c, [5000], ModbusDataType.UINT_32, block)
+    meter = Mpm3pm(1, client)
+
+    # execution
+    with client, meter.prefetch():
+        values = (meter.get_imported(), meter.get_exported(), meter.get_voltages(), meter.get_currents(),
+                  meter.get_power(), meter.get_power_factors(), meter.get_frequency())
+
+    # evaluation
+    assert block.transactions == 1
+    assert values == (1250, 500, [230.1, 231.2, 229.8], [1.5, 2.5, 3.5], ([345.0, 578.0, -804.0], 119.0),
+                      [0.5, 0.7, 1.0], 50.0)
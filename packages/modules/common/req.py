@@ -2,11 +2,16 @@
 import logging
 from requests import Session
 
+from modules.common import http_pool
+
 log = logging.getLogger("soc."+__name__)
 
 
 def get_http_session() -> Session:
+    """ Die Session ist für den Aufrufer, die Verbindungen werden über den http_pool mit allen Sessions geteilt."""
     session = Session()
+    session.mount("http://", http_pool.adapter)
+    session.mount("https://", http_pool.adapter)
     session.hooks['response'].append(lambda r, *args, **kwargs: r.raise_for_status())
     session.hooks['response'].append(lambda r, *args, **kwargs: log.debug("Get-Response: " + r.text))
     return session
@@ -2,13 +2,18 @@
 from modules.common import modbus
 from modules.common.fault_state import FaultState
 from modules.common.modbus import ModbusDataType
+from modules.common.register_map import Register, RegisterMap, RegisterMeter
 from typing import List, Tuple
 
 
-class Sdm:
+class Sdm(RegisterMeter):
+    REGISTERS = RegisterMap(
+        Register("frequency", 0x46, ModbusDataType.FLOAT_32),
+        Register("imported", 0x48, ModbusDataType.FLOAT_32, factor=1000),
+        Register("exported", 0x4a, ModbusDataType.FLOAT_32, factor=1000))
+
     def __init__(self, modbus_id: int, client: modbus.ModbusClient) -> None:
-        self.client = client
-        self.id = modbus_id
+        super().__init__(modbus_id, client)
 
     def process_error(self, e):
         if isinstance(e, FaultState):
@@ -18,19 +23,19 @@ class Sdm:
 
     def get_imported(self) -> float:
         try:
-            return self.client.read_input_registers(0x0048, ModbusDataType.FLOAT_32, unit=self.id) * 1000
+            return self._get("imported")
         except Exception as e:
             self.process_error(e)
 
     def get_exported(self) -> float:
         try:
-            return self.client.read_input_registers(0x004a, ModbusDataType.FLOAT_32, unit=self.id) * 1000
+            return self._get("exported")
         except Exception as e:
             self.process_error(e)
 
     def get_frequency(self) -> float:
         try:
-            frequency = self.client.read_input_registers(0x46, ModbusDataType.FLOAT_32, unit=self.id)
+            frequency = self._get("frequency")
             if frequency > 100:
                 frequency = frequency / 10
             return frequency
@@ -39,24 +44,33 @@ class Sdm:
 
 
 class Sdm630(Sdm):
+    # Der Registerbereich 0x00 bis 0x4b ist beim SDM630 lückenlos lesbar, daher genügt eine Anfrage.
+    REGISTERS = RegisterMap(
+        Register("voltages", 0x00, [ModbusDataType.FLOAT_32]*3),
+        Register("currents", 0x06, [ModbusDataType.FLOAT_32]*3),
+        Register("powers", 0x0C, [ModbusDataType.FLOAT_32]*3),
+        Register("power_factors", 0x1E, [ModbusDataType.FLOAT_32]*3),
+        *Sdm.REGISTERS.registers.values(),
+        max_gap=40)
+
     def __init__(self, modbus_id: int, client: modbus.ModbusClient) -> None:
         super().__init__(modbus_id, client)
 
     def get_currents(self) -> List[float]:
         try:
-            return self.client.read_input_registers(0x06, [ModbusDataType.FLOAT_32]*3, unit=self.id)
+            return self._get("currents")
         except Exception as e:
             self.process_error(e)
 
     def get_power_factors(self) -> List[float]:
         try:
-            return self.client.read_input_registers(0x1E, [ModbusDataType.FLOAT_32]*3, unit=self.id)
+            return self._get("power_factors")
         except Exception as e:
             self.process_error(e)
 
     def get_power(self) -> Tuple[List[float], float]:
         try:
-            powers = self.client.read_input_registers(0x0C, [ModbusDataType.FLOAT_32]*3, unit=self.id)
+            powers = self._get("powers")
             power = sum(powers)
             return powers, power
         except Exception as e:
@@ -64,18 +78,22 @@ class Sdm630(Sdm):
 
     def get_voltages(self) -> List[float]:
         try:
-            return self.client.read_input_registers(0x00, [ModbusDataType.FLOAT_32]*3, unit=self.id)
+            return self._get("voltages")
         except Exception as e:
             self.process_error(e)
 
 
 class Sdm120(Sdm):
+    REGISTERS = RegisterMap(
+        Register("power", 0x0C, ModbusDataType.FLOAT_32),
+        *Sdm.REGISTERS.registers.values())
+
     def __init__(self, modbus_id: int, client: modbus.ModbusClient) -> None:
         super().__init__(modbus_id, client)
 
     def get_power(self) -> Tuple[List[float], float]:
         try:
-            power = self.client.read_input_registers(0x0C, ModbusDataType.FLOAT_32, unit=self.id)
+            power = self._get("power")
             return [power, 0, 0], power
         except Exception as e:
             self.process_error(e)
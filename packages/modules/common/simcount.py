@@ -1,9 +1,15 @@
 """ Sim Count
 Berechnet die importierte und exportierte Leistung, wenn der Zähler / PV-Modul / Speicher diese nicht liefert.
+
+Der Stand der Integration wird je Komponente im Speicher gehalten (SimCounterStore) und nur alle
+CHECKPOINT_INTERVAL Sekunden sowie beim Beenden gesichert: bei SimCount auf dem Broker (simulation-Topics), bei
+SimCountLegacy in der Ramdisk. Beim Start wird die Integration an der letzten Sicherung fortgesetzt.
 """
+import atexit
 import logging
 import os
 import paho.mqtt.client as mqtt
+import threading
 import time
 import typing
 
@@ -60,6 +66,63 @@ def write_ramdisk_file(name: str, value):
         process_error(e)
 
 
+# Intervall in Sekunden, in dem der Stand der Integration gesichert wird
+CHECKPOINT_INTERVAL = 60
+
+
+class SimCounterState(typing.NamedTuple):
+    timestamp: float
+    power: float
+    # Zählerstände in Ws
+    imported: float
+    exported: float
+
+
+class SimCounterStore:
+    """ Stand der Integration je Komponente. Jede Komponente wird nur von einem Thread gleichzeitig abgefragt, die
+    Sperre schützt das Verzeichnis der Komponenten für checkpoint().
+    """
+
+    def __init__(self, checkpoint_interval: float = CHECKPOINT_INTERVAL) -> None:
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._states: typing.Dict[str, SimCounterState] = {}
+        self._writers: typing.Dict[str, typing.Callable[[SimCounterState], None]] = {}
+        self._checkpointed: typing.Dict[str, float] = {}
+
+    def get(self, key: str) -> typing.Optional[SimCounterState]:
+        return self._states.get(key)
+
+    def set(self, key: str, state: SimCounterState, writer: typing.Callable[[SimCounterState], None]) -> None:
+        """ speichert den Stand und sichert ihn mit writer, wenn das Intervall seit der letzten Sicherung abgelaufen
+        ist.
+        """
+        with self._lock:
+            self._states[key] = state
+            self._writers[key] = writer
+            due = state.timestamp - self._checkpointed.get(key, 0) >= self.checkpoint_interval
+            if due:
+                self._checkpointed[key] = state.timestamp
+        if due:
+            writer(state)
+
+    def checkpoint(self) -> None:
+        """ sichert den Stand aller Komponenten, z.B. beim Beenden."""
+        with self._lock:
+            pending = [(self._writers[key], state) for key, state in self._states.items()
+                       if self._checkpointed.get(key) != state.timestamp]
+            self._checkpointed.update((key, state.timestamp) for key, state in self._states.items())
+        for writer, state in pending:
+            try:
+                writer(state)
+            except Exception:
+                log.exception("Fehler beim Sichern des Zählerstands der Simulation")
+
+
+store = SimCounterStore()
+atexit.register(store.checkpoint)
+
+
 class SimCountLegacy:
     def sim_count(
         self, power_present: float, topic: str = "", data: dict = {}, prefix: str = ""
@@ -79,35 +142,11 @@ class SimCountLegacy:
         """
         try:
             timestamp_present = time.time()
-            power_previous, counter_export_present, counter_export_previous = 0, 0, 0
-            counter_import_present, counter_import_previous = 0, 0
-            timestamp_previous = 0.0
-            start_new = True
-            if os.path.isfile('/var/www/html/openWB/ramdisk/'+prefix+'sec0'):
-                timestamp_previous = float(read_ramdisk_file(prefix+'sec0'))
-                power_previous = int(float(read_ramdisk_file(prefix+'wh0')))
-                try:
-                    counter_import_present = int(float(read_ramdisk_file(prefix+'watt0pos')))
-                except Exception:
-                    counter_import_present = int(Restore().restore_value("watt0pos", prefix))
-                counter_import_previous = counter_import_present
-                try:
-                    counter_export_present = int(float(read_ramdisk_file(prefix+'watt0neg')))
-                except Exception:
-                    counter_export_present = int(Restore().restore_value("watt0neg", prefix))
-                if counter_export_present < 0:
-                    # runs/simcount.py speichert das Zwischenergebnis des Exports negativ ab.
-                    counter_export_present = counter_export_present * -1
-                counter_export_previous = counter_export_present
-                log.debug("simcount Zwischenergebnisse letzte Berechnung: Import: " +
-                          str(counter_import_previous) + " Export: " + str(counter_export_previous) +
-                          " Leistung: " + str(power_previous))
-                start_new = False
-            write_ramdisk_file(prefix+'sec0', "%22.6f" % timestamp_present)
-            write_ramdisk_file(prefix+'wh0', int(power_present))
-
-            if start_new:
+            state = store.get(prefix) or self._restore(prefix)
+            if state is None:
                 log.debug("Neue Simulation starten.")
+                write_ramdisk_file(prefix+'sec0', "%22.6f" % timestamp_present)
+                write_ramdisk_file(prefix+'wh0', int(power_present))
                 if prefix == "bezug":
                     imported = get_existing_imports_exports('bezugkwh')
                     exported = get_existing_imports_exports('einspeisungkwh')
@@ -122,39 +161,43 @@ class SimCountLegacy:
                     exported = get_existing_imports_exports('speicherekwh')
                 return imported, exported
             else:
-                # timestamp_previous = timestamp_previous + 1  # do not increment time if calculating areas!
-                seconds_since_previous = timestamp_present - timestamp_previous
-                imp_exp = calculate_import_export(
-                    seconds_since_previous, power_previous, power_present)
-                counter_export_present = counter_export_present + imp_exp[1]
-                counter_import_present = counter_import_present + imp_exp[0]
-                log.debug(
-                    "simcount aufsummierte Energie: Bezug[Ws]: " + str(counter_import_present) + ", Einspeisung[Ws]: " +
-                    str(counter_export_present)
-                )
-                energy_positive_kWh = counter_import_present / 3600
-                energy_negative_kWh = counter_export_present / 3600
-                log.info(
-                    "simcount Ergebnis: Bezug[Wh]: " + str(energy_positive_kWh) +
-                    ", Einspeisung[Wh]: " + str(energy_negative_kWh)
-                )
-
-                topic = get_topic(prefix)
-                log.debug(
-                    "simcount Zwischenergebnisse aktuelle Berechnung: Import: " + str(counter_import_present) +
-                    " Export: " + str(counter_export_present) + " Leistung: " + str(power_present)
-                )
-                write_ramdisk_file(prefix+'watt0pos', counter_import_present)
-                if counter_import_present != counter_import_previous:
-                    pub.pub_single("openWB/"+topic+"/WHImported_temp", counter_import_present, no_json=True)
-                write_ramdisk_file(prefix+'watt0neg', counter_export_present)
-                if counter_export_present != counter_export_previous:
-                    pub.pub_single("openWB/"+topic+"/WHExport_temp",
-                                   counter_export_present, no_json=True)
-                return energy_positive_kWh, energy_negative_kWh
+                state = _integrate_state(state, timestamp_present, power_present)
+                store.set(prefix, state, lambda state: self._checkpoint(prefix, state))
+                return state.imported / 3600, state.exported / 3600
         except Exception as e:
             process_error(e)
 
+    def _restore(self, prefix: str) -> typing.Optional[SimCounterState]:
+        """ setzt die Simulation an der letzten Sicherung in der Ramdisk fort."""
+        if not os.path.isfile('/var/www/html/openWB/ramdisk/'+prefix+'sec0'):
+            return None
+        timestamp_previous = float(read_ramdisk_file(prefix+'sec0'))
+        power_previous = int(float(read_ramdisk_file(prefix+'wh0')))
+        try:
+            counter_import_present = int(float(read_ramdisk_file(prefix+'watt0pos')))
+        except Exception:
+            counter_import_present = int(Restore().restore_value("watt0pos", prefix))
+        try:
+            counter_export_present = int(float(read_ramdisk_file(prefix+'watt0neg')))
+        except Exception:
+            counter_export_present = int(Restore().restore_value("watt0neg", prefix))
+        if counter_export_present < 0:
+            # runs/simcount.py speichert das Zwischenergebnis des Exports negativ ab.
+            counter_export_present = counter_export_present * -1
+        log.debug("simcount Zwischenergebnisse letzte Berechnung: Import: " +
+                  str(counter_import_present) + " Export: " + str(counter_export_present) +
+                  " Leistung: " + str(power_previous))
+        return SimCounterState(timestamp_previous, power_previous, counter_import_present, counter_export_present)
+
+    def _checkpoint(self, prefix: str, state: SimCounterState) -> None:
+        write_ramdisk_file(prefix+'sec0', "%22.6f" % state.timestamp)
+        write_ramdisk_file(prefix+'wh0', int(state.power))
+        write_ramdisk_file(prefix+'watt0pos', state.imported)
+        write_ramdisk_file(prefix+'watt0neg', state.exported)
+        topic = get_topic(prefix)
+        pub.pub_single("openWB/"+topic+"/WHImported_temp", state.imported, no_json=True)
+        pub.pub_single("openWB/"+topic+"/WHExport_temp", state.exported, no_json=True)
+
 
 def get_existing_imports_exports(file: str) -> float:
     if os.path.isfile('/var/www/html/openWB/ramdisk/'+file):
@@ -169,6 +212,7 @@ class Restore():
     def restore_value(self, value: str, prefix: str) -> float:
         result = 0
         self.temp = ""
+        self.received = threading.Event()
         try:
             self.value = value
             self.prefix = prefix
@@ -179,7 +223,8 @@ class Restore():
 
             client.connect("localhost", 1883)
             client.loop_start()
-            time.sleep(0.5)
+            # Ein retained Wert wird direkt nach dem Abonnieren gesendet, ohne retained Wert bis zum Timeout warten.
+            self.received.wait(0.5)
             client.loop_stop()
             try:
                 result = float(self.temp)
@@ -224,6 +269,7 @@ class Restore():
         """ wartet auf eingehende Topics.
         """
         self.temp = msg.payload
+        self.received.set()
 
     def __getserial(self):
         """ Extract serial from cpuinfo file
@@ -256,61 +302,53 @@ class SimCount:
         """
         try:
             timestamp_present = time.time()
-            power_previous, counter_export_present, counter_import_present = 0, 0, 0
-            timestamp_previous = 0.0
-            start_new = True
-            if "timestamp_present" in data:
-                timestamp_previous = float(data["timestamp_present"])
-                power_previous = int(data["power_present"])
-                if "present_imported" in data:
-                    counter_import_present = int(data["present_imported"])
-                else:
-                    counter_import_present = 0
-                if "present_exported" in data:
-                    counter_export_present = int(data["present_exported"])
-                else:
-                    counter_export_present = 0
-                log.debug(
-                    "Fortsetzen der Simulation: Importzähler: " + str(counter_import_present)+"Ws, Export-Zähler: " +
-                    str(counter_export_present) + "Ws"
-                )
-                start_new = False
-            pub.Pub().pub(topic+"simulation/timestamp_present", "%22.6f" % timestamp_present)
-            pub.Pub().pub(topic+"simulation/power_present", power_present)
-
-            if start_new:
+            state = store.get(topic) or self._restore(data)
+            if state is None:
                 log.debug("Neue Simulation")
-                pub.Pub().pub(topic+"simulation/present_imported", 0)
-                pub.Pub().pub(topic+"simulation/present_exported", 0)
+                store.set(topic, SimCounterState(timestamp_present, power_present, 0, 0),
+                          lambda state: self._checkpoint(topic, state))
                 return 0, 0
             else:
-                # timestamp_previous = timestamp_previous + 1  # do not increment time if calculating areas!
-                seconds_since_previous = timestamp_present - timestamp_previous
-                imp_exp = calculate_import_export(
-                    seconds_since_previous, power_previous, power_present)
-                counter_export_present = counter_export_present + imp_exp[1]
-                counter_import_present = counter_import_present + imp_exp[0]
-                log.debug(
-                    "simcount aufsummierte Energie: Bezug[Ws]: " + str(counter_import_present) +
-                    ", Einspeisung[Ws]: " +
-                    str(counter_export_present)
-                )
-                energy_positive_kWh = counter_import_present / 3600
-                energy_negative_kWh = counter_export_present / 3600
-                log.info(
-                    "simcount Ergebnis: Bezug[Wh]: " + str(energy_positive_kWh) +
-                    ", Einspeisung[Wh]: " + str(energy_negative_kWh)
-                )
-                log.debug(
-                    "simcount Zwischenergebnisse aktuelle Berechnung: Import: " + str(counter_import_present) +
-                    " Export: " + str(counter_export_present) + " Power: " + str(power_present)
-                )
-                pub.Pub().pub(topic+"simulation/present_imported", counter_import_present)
-                pub.Pub().pub(topic+"simulation/present_exported", counter_export_present)
-                return energy_positive_kWh, energy_negative_kWh
+                state = _integrate_state(state, timestamp_present, power_present)
+                store.set(topic, state, lambda state: self._checkpoint(topic, state))
+                return state.imported / 3600, state.exported / 3600
         except Exception as e:
             process_error(e)
 
+    def _restore(self, data: dict) -> typing.Optional[SimCounterState]:
+        """ setzt die Simulation an der letzten Sicherung auf dem Broker fort."""
+        if "timestamp_present" not in data:
+            return None
+        counter_import_present = float(data.get("present_imported", 0))
+        counter_export_present = float(data.get("present_exported", 0))
+        log.debug(
+            "Fortsetzen der Simulation: Importzähler: " + str(counter_import_present)+"Ws, Export-Zähler: " +
+            str(counter_export_present) + "Ws"
+        )
+        return SimCounterState(float(data["timestamp_present"]), float(data["power_present"]),
+                               counter_import_present, counter_export_present)
+
+    def _checkpoint(self, topic: str, state: SimCounterState) -> None:
+        pub.Pub().pub(topic+"simulation/timestamp_present", "%22.6f" % state.timestamp)
+        pub.Pub().pub(topic+"simulation/power_present", state.power)
+        pub.Pub().pub(topic+"simulation/present_imported", state.imported)
+        pub.Pub().pub(topic+"simulation/present_exported", state.exported)
+
+
+def _integrate_state(state: SimCounterState, timestamp_present: float, power_present: float) -> SimCounterState:
+    imp_exp = calculate_import_export(timestamp_present - state.timestamp, state.power, power_present)
+    counter_import_present = state.imported + imp_exp[0]
+    counter_export_present = state.exported + imp_exp[1]
+    log.debug(
+        "simcount aufsummierte Energie: Bezug[Ws]: " + str(counter_import_present) +
+        ", Einspeisung[Ws]: " + str(counter_export_present)
+    )
+    log.info(
+        "simcount Ergebnis: Bezug[Wh]: " + str(counter_import_present / 3600) +
+        ", Einspeisung[Wh]: " + str(counter_export_present / 3600)
+    )
+    return SimCounterState(timestamp_present, power_present, counter_import_present, counter_export_present)
+
 
 Number = typing.Union[int, float]
 
@@ -323,30 +361,55 @@ def calculate_import_export(
             "simcount Berechnungsgrundlage: vergangene Zeit [s]" + str(seconds_since_previous) +
             ", vorherige Leistung[W]: " + str(power1) + ", aktuelle Leistung[W]: " + str(power2)
         )
-        power_low = min(power1, power2)
-        power_high = max(power1, power2)
-        gradient = (power_high - power_low) / seconds_since_previous
-        # Berechnung der Gesamtfläche (ohne Beträge, Fläche unterhalb der x-Achse reduziert die Fläche oberhalb der
-        # x-Achse)
-        def energy_function(seconds): return .5 * gradient * seconds ** 2 + power_low * seconds
-
-        energy_total = energy_function(seconds_since_previous)
-        log.debug("simcount Gesamtenergie im Zeitintervall: "+str(energy_total))
-        if power_low < 0 < power_high:
-            # Berechnung der Fläche im vierten Quadranten -> Export
-            power_zero_seconds = -power_low / gradient
-            energy_exported = energy_function(power_zero_seconds)
-            log.debug(
-                "simcount exportierte Energie im Zeitintervall: "+str(energy_exported))
-            # Betragsmäßige Gesamtfläche: oberhalb der x-Achse = Import, unterhalb der x-Achse: Export
-            return energy_total - energy_exported, energy_exported * -1
-        return (energy_total, 0) if energy_total >= 0 else (0, -energy_total)
+        return _import_export(seconds_since_previous, power1, power2)
     except Exception as e:
         process_error(e)
 
 
+def calculate_import_export_series(samples: typing.Iterable[typing.Tuple[float, Number]]
+                                   ) -> typing.Tuple[Number, Number]:
+    """ berechnet die importierte und exportierte Energie in Ws aus einer Folge von (Zeitstempel, Leistung), z.B.
+    um die Energie für einen Zeitraum nachträglich zu ermitteln. Zwischen den Messwerten wird wie bei
+    calculate_import_export linear interpoliert.
+    """
+    try:
+        imported, exported = 0, 0
+        iterator = iter(samples)
+        previous = next(iterator, None)
+        for sample in iterator:
+            seconds = sample[0] - previous[0]
+            if seconds > 0:
+                energy = _import_export(seconds, previous[1], sample[1])
+                imported += energy[0]
+                exported += energy[1]
+            previous = sample
+        return imported, exported
+    except Exception as e:
+        process_error(e)
+
+
+def _import_export(seconds_since_previous: Number, power1: Number, power2: Number) -> typing.Tuple[Number, Number]:
+    power_low = min(power1, power2)
+    power_high = max(power1, power2)
+    gradient = (power_high - power_low) / seconds_since_previous
+    # Berechnung der Gesamtfläche (ohne Beträge, Fläche unterhalb der x-Achse reduziert die Fläche oberhalb der
+    # x-Achse)
+    def energy_function(seconds): return .5 * gradient * seconds ** 2 + power_low * seconds
+
+    energy_total = energy_function(seconds_since_previous)
+    if power_low < 0 < power_high:
+        # Berechnung der Fläche im vierten Quadranten -> Export
+        power_zero_seconds = -power_low / gradient
+        energy_exported = energy_function(power_zero_seconds)
+        # Betragsmäßige Gesamtfläche: oberhalb der x-Achse = Import, unterhalb der x-Achse: Export
+        return energy_total - energy_exported, energy_exported * -1
+    return (energy_total, 0) if energy_total >= 0 else (0, -energy_total)
+
+
 def run_cli(power_present: int, prefix: str):
     SimCountLegacy().sim_count(power_present=power_present, prefix=prefix)
+    # Jeder Aufruf ist ein eigener Prozess, daher den Stand immer sichern.
+    store.checkpoint()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
 from typing import Tuple
+from unittest.mock import Mock
 
 import pytest as pytest
 
-from modules.common.simcount import Number, calculate_import_export
+from modules.common import simcount
+from modules.common.simcount import (Number, SimCount, SimCounterState, SimCounterStore, calculate_import_export,
+                                     calculate_import_export_series)
 
 
 class Params:
@@ -54,3 +57,67 @@ def test_energy_calculation(params: Params):
 
     # evaluation
     assert actual == params.expected_energy
+
+
+def test_energy_calculation_series():
+    # setup
+    samples = [(0, -9), (10, 1), (10, 5), (12, 5), (15, -3)]
+
+    # execution
+    actual = calculate_import_export_series(samples)
+
+    # evaluation
+    expected = [calculate_import_export(10, -9, 1), calculate_import_export(2, 5, 5), calculate_import_export(3, 5, -3)]
+    assert actual == pytest.approx((sum(e[0] for e in expected), sum(e[1] for e in expected)))
+
+
+# modules/conftest.py ersetzt sim_count für die Tests der Module
+sim_count_unmocked = SimCount.sim_count
+
+
+@pytest.fixture
+def sim_store(monkeypatch) -> SimCounterStore:
+    monkeypatch.setattr(SimCount, "sim_count", sim_count_unmocked)
+    store = SimCounterStore(checkpoint_interval=60)
+    monkeypatch.setattr(simcount, "store", store)
+    return store
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Mock:
+    clock = Mock(return_value=1000.0)
+    monkeypatch.setattr(simcount.time, "time", clock)
+    return clock
+
+
+def test_sim_count_keeps_state_in_memory(sim_store, clock, monkeypatch):
+    # setup
+    checkpoints = []
+    monkeypatch.setattr(SimCount, "_checkpoint", lambda self, topic, state: checkpoints.append(state))
+    sim_count = SimCount()
+
+    # execution
+    results = []
+    for power in (3600, 3600, 3600):
+        results.append(sim_count.sim_count(power, topic="topic/", data={}))
+        clock.return_value += 10
+
+    # evaluation
+    assert results == [(0, 0), (10, 0), (20, 0)]
+    # Sicherung beim Start der Simulation, danach erst nach Ablauf des Intervalls
+    assert checkpoints == [SimCounterState(1000, 3600, 0, 0)]
+    sim_store.checkpoint()
+    assert checkpoints[-1] == SimCounterState(1020, 3600, 72000, 0)
+
+
+def test_sim_count_warm_starts_from_checkpoint(sim_store, clock):
+    # setup
+    data = {"timestamp_present": "%22.6f" % 990, "power_present": -360, "present_imported": 7200,
+            "present_exported": 3600}
+
+    # execution
+    result = SimCount().sim_count(-360, topic="topic/", data=data)
+
+    # evaluation
+    assert result == (2, 2)
+    assert sim_store.get("topic/") == SimCounterState(1000, -360, 7200, 7200)
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import logging
-import time
 from typing import Dict, Union, List
 
 from helpermodules.cli import run_using_positional_cli_args
@@ -40,10 +39,10 @@ class Device(AbstractDevice):
         self.components = {}  # type: Dict[str, huawei_component_classes]
         try:
             ip_address = device_config["configuration"]["ip_address"]
-            self.client = modbus.ModbusClient(ip_address, 502)
-            self.client.delegate.connect()
-            time.sleep(7)
+            # Huawei benötigt nach dem Verbindungsaufbau eine Wartezeit, bevor Register abgefragt werden können.
             self.device_config = device_config
+            self.client = modbus.ModbusClient(ip_address, 502, connect_delay=7)
+            self.client.connect()
         except Exception:
             log.exception("Fehler im Modul "+device_config["name"])
 
@@ -38,9 +38,8 @@ class BatKitFlex:
         self.component_info = ComponentInfo.from_component_config(component_config)
 
     def update(self):
-        # TCP-Verbindung schließen möglichst bevor etwas anderes gemacht wird, um im Fehlerfall zu verhindern,
-        # dass offene Verbindungen den Modbus-Adapter blockieren.
-        with self.__tcp_client:
+        # Alle Werte des Zählers mit möglichst wenigen Anfragen lesen.
+        with self.__tcp_client, self.__client.prefetch():
             if isinstance(self.__client, Sdm630):
                 _, power = self.__client.get_power()
                 power = power * -1
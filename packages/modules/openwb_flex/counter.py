@@ -38,9 +38,8 @@ class EvuKitFlex:
         self.component_info = ComponentInfo.from_component_config(component_config)
 
     def update(self):
-        # TCP-Verbindung schließen möglichst bevor etwas anderes gemacht wird, um im Fehlerfall zu verhindern,
-        # dass offene Verbindungen den Modbus-Adapter blockieren.
-        with self.__tcp_client:
+        # Alle Werte des Zählers mit möglichst wenigen Anfragen lesen.
+        with self.__tcp_client, self.__client.prefetch():
             voltages = self.__client.get_voltages()
             powers, power = self.__client.get_power()
             frequency = self.__client.get_frequency()
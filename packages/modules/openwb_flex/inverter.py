@@ -37,7 +37,7 @@ class PvKitFlex:
     def update(self) -> None:
         """ liest die Werte des Moduls aus.
         """
-        with self.__tcp_client:
+        with self.__tcp_client, self.__client.prefetch():
             powers, power = self.__client.get_power()
 
             version = self.component_config["configuration"]["version"]
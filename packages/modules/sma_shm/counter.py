@@ -17,6 +17,12 @@ def get_default_config() -> dict:
     }
 
 
+# Einträge der Datagramme, die parse_datagram benötigt
+DATAGRAM_KEYS = frozenset(["pconsume", "psupply", "pconsumecounter", "psupplycounter", "frequency"] +
+                          [key % phase for key in ("p%iconsume", "p%isupply", "u%i", "i%i", "cosphi%i")
+                           for phase in range(1, 4)])
+
+
 def parse_datagram(sma_data: dict):
     def get_power(phase_str: str = ""):
         # "consume" and "supply" are always >= 0. Thus we need to check both "supply" and "consume":
@@ -4,6 +4,7 @@ import pytest
 
 from helpermodules import compatibility
 from modules.sma_shm import counter, speedwiredecoder
+from modules.sma_shm.speedwire_receiver import Sample
 from test_utils.mock_ramdisk import MockRamdisk
 
 # This sample was collected from an SMA Energy Meter with Firmware 2.0.18.R on 2021-12-22:
@@ -35,7 +36,7 @@ def test_process_datagram_energy_meter(mock_ramdisk):
     sma_counter = counter.create_component(counter.get_default_config())
 
     # execution
-    sma_counter.read_datagram(sma_data)
+    sma_counter.read_samples([Sample(100, sma_data)], now=101, max_age=5)
 
     # evaluation
     assert mock_ramdisk.files["wattbezug"] == "-11967"
@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
 import logging
-import socket
 import time
-from typing import Dict, List, Callable, Iterator
+from typing import Dict, List, Callable
 
 from helpermodules.cli import run_using_positional_cli_args
 from modules.common.abstract_device import AbstractDevice
@@ -10,7 +9,7 @@ from modules.common.component_context import MultiComponentUpdateContext
 from modules.common.fault_state import FaultState
 from modules.sma_shm import counter
 from modules.sma_shm import inverter
-from modules.sma_shm.speedwire_listener import SpeedwireListener
+from modules.sma_shm import speedwire_receiver
 from modules.sma_shm.utils import SpeedwireComponent
 
 
@@ -52,25 +51,20 @@ class Device(AbstractDevice):
             if not self.components:
                 raise FaultState.warning("Keine Komponenten konfiguriert")
 
-            with SpeedwireListener(timeout_seconds) as speedwire:
-                self.__read_speedwire(speedwire)
+            receiver = speedwire_receiver.get_receiver(counter.DATAGRAM_KEYS | inverter.DATAGRAM_KEYS)
+            # Nur direkt nach dem Start des Empfängers auf das erste Datagramm warten, danach wird immer das zuletzt
+            # empfangene verwendet.
+            samples = receiver.samples(wait=max(0, receiver.started + timeout_seconds - time.time()),
+                                       complete=self.__complete)
+            now = time.time()
+            for component in self.components.values():
+                component.read_samples(samples, now, timeout_seconds)
 
         log.debug("Update complete")
 
-    def __read_speedwire(self, speedwire: Iterator[dict]):
-        stop_time = time.time() + timeout_seconds
-        components_todo = self.components.values()
-        try:
-            for sma_data in speedwire:
-                components_todo = [component for component in components_todo if not component.read_datagram(sma_data)]
-                if not components_todo:
-                    log.debug("All components updated")
-                    return
-                if time.time() > stop_time:
-                    break
-        except socket.timeout:
-            pass
-        raise FaultState.error("Kein passendes Datagramm innerhalb des %ds timeout empfangen" % timeout_seconds)
+    def __complete(self, samples: List[speedwire_receiver.Sample]) -> bool:
+        return all(any(component.matches(sample.data) for sample in samples)
+                   for component in self.components.values())
 
 
 def read_legacy(configuration_factory: Callable[[], dict], serial: str, **kwargs):
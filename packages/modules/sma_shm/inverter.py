@@ -16,6 +16,10 @@ def get_default_config() -> dict:
     }
 
 
+# Einträge der Datagramme, die parse_datagram benötigt
+DATAGRAM_KEYS = frozenset(["psupply", "psupplycounter"])
+
+
 def parse_datagram(sma_data: dict):
     return InverterState(
         power=-int(sma_data['psupply']),
@@ -0,0 +1,116 @@
+""" Langlebiger Empfänger für die Speedwire-Multicast-Datagramme der SMA Home Manager und Energy Meter.
+
+Ein Hintergrund-Thread empfängt über einen gemeinsamen Socket für alle sma_shm-Geräte die Datagramme und legt je
+Seriennummer das zuletzt empfangene Datagramm mit Zeitstempel ab. Das Auslesen im Regelzyklus muss daher nicht auf
+ein Datagramm warten.
+"""
+import logging
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from modules.common.fault_state import FaultState
+from modules.sma_shm.speedwiredecoder import SpeedwireDecoder
+
+log = logging.getLogger(__name__)
+
+MULTICAST_GROUP = "239.12.255.254"
+MULTICAST_PORT = 9522
+# Wartezeit, bis nach einem Fehler der Socket neu geöffnet wird
+REOPEN_DELAY = 5
+
+
+class Sample(NamedTuple):
+    timestamp: float
+    data: dict
+
+
+def open_multicast_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', MULTICAST_PORT))
+        mreq = struct.pack("4s4s", socket.inet_aton(MULTICAST_GROUP), socket.inet_aton("0.0.0.0"))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+class SpeedwireReceiver:
+    def __init__(self, socket_factory: Callable[[], socket.socket] = open_multicast_socket,
+                 keys: Optional[Iterable[str]] = None) -> None:
+        self.__socket_factory = socket_factory
+        self.__decoder = SpeedwireDecoder(keys)
+        self.__samples: Dict[int, Sample] = {}
+        self.__received = threading.Condition()
+        self.__error: Optional[str] = None
+        self.__stopped = threading.Event()
+        self.started = time.time()
+        self.__thread = threading.Thread(target=self.__run, name="speedwire", daemon=True)
+        self.__thread.start()
+
+    def samples(self, wait: float = 0, complete: Callable[[List[Sample]], bool] = bool) -> List[Sample]:
+        """ liefert je Seriennummer das zuletzt empfangene Datagramm. Sind die Datagramme noch nicht vollständig,
+        wird bis zu wait Sekunden gewartet.
+        """
+        with self.__received:
+            self.__received.wait_for(lambda: complete(list(self.__samples.values())), timeout=wait)
+            if not self.__samples and self.__error is not None:
+                raise FaultState.error(self.__error)
+            return list(self.__samples.values())
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        self.__thread.join()
+
+    def __run(self) -> None:
+        while not self.__stopped.is_set():
+            try:
+                sock = self.__socket_factory()
+            except Exception:
+                log.exception("Speedwire-Socket konnte nicht geöffnet werden.")
+                self.__error = "could not connect to multicast group or bind to given interface"
+                self.__stopped.wait(REOPEN_DELAY)
+                continue
+            self.__error = None
+            try:
+                sock.settimeout(1)
+                self.__receive(sock)
+            except Exception:
+                log.exception("Fehler beim Empfang der Speedwire-Datagramme")
+                self.__stopped.wait(REOPEN_DELAY)
+            finally:
+                sock.close()
+
+    def __receive(self, sock: socket.socket) -> None:
+        while not self.__stopped.is_set():
+            try:
+                datagram = sock.recv(608)
+            except socket.timeout:
+                continue
+            if len(datagram) >= 18 and datagram[16:18] == b'\x60\x69':
+                try:
+                    data = self.__decoder.decode(datagram)
+                except Exception:
+                    log.exception("Speedwire-Datagramm konnte nicht dekodiert werden.")
+                    continue
+                with self.__received:
+                    self.__samples[data["serial"]] = Sample(time.time(), data)
+                    self.__received.notify_all()
+
+
+_receiver: Optional[SpeedwireReceiver] = None
+_receiver_lock = threading.Lock()
+
+
+def get_receiver(keys: Iterable[str]) -> SpeedwireReceiver:
+    """ liefert den gemeinsamen Empfänger, der nur die angegebenen Einträge der Datagramme dekodiert."""
+    global _receiver
+    with _receiver_lock:
+        if _receiver is None:
+            _receiver = SpeedwireReceiver(keys=keys)
+        return _receiver
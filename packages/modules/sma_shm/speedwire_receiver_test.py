@@ -0,0 +1,54 @@
+import base64
+import socket
+
+import pytest
+
+from modules.sma_shm import counter
+from modules.sma_shm.counter_test import SAMPLE_SMA_ENERGY_EM, mock_ramdisk  # noqa: F401
+from modules.sma_shm.speedwire_receiver import Sample, SpeedwireReceiver
+from modules.sma_shm.speedwiredecoder import decode_speedwire
+
+DATAGRAM = base64.b64decode(SAMPLE_SMA_ENERGY_EM)
+
+
+@pytest.fixture
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        def send(datagram: bytes = DATAGRAM) -> None:
+            sender.sendto(datagram, sock.getsockname())
+        receiver = SpeedwireReceiver(lambda: sock)
+        yield receiver, send
+        receiver.stop()
+
+
+def test_receiver_keeps_latest_sample_per_serial(receiver):
+    # setup
+    receiver, send = receiver
+
+    # execution
+    send(b"not speedwire")
+    send()
+    send()
+    samples = receiver.samples(wait=5, complete=lambda samples: len(samples) > 0)
+
+    # evaluation
+    assert len(samples) == 1
+    assert samples[0].data["serial"] == 1901427928
+    assert samples[0].data["pconsumecounter"] == 7500.24
+
+
+def test_read_samples_reports_stale_datagram(mock_ramdisk):  # noqa: F811
+    # setup
+    component = counter.create_component(counter.get_default_config())
+    datagram = decode_speedwire(DATAGRAM)
+
+    # execution
+    component.read_samples([Sample(100, datagram)], now=110, max_age=5)
+    stale = "wattbezug" in mock_ramdisk.files
+    component.read_samples([Sample(100, datagram)], now=102, max_age=5)
+
+    # evaluation
+    assert stale is False
+    assert mock_ramdisk.files["wattbezug"] == "-11967"
@@ -18,6 +18,11 @@
 """
 
 import binascii
+import logging
+import struct
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+log = logging.getLogger(__name__)
 
 # unit definitions with scaling
 sma_units = {
@@ -80,87 +85,114 @@ sma_channels = {
 }
 
 
-def decode_OBIS(obis):
-    measurement = int.from_bytes(obis[0:2], byteorder='big')
-    raw_type = int.from_bytes(obis[2:3], byteorder='big')
-    if raw_type == 4:
-        datatype = 'actual'
-    elif raw_type == 8:
-        datatype = 'counter'
-    elif raw_type == 0 and measurement == 36864:
-        datatype = 'version'
-    else:
-        datatype = 'unknown'
-        print('unknown datatype: measurement {} datatype {} raw_type {}'.format(measurement, datatype, raw_type))
-    return (measurement, datatype)
-
-
-def decode_speedwire(datagram):
-    emparts = {}
-    # process data only of SMA header is present
-    if datagram[0:3] == b'SMA':
-        # datagram length
-        datalength = int.from_bytes(datagram[12:14], byteorder='big')+16
-        # print('data lenght: {}'.format(datalength))
-        # serial number
-        emID = int.from_bytes(datagram[20:24], byteorder='big')
-        # print('seral: {}'.format(emID))
-        emparts['serial'] = emID
-        # print('timestamp: {}'.format(timestamp))
-        # decode OBIS data blocks
-        # start with header
+_HEADER = struct.Struct(">HB")
+_UINT16 = struct.Struct(">H")
+_UINT32 = struct.Struct(">I")
+_UINT64 = struct.Struct(">Q")
+_VERSION_MEASUREMENT = 36864
+# revision definitions
+_REVISIONS = {
+    # S – Spezial Version
+    "1": ".S",
+    # A – Alpha (noch kein Feature Complete, Version für Verifizierung und Validierung)
+    "2": ".A",
+    # B – Beta (Feature Complete, Version für Verifizierung und Validierung)
+    "3": ".B",
+    # R – Release Candidate / Release (Version für Verifizierung, Validierung und Feldtest / öffentliche Version)
+    "4": ".R",
+    # E – Experimental Version (dient zur lokalen Verifizierung)
+    "5": ".E",
+    # N – Keine Revision
+    "6": ".N",
+}
+
+
+def _decode_version(value: bytes) -> str:
+    bversion = (binascii.b2a_hex(value).decode("utf-8"))
+    version = str(int(bversion[0:2], 16))+"."+str(int(bversion[2:4], 16))+"."+str(int(bversion[4:6], 16))
+    version = version + _REVISIONS.get(str(chr(int(bversion[6:8]))), "")
+    # adding versionnumber to compare verions
+    return version+"|"+str(bversion[0:2])+str(bversion[2:4])+str(bversion[4:6])
+
+
+# (key, scale, unit key, unit), key bzw. unit key sind None, wenn sie nicht benötigt werden
+_Entry = Tuple[Optional[str], int, Optional[str], str]
+
+
+class SpeedwireDecoder:
+    """ Decoder mit vorberechneter Tabelle Kanal -> (key, scale). Wird keys angegeben, werden nur diese Einträge
+    (und 'serial') dekodiert.
+    """
+
+    def __init__(self, keys: Optional[Iterable[str]] = None) -> None:
+        selected = None if keys is None else frozenset(keys)
+
+        def entry(key: str, unit: str) -> Optional[_Entry]:
+            value_key = key if selected is None or key in selected else None
+            unit_key = key+"unit" if selected is None or key+"unit" in selected else None
+            if value_key is None and unit_key is None:
+                return None
+            return value_key, sma_units[unit], unit_key, unit
+
+        self.__actual: Dict[int, _Entry] = {}
+        self.__counter: Dict[int, _Entry] = {}
+        for measurement, channel in sma_channels.items():
+            if len(channel) >= 2 and channel[1] in sma_units:
+                actual = entry(channel[0], channel[1])
+                if actual is not None:
+                    self.__actual[measurement] = actual
+            if len(channel) >= 3:
+                counter = entry(channel[0]+"counter", channel[2])
+                if counter is not None:
+                    self.__counter[measurement] = counter
+        self.__version_key = sma_channels[_VERSION_MEASUREMENT][0]
+        self.__decode_version = selected is None or self.__version_key in selected
+
+    def decode(self, datagram: bytes) -> dict:
+        emparts: Dict[str, Any] = {}
+        # process data only of SMA header is present
+        if datagram[0:3] != b'SMA':
+            return emparts
+        # unpack_from liest direkt aus dem Puffer, ohne Teilstücke zu kopieren.
+        datalength = min(_UINT16.unpack_from(datagram, 12)[0]+16, len(datagram))
+        emparts['serial'] = _UINT32.unpack_from(datagram, 20)[0]
+        actual, counter = self.__actual, self.__counter
+        # decode OBIS data blocks, start with header
         position = 28
-        while position < datalength:
-            # decode header
-            # print('pos: {}'.format(position))
-            (measurement, datatype) = decode_OBIS(datagram[position:position+4])
-            # print('measurement {} datatype: {}'.format(measurement,datatype))
-            # decode values
-            # actual values
-            if datatype == 'actual':
-                value = int.from_bytes(datagram[position+4:position+8], byteorder='big')
+        while position + 8 <= datalength:
+            measurement, raw_type = _HEADER.unpack_from(datagram, position)
+            if raw_type == 4:
+                entry = actual.get(measurement)
+                if entry is not None:
+                    key, scale, unit_key, unit = entry
+                    if key is not None:
+                        emparts[key] = _UINT32.unpack_from(datagram, position+4)[0]/scale
+                    if unit_key is not None:
+                        emparts[unit_key] = unit
                 position += 8
-                if measurement in sma_channels.keys():
-                    emparts[sma_channels[measurement][0]] = value/sma_units[sma_channels[measurement][1]]
-                    emparts[sma_channels[measurement][0]+'unit'] = sma_channels[measurement][1]
-            # counter values
-            elif datatype == 'counter':
-                value = int.from_bytes(datagram[position+4:position+12], byteorder='big')
+            elif raw_type == 8:
+                if position + 12 > datalength:
+                    break
+                entry = counter.get(measurement)
+                if entry is not None:
+                    key, scale, unit_key, unit = entry
+                    if key is not None:
+                        emparts[key] = _UINT64.unpack_from(datagram, position+4)[0]/scale
+                    if unit_key is not None:
+                        emparts[unit_key] = unit
                 position += 12
-                if measurement in sma_channels.keys():
-                    emparts[sma_channels[measurement][0]+'counter'] = value/sma_units[sma_channels[measurement][2]]
-                    emparts[sma_channels[measurement][0]+'counterunit'] = sma_channels[measurement][2]
-            elif datatype == 'version':
-                value = datagram[position+4:position+8]
-                if measurement in sma_channels.keys():
-                    bversion = (binascii.b2a_hex(value).decode("utf-8"))
-                    version = str(int(bversion[0:2], 16))+"."+str(int(bversion[2:4], 16)
-                                                                  )+"."+str(int(bversion[4:6], 16))
-                    revision = str(chr(int(bversion[6:8])))
-                    # revision definitions
-                    if revision == "1":
-                        # S – Spezial Version
-                        version = version+".S"
-                    elif revision == "2":
-                        # A – Alpha (noch kein Feature Complete, Version für Verifizierung und Validierung)
-                        version = version+".A"
-                    elif revision == "3":
-                        # B – Beta (Feature Complete, Version für Verifizierung und Validierung)
-                        version = version+".B"
-                    elif revision == "4":
-                        # R – Release Candidate / Release (Version für Verifizierung, Validierung und
-                        # Feldtest / öffentliche Version)
-                        version = version+".R"
-                    elif revision == "5":
-                        # E – Experimental Version (dient zur lokalen Verifizierung)
-                        version = version+".E"
-                    elif revision == "6":
-                        # N – Keine Revision
-                        version = version+".N"
-                    # adding versionnumber to compare verions
-                    version = version+"|"+str(bversion[0:2])+str(bversion[2:4])+str(bversion[4:6])
-                    emparts[sma_channels[measurement][0]] = version
-                position += 8
             else:
+                if raw_type == 0 and measurement == _VERSION_MEASUREMENT:
+                    if self.__decode_version:
+                        emparts[self.__version_key] = _decode_version(bytes(datagram[position+4:position+8]))
+                else:
+                    log.debug("unknown datatype: measurement %s raw_type %s", measurement, raw_type)
                 position += 8
-    return emparts
+        return emparts
+
+
+_decoder = SpeedwireDecoder()
+
+
+def decode_speedwire(datagram: bytes) -> dict:
+    return _decoder.decode(datagram)
@@ -0,0 +1,40 @@
+import base64
+
+from modules.sma_shm import counter, inverter
+from modules.sma_shm.counter_test import SAMPLE_SMA_ENERGY_EM
+from modules.sma_shm.speedwiredecoder import SpeedwireDecoder, decode_speedwire
+
+DATAGRAM = base64.b64decode(SAMPLE_SMA_ENERGY_EM)
+
+
+def test_decode_speedwire():
+    # execution
+    sma_data = decode_speedwire(DATAGRAM)
+
+    # evaluation
+    assert len(sma_data) == 118
+    assert sma_data["serial"] == 1901427928
+    assert sma_data["psupply"] == 11967.0
+    assert sma_data["psupplyunit"] == "W"
+    assert sma_data["psupplycounter"] == 86688.627
+    assert sma_data["psupplycounterunit"] == "kWh"
+    assert sma_data["u1"] == 238.438
+    assert sma_data["speedwire-version"] == "2.0.18.R|020012"
+
+
+def test_decode_selected_keys():
+    # setup
+    decoder = SpeedwireDecoder(counter.DATAGRAM_KEYS | inverter.DATAGRAM_KEYS)
+
+    # execution
+    sma_data = decoder.decode(DATAGRAM)
+
+    # evaluation
+    full = decode_speedwire(DATAGRAM)
+    assert set(sma_data) == (counter.DATAGRAM_KEYS | {"serial"}) - {"frequency"}
+    assert vars(counter.parse_datagram(sma_data)) == vars(counter.parse_datagram(full))
+    assert vars(inverter.parse_datagram(sma_data)) == vars(inverter.parse_datagram(full))
+
+
+def test_decode_ignores_truncated_datagram():
+    assert decode_speedwire(DATAGRAM[:40]) == {"serial": 1901427928, "pconsume": 0.0, "pconsumeunit": "W"}
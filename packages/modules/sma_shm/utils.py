@@ -1,9 +1,10 @@
 import logging
-from typing import TypeVar, Generic, Callable, Optional
+from typing import TypeVar, Generic, Callable, Iterable, Optional
 
 from modules.common.component_context import SingleComponentUpdateContext
-from modules.common.fault_state import ComponentInfo
+from modules.common.fault_state import ComponentInfo, FaultState
 from modules.common.store import ValueStore
+from modules.sma_shm.speedwire_receiver import Sample
 
 T = TypeVar("T")
 log = logging.getLogger(__name__)
@@ -27,9 +28,17 @@ class SpeedwireComponent(Generic[T]):
         self.__serial_matcher = _create_serial_matcher(component_config["configuration"]["serials"])
         self.component_info = ComponentInfo.from_component_config(component_config)
 
-    def read_datagram(self, datagram: dict) -> bool:
-        if self.__serial_matcher(datagram):
-            with SingleComponentUpdateContext(self.component_info):
-                self.__value_store.set(self.__parser(datagram))
-            return True
-        return False
+    def matches(self, datagram: dict) -> bool:
+        return self.__serial_matcher(datagram)
+
+    def read_samples(self, samples: Iterable[Sample], now: float, max_age: float) -> None:
+        """ übernimmt das neueste passende Datagramm, sofern es nicht älter als max_age Sekunden ist."""
+        with SingleComponentUpdateContext(self.component_info):
+            matching = [sample for sample in samples if self.matches(sample.data)]
+            if not matching:
+                raise FaultState.error("Kein passendes Datagramm empfangen")
+            sample = max(matching, key=lambda s: s.timestamp)
+            age = now - sample.timestamp
+            if age > max_age:
+                raise FaultState.error("Letztes passendes Datagramm ist %ds alt" % age)
+            self.__value_store.set(self.__parser(sample.data))